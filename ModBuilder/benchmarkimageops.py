@@ -0,0 +1,124 @@
+import os
+import struct
+import sys
+import tempfile
+import time
+import numpy as np
+import PIL
+import PIL.Image
+from argparse import ArgumentParser
+from psd_tools import PSDImage
+from PIL.Image import Image as PILImage
+from PIL.Image import Resampling
+from typing import Callable
+from generalsmodbuilder.build.imageops import CompositeAlphaChannels, ResizeImageChannels
+
+
+def WriteSyntheticPSD(path: str, width: int, height: int, channels: int) -> None:
+    """
+    Writes PSD file without layers, with random RGB color and channels - 3 random alpha channels.
+    """
+    rng = np.random.default_rng(0)
+    planes: np.ndarray = rng.integers(0, 256, (channels, height, width), dtype=np.uint8)
+
+    with open(path, "wb") as wfile:
+        wfile.write(b"8BPS")
+        wfile.write(struct.pack(">H6xHIIHH", 1, channels, height, width, 8, 3))
+        # Empty color mode data, image resources, layer and mask info, then raw image data.
+        wfile.write(struct.pack(">IIIH", 0, 0, 0, 0))
+        wfile.write(planes.tobytes())
+
+
+def CompositeAlphaBefore(img: PILImage, alphas: list[PILImage]) -> PILImage:
+    r: PILImage = img.getchannel(0)
+    g: PILImage = img.getchannel(1)
+    b: PILImage = img.getchannel(2)
+    white: PILImage = PIL.Image.new("L", img.size, 255)
+    black: PILImage = PIL.Image.new("L", img.size, 0)
+    a: PILImage = white
+    for an in alphas:
+        a = PIL.Image.composite(an, black, a)
+    return PIL.Image.merge("RGBA", (r, g, b, a))
+
+
+def CompositeAlphaAfter(img: PILImage, alphas: list[PILImage]) -> PILImage:
+    return CompositeAlphaChannels(img, alphas)
+
+
+def ResizeBefore(img: PILImage, size: tuple[int, int], resample: Resampling) -> PILImage:
+    r, g, b, a = img.split()
+    r = r.resize(size=size, resample=resample)
+    g = g.resize(size=size, resample=resample)
+    b = b.resize(size=size, resample=resample)
+    a = a.resize(size=size, resample=resample)
+    return PIL.Image.merge("RGBA", (r, g, b, a))
+
+
+def ResizeAfter(img: PILImage, size: tuple[int, int], resample: Resampling) -> PILImage:
+    return ResizeImageChannels(img, size, resample)
+
+
+def Measure(function: Callable[[], PILImage], repeat: int) -> tuple[float, PILImage]:
+    """
+    Returns the best time in seconds of repeat calls of function and its result.
+    """
+    best: float = sys.float_info.max
+    result: PILImage = None
+    for _ in range(repeat):
+        begin: float = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - begin)
+    return best, result
+
+
+def PrintResult(name: str, megapixels: float, before: tuple[float, PILImage], after: tuple[float, PILImage]) -> None:
+    identical: bool = np.array_equal(np.asarray(before[1]), np.asarray(after[1]))
+    beforeMs: float = before[0] * 1000 / megapixels
+    afterMs: float = after[0] * 1000 / megapixels
+    print(f"{name:<28} before {beforeMs:8.2f} ms/MP   after {afterMs:8.2f} ms/MP   speedup {beforeMs / afterMs:5.2f}x   identical {identical}")
+
+
+def Main(args=None):
+    parser = ArgumentParser(description="Benchmarks the image operations of the texture conversions before and after vectorization.")
+    parser.add_argument("--psd", type=str, nargs="*", help="PSD files to benchmark. Synthetic PSD files are used when omitted.")
+    parser.add_argument("--size", type=int, default=4096, help="Width and height of the synthetic PSD files.")
+    parser.add_argument("--channels", type=int, nargs="*", default=[4, 6], help="Channel counts of the synthetic PSD files.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs of which the best is reported.")
+    parsed = parser.parse_args(args=args)
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        paths: list[str] = parsed.psd
+        if not paths:
+            paths = list[str]()
+            for channels in parsed.channels:
+                path: str = os.path.join(tmpDir, f"synthetic_{parsed.size}_{channels}.psd")
+                WriteSyntheticPSD(path, parsed.size, parsed.size, channels)
+                paths.append(path)
+
+        for path in paths:
+            psd: PSDImage = PSDImage.open(fp=path)
+            megapixels: float = psd.width * psd.height / 1000000
+            print(f"{os.path.basename(path)}: {psd.width}x{psd.height}, {psd.channels} channels")
+
+            if psd.channels <= 3:
+                print("Skipped, has no alpha channel")
+                continue
+
+            # Decoding the PSD channels is the same before and after and therefore not measured.
+            composite: PILImage = psd.composite(color=0.0, alpha=1.0)
+            alphas: list[PILImage] = [psd.topil(channel=channel) for channel in range(3, psd.channels)]
+
+            before: tuple[float, PILImage] = Measure(lambda: CompositeAlphaBefore(composite, alphas), parsed.repeat)
+            after: tuple[float, PILImage] = Measure(lambda: CompositeAlphaAfter(composite, alphas), parsed.repeat)
+            PrintResult("Composite PSD alpha", megapixels, before, after)
+
+            img: PILImage = after[1]
+            size: tuple[int, int] = (max(1, img.width // 2), max(1, img.height // 2))
+            for resample in (Resampling.BOX, Resampling.BILINEAR, Resampling.LANCZOS):
+                before = Measure(lambda: ResizeBefore(img, size, resample), parsed.repeat)
+                after = Measure(lambda: ResizeAfter(img, size, resample), parsed.repeat)
+                PrintResult(f"Resize RGBA {resample.name}", megapixels, before, after)
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,642 @@
+import json
+import os
+import struct
+import tarfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+from generalsmodbuilder.build.filehasher import FileHasher, FileHashesT
+from generalsmodbuilder import util
+
+
+ARCHIVE_BLOCK_SIZE = 1024 * 1024
+ARCHIVE_DICT_SIZE = 1024 * 32
+# Is part of the input digest. Increment when the written bytes change for the same input.
+ARCHIVE_FORMAT_VERSION = 1
+# 1980-01-01 00:00:00 UTC, the earliest time ZIP can store.
+ARCHIVE_DEFAULT_TIMESTAMP = 315532800
+
+ZIP_MANIFEST_VERSION = 3
+ZIP_INPUT_DIGEST_PREFIX = b"inputDigest="
+ZIP_AUTO_SAMPLE_COUNT = 4
+ZIP_AUTO_SAMPLE_SIZE = 1024 * 16
+ZIP_AUTO_MAX_RATIO = 0.9
+
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+ZIP_DEFAULT_VERSION = 20
+ZIP64_VERSION = 45
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP_FLAG_DATA_DESCRIPTOR = 0x08
+ZIP_FLAG_UTF8 = 0x800
+
+
+def GetDefaultNumArchiveWorkers() -> int:
+    return os.cpu_count() or 1
+
+
+def GetArchiveTimestamp() -> int:
+    """
+    Returns the modified time of all archive entries. Archives do not store the times of the source files,
+    so that the same input always produces the same bytes. SOURCE_DATE_EPOCH overrides it, like in other reproducible builds.
+    """
+    sourceDateEpoch: str = os.environ.get("SOURCE_DATE_EPOCH", "")
+    if sourceDateEpoch.isdigit():
+        return max(ARCHIVE_DEFAULT_TIMESTAMP, int(sourceDateEpoch))
+    return ARCHIVE_DEFAULT_TIMESTAMP
+
+
+class DeflateBlockQueue:
+    """
+    Compresses blocks of data to raw deflate on a thread pool and writes them to a file in the order they were added,
+    interleaved with uncompressed data such as archive headers. zlib releases the GIL while compressing,
+    so blocks are compressed in parallel. The number of pending blocks is bounded, so memory use does not depend
+    on the size of the archive.
+    """
+    wfile: object
+    pool: ThreadPoolExecutor
+    maxPendingBlocks: int
+    pendingBlockCount: int
+    items: deque[tuple[Future | None, Callable]]
+
+    def __init__(self, wfile, pool: ThreadPoolExecutor, maxPendingBlocks: int):
+        self.wfile = wfile
+        self.pool = pool
+        self.maxPendingBlocks = max(1, maxPendingBlocks)
+        self.pendingBlockCount = 0
+        self.items = deque[tuple[Future | None, Callable]]()
+
+    def AddData(self, getData: Callable[[], bytes]) -> None:
+        """
+        Adds uncompressed data. getData is called when all previous items are written,
+        so it can refer to positions and sizes of previous items.
+        """
+        self.items.append((None, lambda wfile: wfile.write(getData())))
+
+    def AddCopy(self, rfile, offset: int, size: int) -> None:
+        """
+        Adds data that is copied as is from a range of another file.
+        """
+        self.items.append((None, lambda wfile: DeflateBlockQueue.__CopyRange(rfile, offset, size, wfile)))
+
+    def AddBlock(self, data: bytes, zdict: bytes, isLast: bool, level: int | None, onWritten: Callable[[int], None]) -> None:
+        """
+        Adds block of a deflate stream. zdict is the end of the previous block of the same stream.
+        The last block finishes the stream. A level of None stores the block uncompressed.
+        onWritten is called with the compressed size when the block is written.
+        """
+        while self.pendingBlockCount >= self.maxPendingBlocks:
+            self.__WriteNext()
+
+        future: Future
+        if level == None:
+            future = Future()
+            future.set_result(data)
+        else:
+            future = self.pool.submit(DeflateBlockQueue.__Deflate, data, zdict, isLast, level)
+        self.items.append((future, onWritten))
+        self.pendingBlockCount += 1
+
+    def Flush(self) -> None:
+        while self.items:
+            self.__WriteNext()
+
+    def __WriteNext(self) -> None:
+        future: Future | None
+        callback: Callable
+        future, callback = self.items.popleft()
+
+        if future != None:
+            data: bytes = future.result()
+            self.pendingBlockCount -= 1
+            self.wfile.write(data)
+            callback(len(data))
+        else:
+            callback(self.wfile)
+
+    @staticmethod
+    def __CopyRange(rfile, offset: int, size: int, wfile) -> None:
+        rfile.seek(offset)
+        remaining: int = size
+        while remaining > 0:
+            chunk: bytes = rfile.read(min(ARCHIVE_BLOCK_SIZE, remaining))
+            util.Verify(bool(chunk), f"File '{rfile.name}' changed while copying from it")
+            wfile.write(chunk)
+            remaining -= len(chunk)
+
+    @staticmethod
+    def __Deflate(data: bytes, zdict: bytes, isLast: bool, level: int) -> bytes:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=zdict) if zdict else \
+            zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        # A sync flush ends the block on a byte boundary without ending the stream,
+        # so the next block can be appended as is.
+        return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if isLast else zlib.Z_SYNC_FLUSH)
+
+
+class DeflateStream:
+    """
+    Splits a stream into blocks for a DeflateBlockQueue and tracks its CRC32 and sizes.
+    Each block is primed with the end of the previous block, so that splitting barely affects the compression ratio.
+    A level of None stores the stream uncompressed.
+    """
+    queue: DeflateBlockQueue
+    level: int | None
+    crc: int
+    size: int
+    compressedSize: int
+    buffer: bytearray
+    zdict: bytes
+
+    def __init__(self, queue: DeflateBlockQueue, level: int | None):
+        self.queue = queue
+        self.level = level
+        self.crc = 0
+        self.size = 0
+        self.compressedSize = 0
+        self.buffer = bytearray()
+        self.zdict = b""
+
+    def write(self, data: bytes) -> int:
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self.buffer += data
+
+        while len(self.buffer) >= ARCHIVE_BLOCK_SIZE:
+            block = bytes(self.buffer[:ARCHIVE_BLOCK_SIZE])
+            del self.buffer[:ARCHIVE_BLOCK_SIZE]
+            self.__AddBlock(block, False)
+
+        return len(data)
+
+    def Finish(self) -> None:
+        self.__AddBlock(bytes(self.buffer), True)
+        self.buffer = bytearray()
+
+    def __AddBlock(self, block: bytes, isLast: bool) -> None:
+        self.queue.AddBlock(block, self.zdict, isLast, self.level, self.__OnBlockWritten)
+        self.zdict = (self.zdict + block)[-ARCHIVE_DICT_SIZE:] if len(block) < ARCHIVE_DICT_SIZE else block[-ARCHIVE_DICT_SIZE:]
+
+    def __OnBlockWritten(self, compressedSize: int) -> None:
+        self.compressedSize += compressedSize
+
+
+@dataclass(init=False)
+class ZipEntry:
+    absSource: str
+    name: str
+    isDir: bool
+    fileSize: int
+    compressType: int
+    compressMethod: str | int
+    flagBits: int
+    isZip64: bool
+    fingerprint: util.FileFingerprintT | None
+    offset: int
+    endOffset: int
+    crc: int
+    size: int
+    compressedSize: int
+    stream: DeflateStream | None
+
+    def __init__(self, absSource: str, name: str, isDir: bool):
+        result: os.stat_result = os.stat(absSource)
+        self.absSource = absSource
+        self.name = name
+        self.isDir = isDir
+        self.fileSize = 0 if isDir else result.st_size
+        self.compressType = ZIP_STORED
+        self.compressMethod = "store"
+        self.flagBits = 0 if isDir else ZIP_FLAG_DATA_DESCRIPTOR
+        if not name.isascii():
+            self.flagBits |= ZIP_FLAG_UTF8
+        self.isZip64 = self.fileSize * 1.05 > ZIP64_LIMIT
+        self.fingerprint = None if isDir else (result.st_mtime_ns, result.st_size, result.st_ino, result.st_dev)
+        self.offset = 0
+        self.endOffset = 0
+        self.crc = 0
+        self.size = 0
+        self.compressedSize = 0
+        self.stream = None
+
+    def GetVersion(self) -> int:
+        return ZIP64_VERSION if self.isZip64 else ZIP_DEFAULT_VERSION
+
+    def GetEncodedName(self) -> bytes:
+        return self.name.encode("utf-8" if self.flagBits & ZIP_FLAG_UTF8 else "ascii")
+
+    def GetDosDateTime(self) -> tuple[int, int]:
+        dateTime: time.struct_time = time.gmtime(GetArchiveTimestamp())
+        dosDate: int = (dateTime.tm_year - 1980) << 9 | dateTime.tm_mon << 5 | dateTime.tm_mday
+        dosTime: int = dateTime.tm_hour << 11 | dateTime.tm_min << 5 | dateTime.tm_sec // 2
+        return dosDate, dosTime
+
+    def GetExternalAttributes(self) -> int:
+        # Permissions of the source files are not stored, so that the archive does not depend on the build machine.
+        if self.isDir:
+            return (0o40755 << 16) | 0x10
+        return 0o100644 << 16
+
+
+class ZipCompressionPolicy:
+    """
+    Selects the compression of ZIP entries by file extension. Methods are 'store', 'deflate' with the default level,
+    a deflate level from 0 to 9, or 'auto'. Auto compresses a few samples across the file and stores the file
+    if they compress poorly, which is the case for already compressed content such as most textures and audio.
+    Extensions are given without dot. '*' selects the method of all other files, which defaults to 'deflate'.
+    """
+    methods: dict[str, str | int]
+
+    def __init__(self, methods: dict[str, str | int] = None):
+        self.methods = {ext.lower().lstrip("."): method for ext, method in methods.items()} if methods else {}
+
+    def GetMethod(self, name: str) -> str | int:
+        ext: str = os.path.splitext(name)[1].lower().lstrip(".")
+        return self.methods.get(ext, self.methods.get("*", "deflate"))
+
+    @staticmethod
+    def GetLevel(method: str | int, absSource: str, size: int) -> int | None:
+        """
+        Returns deflate level of a file, or None if it is stored.
+        """
+        if method == "store":
+            return None
+        if method == "deflate":
+            return zlib.Z_DEFAULT_COMPRESSION
+        if method == "auto":
+            return zlib.Z_DEFAULT_COMPRESSION if ZipCompressionPolicy.__IsCompressible(absSource, size) else None
+        util.Verify(isinstance(method, int) and 0 <= method <= 9, f"ZIP compression method '{method}' is not supported")
+        return method
+
+    @staticmethod
+    def __IsCompressible(absSource: str, size: int) -> bool:
+        if size == 0:
+            return False
+
+        sampleSize: int = 0
+        compressedSize: int = 0
+        sampleCount: int = min(ZIP_AUTO_SAMPLE_COUNT, max(1, size // ZIP_AUTO_SAMPLE_SIZE))
+        step: int = max(0, size - ZIP_AUTO_SAMPLE_SIZE) // max(1, sampleCount - 1)
+
+        with open(absSource, "rb") as rfile:
+            for i in range(sampleCount):
+                rfile.seek(i * step)
+                sample: bytes = rfile.read(ZIP_AUTO_SAMPLE_SIZE)
+                compressor = zlib.compressobj(1, zlib.DEFLATED, -zlib.MAX_WBITS)
+                sampleSize += len(sample)
+                compressedSize += len(compressor.compress(sample) + compressor.flush())
+
+        return compressedSize < sampleSize * ZIP_AUTO_MAX_RATIO
+
+
+def __MakeZipEntries(absSourceDir: str) -> list[ZipEntry]:
+    # Writes the same entries as shutil.make_archive, in a stable order.
+    entries = list[ZipEntry]()
+
+    for dirpath, dirnames, filenames in os.walk(absSourceDir):
+        dirnames.sort()
+        for name in dirnames:
+            path: str = os.path.join(dirpath, name)
+            entries.append(ZipEntry(path, os.path.relpath(path, absSourceDir).replace(os.sep, "/") + "/", True))
+        for name in sorted(filenames):
+            path: str = os.path.join(dirpath, name)
+            if os.path.isfile(path):
+                entries.append(ZipEntry(path, os.path.relpath(path, absSourceDir).replace(os.sep, "/"), False))
+
+    return entries
+
+
+def __PackZipLocalHeader(entry: ZipEntry, position: int) -> bytes:
+    entry.offset = position
+    dosDate, dosTime = entry.GetDosDateTime()
+    encodedName: bytes = entry.GetEncodedName()
+    extra: bytes = b""
+    size: int = 0
+
+    if entry.isZip64:
+        extra = struct.pack("<HHQQ", 1, 16, 0, 0)
+        size = 0xFFFFFFFF
+
+    # Sizes and CRC follow in the data descriptor, because they are not known before the data is compressed.
+    header: bytes = struct.pack("<4s2B4HL2L2H", b"PK\003\004", entry.GetVersion(), 0, entry.flagBits, entry.compressType,
+        dosTime, dosDate, 0, size, size, len(encodedName), len(extra))
+
+    return header + encodedName + extra
+
+
+def __PackZipDataDescriptor(entry: ZipEntry, position: int) -> bytes:
+    entry.crc = entry.stream.crc
+    entry.size = entry.stream.size
+    entry.compressedSize = entry.stream.compressedSize
+    descriptor: bytes
+
+    if entry.isZip64:
+        descriptor = struct.pack("<4sLQQ", b"PK\007\010", entry.crc, entry.compressedSize, entry.size)
+    else:
+        util.Verify(entry.size <= ZIP64_LIMIT and entry.compressedSize <= ZIP64_LIMIT,
+            f"File '{entry.absSource}' changed while writing ZIP archive")
+        descriptor = struct.pack("<4sLLL", b"PK\007\010", entry.crc, entry.compressedSize, entry.size)
+
+    entry.endOffset = position + len(descriptor)
+    return descriptor
+
+
+def __PackZipCentralDirEntry(entry: ZipEntry) -> bytes:
+    dosDate, dosTime = entry.GetDosDateTime()
+    encodedName: bytes = entry.GetEncodedName()
+    size: int = entry.size
+    compressedSize: int = entry.compressedSize
+    offset: int = entry.offset
+    extraValues = list[int]()
+    version: int = entry.GetVersion()
+
+    if size > ZIP64_LIMIT or compressedSize > ZIP64_LIMIT:
+        extraValues.extend([size, compressedSize])
+        size = compressedSize = 0xFFFFFFFF
+    if offset > ZIP64_LIMIT:
+        extraValues.append(offset)
+        offset = 0xFFFFFFFF
+
+    extra: bytes = b""
+    if extraValues:
+        extra = struct.pack("<HH" + "Q" * len(extraValues), 1, 8 * len(extraValues), *extraValues)
+        version = ZIP64_VERSION
+
+    # Unix, so that the external attributes hold the permissions.
+    createSystem: int = 3
+
+    header: bytes = struct.pack("<4s4B4HL2L5H2L", b"PK\001\002", version, createSystem, version, 0, entry.flagBits, entry.compressType,
+        dosTime, dosDate, entry.crc, compressedSize, size, len(encodedName), len(extra), 0, 0, 0,
+        entry.GetExternalAttributes(), offset)
+
+    return header + encodedName + extra
+
+
+def __PackZipEnd(count: int, centralDirOffset: int, centralDirSize: int, comment: bytes) -> bytes:
+    data: bytes = b""
+
+    if count >= ZIP_FILECOUNT_LIMIT or centralDirOffset > ZIP64_LIMIT or centralDirSize > ZIP64_LIMIT:
+        zip64EndOffset: int = centralDirOffset + centralDirSize
+        data += struct.pack("<4sQ2H2L4Q", b"PK\006\006", 44, ZIP64_VERSION, ZIP64_VERSION, 0, 0, count, count, centralDirSize, centralDirOffset)
+        data += struct.pack("<4sLQL", b"PK\006\007", 0, zip64EndOffset, 1)
+        count = min(count, 0xFFFF)
+        centralDirOffset = min(centralDirOffset, 0xFFFFFFFF)
+        centralDirSize = min(centralDirSize, 0xFFFFFFFF)
+
+    data += struct.pack("<4s4H2LH", b"PK\005\006", 0, 0, count, count, centralDirSize, centralDirOffset, len(comment))
+    data += comment
+    return data
+
+
+def __MakeZipComment(inputDigest: str) -> bytes:
+    return ZIP_INPUT_DIGEST_PREFIX + inputDigest.encode("ascii") if inputDigest else b""
+
+
+def __ReadZipComment(absPath: str) -> bytes | None:
+    END_SIZE = 22
+    try:
+        with open(absPath, "rb") as rfile:
+            fileSize: int = os.fstat(rfile.fileno()).st_size
+            tailSize: int = min(fileSize, END_SIZE + 0xFFFF)
+            rfile.seek(fileSize - tailSize)
+            tail: bytes = rfile.read(tailSize)
+    except OSError:
+        return None
+
+    pos: int = tail.rfind(b"PK\005\006")
+    while pos >= 0:
+        if pos + END_SIZE <= len(tail):
+            commentSize: int = struct.unpack_from("<H", tail, pos + 20)[0]
+            if pos + END_SIZE + commentSize == len(tail):
+                return tail[pos + END_SIZE:]
+        pos = tail.rfind(b"PK\005\006", 0, pos)
+
+    return None
+
+
+def ListZipSourceFiles(absSourceDir: str) -> list[str]:
+    """
+    Returns the files that the ZIP archive of directory contains, with the paths that MakeZipInputDigest expects.
+    """
+    return [entry.absSource for entry in __MakeZipEntries(absSourceDir) if not entry.isDir]
+
+
+def MakeZipInputDigest(
+        absSourceDir: str,
+        hashFunc: Callable,
+        compression: ZipCompressionPolicy = None,
+        numWorkers: int = 0,
+        knownDigests: FileHashesT = None) -> str:
+    """
+    Returns digest of everything that determines the bytes of the ZIP archive of directory:
+    the names and contents of its files, their compression and the archive format.
+    Files with a digest in knownDigests, for example one from the build diff, are not hashed again.
+    knownDigests must be created with hashFunc.
+    """
+    compression = compression if compression != None else ZipCompressionPolicy()
+    entries: list[ZipEntry] = __MakeZipEntries(absSourceDir)
+    hashes = FileHashesT(knownDigests) if knownDigests else FileHashesT()
+    hasher = FileHasher(hashFunc=hashFunc, numWorkers=numWorkers)
+    hashes.update(hasher.HashFiles([entry.absSource for entry in entries if not entry.isDir and not hashes.get(entry.absSource)]))
+    hashObj = hashFunc()
+    hashObj.update(f"{ARCHIVE_FORMAT_VERSION}\0{GetArchiveTimestamp()}\0".encode("utf-8"))
+    entry: ZipEntry
+
+    for entry in entries:
+        if entry.isDir:
+            hashObj.update(f"{entry.name}\0\0".encode("utf-8"))
+        else:
+            hashObj.update(f"{entry.name}\0{compression.GetMethod(entry.name)}\0{hashes[entry.absSource]}\0".encode("utf-8"))
+
+    return hashObj.hexdigest()
+
+
+def ReadZipInputDigest(absPath: str) -> str:
+    """
+    Returns the input digest that is stored in the comment of a ZIP archive written by WriteZipFile, or an empty string.
+    """
+    comment: bytes | None = __ReadZipComment(absPath)
+    if comment == None or not comment.startswith(ZIP_INPUT_DIGEST_PREFIX):
+        return ""
+    return comment[len(ZIP_INPUT_DIGEST_PREFIX):].decode("ascii", errors="replace")
+
+
+def WriteZipFile(
+        absTarget: str,
+        absSourceDir: str,
+        hashFunc: Callable,
+        numWorkers: int = 0,
+        compression: ZipCompressionPolicy = None,
+        absManifest: str = None,
+        inputDigest: str = "") -> str:
+    """
+    Writes ZIP archive of all files in directory and its sub directories and returns its hash.
+    File data is compressed in blocks on a thread pool and written in order, so the archive is streamed in one pass.
+    Symlinks are followed, so that the archive contains the linked files.
+    Entries are sorted and have fixed times and permissions, so the same input always produces the same bytes.
+    inputDigest is stored in the archive comment and can be compared with ReadZipInputDigest.
+    With absManifest, the compressed entries of the previous archive at absTarget are copied as is
+    for all files that did not change since, and only the changed files are compressed.
+    The manifest records the entries of the written archive for the next time.
+    """
+    numWorkers = numWorkers if numWorkers > 0 else GetDefaultNumArchiveWorkers()
+    compression = compression if compression != None else ZipCompressionPolicy()
+    entries: list[ZipEntry] = __MakeZipEntries(absSourceDir)
+    manifest: dict | None = None
+    absWriteTarget: str = absTarget
+
+    if absManifest:
+        manifest = __LoadZipManifest(absManifest, absTarget)
+        # Is deleted first, so that it does not outlive an interrupted write.
+        util.DeleteFile(absManifest)
+        if manifest != None:
+            absWriteTarget = absTarget + ".tmp"
+
+    try:
+        with util.HashingFileWriter(absWriteTarget, hashFunc) as wfile, ThreadPoolExecutor(max_workers=numWorkers) as pool:
+            if manifest != None:
+                with open(absTarget, "rb") as rfile:
+                    __WriteZipEntries(wfile, pool, entries, numWorkers, compression, rfile, manifest["entries"], inputDigest)
+            else:
+                __WriteZipEntries(wfile, pool, entries, numWorkers, compression, None, {}, inputDigest)
+
+        if absWriteTarget != absTarget:
+            os.replace(absWriteTarget, absTarget)
+    except:
+        if absWriteTarget != absTarget:
+            util.DeleteFile(absWriteTarget)
+        raise
+
+    if absManifest:
+        __SaveZipManifest(absManifest, absTarget, entries)
+
+    return wfile.hexdigest()
+
+
+def __WriteZipEntries(
+        wfile,
+        pool: ThreadPoolExecutor,
+        entries: list[ZipEntry],
+        numWorkers: int,
+        compression: ZipCompressionPolicy,
+        rfile,
+        oldEntries: dict[str, list],
+        inputDigest: str) -> None:
+
+    queue = DeflateBlockQueue(wfile, pool, numWorkers * 4)
+    entry: ZipEntry
+
+    for entry in entries:
+        if entry.isDir:
+            queue.AddData(lambda entry=entry: __PackZipLocalHeader(entry, wfile.tell()))
+            continue
+
+        entry.compressMethod = compression.GetMethod(entry.name)
+        oldEntry: list = oldEntries.get(entry.name)
+
+        if oldEntry != None and tuple(oldEntry[0]) == entry.fingerprint and oldEntry[1] == entry.compressMethod:
+            # Copies local header, compressed data and data descriptor of the unchanged file.
+            entry.compressType, oldOffset, oldEndOffset, entry.crc, entry.size, entry.compressedSize = oldEntry[2:8]
+            queue.AddData(lambda entry=entry, size=oldEndOffset - oldOffset: __PlaceZipEntry(entry, wfile.tell(), size))
+            queue.AddCopy(rfile, oldOffset, oldEndOffset - oldOffset)
+            continue
+
+        level: int | None = ZipCompressionPolicy.GetLevel(entry.compressMethod, entry.absSource, entry.fileSize)
+        entry.compressType = ZIP_STORED if level == None else ZIP_DEFLATED
+        entry.stream = DeflateStream(queue, level)
+
+        queue.AddData(lambda entry=entry: __PackZipLocalHeader(entry, wfile.tell()))
+        with open(entry.absSource, "rb") as sourceFile:
+            while data := sourceFile.read(ARCHIVE_BLOCK_SIZE):
+                entry.stream.write(data)
+        entry.stream.Finish()
+        queue.AddData(lambda entry=entry: __PackZipDataDescriptor(entry, wfile.tell()))
+
+    queue.Flush()
+
+    centralDirOffset: int = wfile.tell()
+    for entry in entries:
+        wfile.write(__PackZipCentralDirEntry(entry))
+    centralDirSize: int = wfile.tell() - centralDirOffset
+    wfile.write(__PackZipEnd(len(entries), centralDirOffset, centralDirSize, __MakeZipComment(inputDigest)))
+
+
+def __PlaceZipEntry(entry: ZipEntry, position: int, size: int) -> bytes:
+    entry.offset = position
+    entry.endOffset = position + size
+    return b""
+
+
+def __LoadZipManifest(absManifest: str, absTarget: str) -> dict | None:
+    try:
+        with open(absManifest, "r", encoding="utf-8") as rfile:
+            manifest: dict = json.load(rfile)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != ZIP_MANIFEST_VERSION:
+        return None
+    if util.GetFileFingerprint(absTarget) != tuple(manifest.get("targetFingerprint", ())):
+        return None
+    return manifest
+
+
+def __SaveZipManifest(absManifest: str, absTarget: str, entries: list[ZipEntry]) -> None:
+    entry: ZipEntry
+    manifest: dict = {
+        "version": ZIP_MANIFEST_VERSION,
+        "targetFingerprint": util.GetFileFingerprint(absTarget),
+        # name: source fingerprint, compression method, compression type, offset, end offset, crc, size, compressed size
+        "entries": {entry.name: [entry.fingerprint, entry.compressMethod, entry.compressType, entry.offset, entry.endOffset, entry.crc, entry.size, entry.compressedSize]
+            for entry in entries if not entry.isDir}}
+
+    util.MakeDirsForFile(absManifest)
+    with open(absManifest, "w", encoding="utf-8") as wfile:
+        json.dump(manifest, wfile)
+
+
+def __ResetTarInfo(tarinfo: tarfile.TarInfo) -> tarfile.TarInfo:
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = "root"
+    tarinfo.mtime = GetArchiveTimestamp()
+    tarinfo.mode = 0o755 if tarinfo.isdir() else 0o644
+    return tarinfo
+
+
+def WriteTarFile(absTarget: str, absSourceDir: str, hashFunc: Callable) -> str:
+    """
+    Writes uncompressed TAR archive of directory and returns its hash. Symlinks are followed.
+    Entries are sorted and have fixed times, owners and permissions, so the same input always produces the same bytes.
+    """
+    with util.HashingFileWriter(absTarget, hashFunc) as wfile:
+        with tarfile.open(fileobj=wfile, mode="w|", dereference=True) as tar:
+            tar.add(absSourceDir, arcname=os.curdir, filter=__ResetTarInfo)
+
+    return wfile.hexdigest()
+
+
+def WriteGzTarFile(absTarget: str, absSourceDir: str, hashFunc: Callable, numWorkers: int = 0, level: int = 9) -> str:
+    """
+    Writes gzip compressed TAR archive of directory and returns its hash. Symlinks are followed.
+    Is as reproducible as WriteTarFile.
+    The TAR stream is compressed in blocks on a thread pool into a single gzip member.
+    """
+    numWorkers = numWorkers if numWorkers > 0 else GetDefaultNumArchiveWorkers()
+
+    with util.HashingFileWriter(absTarget, hashFunc) as wfile, ThreadPoolExecutor(max_workers=numWorkers) as pool:
+        queue = DeflateBlockQueue(wfile, pool, numWorkers * 4)
+        stream = DeflateStream(queue, level)
+
+        # Deflate method, no flags, modified time, maximum compression, unknown OS.
+        wfile.write(b"\037\213\010\000" + struct.pack("<L", GetArchiveTimestamp()) + b"\002\377")
+
+        with tarfile.open(fileobj=stream, mode="w|", dereference=True) as tar:
+            tar.add(absSourceDir, arcname=os.curdir, filter=__ResetTarInfo)
+
+        stream.Finish()
+        queue.Flush()
+        wfile.write(struct.pack("<LL", stream.crc & 0xFFFFFFFF, stream.size & 0xFFFFFFFF))
+
+    return wfile.hexdigest()
@@ -0,0 +1,344 @@
+import json
+import os
+import struct
+from dataclasses import dataclass
+from typing import Callable
+from generalsmodbuilder import util
+
+
+BIG_MAGIC = b"BIGF"
+BIG_HEADER_SIZE = 16
+BIG_MAX_SIZE = 0xFFFFFFFF
+BIG_MANIFEST_VERSION = 1
+BIG_DEFAULT_MAX_FRAGMENTATION = 0.25
+
+
+@dataclass(init=False)
+class BigEntry:
+    absSource: str
+    name: str
+    size: int
+    offset: int
+    fingerprint: util.FileFingerprintT | None
+    digest: str
+
+    def __init__(self, absSource: str, name: str):
+        self.absSource = absSource
+        self.name = name
+        self.size = 0
+        self.offset = 0
+        self.fingerprint = None
+        self.digest = ""
+
+
+BigEntriesT = list[BigEntry]
+
+
+def MakeBigEntriesFromDir(absDir: str) -> BigEntriesT:
+    """
+    Returns entries for all files in directory and its sub directories, sorted by name.
+    Entry names are relative to the directory and use backslash separators like the game does.
+    """
+    entries = BigEntriesT()
+    absFiles: list[str] = util.GetSubdirsAndFilesRecursively(absDir)[1]
+    absFile: str
+
+    for absFile in absFiles:
+        name: str = os.path.relpath(absFile, absDir).replace(os.sep, "\\")
+        entries.append(BigEntry(absFile, name))
+
+    entries.sort(key=lambda entry: entry.name.lower())
+    return entries
+
+
+def __EncodeName(name: str) -> bytes:
+    encodedName: bytes = name.encode("utf-8")
+    util.Verify(not b"\0" in encodedName, f"BIG entry name '{name}' must not contain null characters")
+    return encodedName
+
+
+def GetBigIndexSize(entries: BigEntriesT) -> int:
+    entry: BigEntry
+    return BIG_HEADER_SIZE + sum(8 + len(__EncodeName(entry.name)) + 1 for entry in entries)
+
+
+def __PackBigHeader(entries: BigEntriesT, archiveSize: int, indexSize: int) -> bytes:
+    """
+    The BIG header is 'BIGF', the archive size as little endian uint32, the entry count and the index size as big endian uint32.
+    Each index entry is the offset and size of the file as big endian uint32, followed by its null terminated name.
+    The index is padded with zeros up to the index size.
+    """
+    header = bytearray()
+    header += BIG_MAGIC
+    header += struct.pack("<I", archiveSize)
+    header += struct.pack(">II", len(entries), indexSize)
+
+    entry: BigEntry
+    for entry in entries:
+        header += struct.pack(">II", entry.offset, entry.size)
+        header += __EncodeName(entry.name)
+        header += b"\0"
+
+    assert len(header) <= indexSize
+    header += bytes(indexSize - len(header))
+    return bytes(header)
+
+
+def __LayoutBigEntries(entries: BigEntriesT, indexSize: int) -> int:
+    """
+    Sets the size and offset of all entries, one after the other behind the index. Returns the archive size.
+    """
+    offset: int = indexSize
+    entry: BigEntry
+
+    for entry in entries:
+        entry.fingerprint = util.GetFileFingerprint(entry.absSource)
+        util.Verify(entry.fingerprint != None, f"BIG entry source '{entry.absSource}' is not a file")
+        entry.size = entry.fingerprint[1]
+        entry.offset = offset
+        offset += entry.size
+
+    util.Verify(offset <= BIG_MAX_SIZE, f"BIG archive size {offset} exceeds the maximum of {BIG_MAX_SIZE} bytes")
+    return offset
+
+
+def MakeBigHeader(entries: BigEntriesT) -> bytes:
+    """
+    Sets the size and offset of all entries and returns the header and file index of the archive.
+    File data follows the index in the order of the entries.
+    """
+    indexSize: int = GetBigIndexSize(entries)
+    archiveSize: int = __LayoutBigEntries(entries, indexSize)
+    return __PackBigHeader(entries, archiveSize, indexSize)
+
+
+def WriteBigFile(absTarget: str, entries: BigEntriesT, hashFunc: Callable = None) -> str:
+    """
+    Writes BIG archive of entries in one pass. The index is computed from the file sizes upfront,
+    and the file data is streamed from the source files afterwards.
+    With hashFunc, returns the hash of the written archive. The data then passes through this process to be hashed.
+    Without hashFunc, file data is copied by the kernel where possible and an empty string is returned.
+    """
+    header: bytes = MakeBigHeader(entries)
+    entry: BigEntry
+
+    if hashFunc != None:
+        BUF_SIZE = 1024 * 256
+        buffer = bytearray(BUF_SIZE)
+        view = memoryview(buffer)
+        with util.HashingFileWriter(absTarget, hashFunc) as wfile:
+            wfile.write(header)
+            for entry in entries:
+                with open(entry.absSource, "rb", buffering=0) as rfile:
+                    remaining: int = entry.size
+                    while remaining > 0:
+                        readSize: int = rfile.readinto(view[:min(BUF_SIZE, remaining)])
+                        util.Verify(readSize > 0, f"File '{entry.absSource}' changed while writing BIG archive '{absTarget}'")
+                        wfile.write(view[:readSize])
+                        remaining -= readSize
+        return wfile.hexdigest()
+
+    with open(absTarget, "wb") as wfile:
+        wfile.write(header)
+        wfile.flush()
+        for entry in entries:
+            with open(entry.absSource, "rb") as rfile:
+                __CopyFileRange(rfile, wfile, entry.size)
+    return ""
+
+
+def UpdateBigFile(
+        absTarget: str,
+        entries: BigEntriesT,
+        hashFunc: Callable,
+        absManifest: str,
+        maxFragmentation: float = BIG_DEFAULT_MAX_FRAGMENTATION) -> str:
+    """
+    Updates BIG archive of entries in place. The manifest of the last write tells which entries are unchanged,
+    by the stat fingerprint of their source files. Unchanged entries keep their data untouched. Changed entries
+    are written over their old data if they fit, otherwise they are appended, like added entries. Removed entries leave a gap.
+    The index is written with spare room, so that entries can be added without moving data.
+    The archive is rewritten completely when there is no valid manifest, when the index outgrows its room,
+    or when the gaps exceed maxFragmentation of the archive size.
+
+    Returns the hash of the archive file. A rewritten archive is hashed while writing it,
+    an archive that is updated in place is read once after the update to hash it.
+    """
+    manifest: dict = __LoadBigManifest(absManifest)
+
+    # Manifest is deleted first, so that an interrupted update is never mistaken as a valid archive.
+    util.DeleteFile(absManifest)
+
+    header: bytes = None
+    digest: str = ""
+
+    if manifest != None and manifest.get("hashName") == __GetHashName(hashFunc):
+        header = __TryUpdateBigFileInPlace(absTarget, entries, hashFunc, manifest, maxFragmentation)
+        if header != None:
+            # Unchanged data is not rewritten, so the archive needs to be read to hash all of its bytes, gaps included.
+            digest = util.GetFileHash(absTarget, hashFunc, log=False)
+            util.Verify(bool(digest), f"Unable to hash BIG archive '{absTarget}'")
+
+    if header == None:
+        header, digest = __RewriteBigFile(absTarget, entries, hashFunc)
+
+    __SaveBigManifest(absManifest, absTarget, entries, hashFunc, len(header))
+
+    return digest
+
+
+def __TryUpdateBigFileInPlace(absTarget: str, entries: BigEntriesT, hashFunc: Callable, manifest: dict, maxFragmentation: float) -> bytes | None:
+    if util.GetFileFingerprint(absTarget) != tuple(manifest.get("targetFingerprint", ())):
+        return None
+
+    indexSize: int = manifest["indexSize"]
+    if GetBigIndexSize(entries) > indexSize:
+        return None
+
+    oldEntries: dict[str, list] = manifest["entries"]
+    archiveEnd: int = manifest["archiveSize"]
+    pendingEntries = BigEntriesT()
+    entry: BigEntry
+
+    for entry in entries:
+        entry.fingerprint = util.GetFileFingerprint(entry.absSource)
+        util.Verify(entry.fingerprint != None, f"BIG entry source '{entry.absSource}' is not a file")
+        entry.size = entry.fingerprint[1]
+        oldEntry: list = oldEntries.get(entry.name)
+
+        if oldEntry != None and tuple(oldEntry[2]) == entry.fingerprint:
+            entry.offset = oldEntry[0]
+            entry.digest = oldEntry[3]
+        elif oldEntry != None and entry.size <= oldEntry[1]:
+            entry.offset = oldEntry[0]
+            pendingEntries.append(entry)
+        else:
+            entry.offset = archiveEnd
+            archiveEnd += entry.size
+            pendingEntries.append(entry)
+
+    archiveSize: int = max([indexSize] + [entry.offset + entry.size for entry in entries])
+    usedSize: int = indexSize + sum(entry.size for entry in entries)
+
+    if archiveSize > BIG_MAX_SIZE:
+        return None
+    if archiveSize > 0 and (archiveSize - usedSize) / archiveSize > maxFragmentation:
+        return None
+
+    header: bytes = __PackBigHeader(entries, archiveSize, indexSize)
+
+    with open(absTarget, "r+b") as wfile:
+        for entry in pendingEntries:
+            wfile.seek(entry.offset)
+            entry.digest = __CopyEntryWithHash(entry, wfile, hashFunc)
+        wfile.seek(0)
+        wfile.write(header)
+        wfile.truncate(archiveSize)
+
+    return header
+
+
+def __RewriteBigFile(absTarget: str, entries: BigEntriesT, hashFunc: Callable) -> tuple[bytes, str]:
+    """
+    Writes the archive completely and returns its header and the hash of the archive file.
+    """
+    # Leaves room to add entries to the index later without moving data.
+    usedIndexSize: int = GetBigIndexSize(entries)
+    indexSize: int = usedIndexSize + max(1024, usedIndexSize // 4)
+    archiveSize: int = __LayoutBigEntries(entries, indexSize)
+    header: bytes = __PackBigHeader(entries, archiveSize, indexSize)
+    entry: BigEntry
+
+    with util.HashingFileWriter(absTarget, hashFunc) as wfile:
+        wfile.write(header)
+        for entry in entries:
+            entry.digest = __CopyEntryWithHash(entry, wfile, hashFunc)
+
+    return header, wfile.hexdigest()
+
+
+def __CopyEntryWithHash(entry: BigEntry, wfile, hashFunc: Callable) -> str:
+    BUF_SIZE = 1024 * 256
+    hashObj = hashFunc()
+    remaining: int = entry.size
+
+    with open(entry.absSource, "rb") as rfile:
+        while remaining > 0:
+            chunk: bytes = rfile.read(min(BUF_SIZE, remaining))
+            util.Verify(bool(chunk), f"File '{entry.absSource}' changed while writing BIG archive '{wfile.name}'")
+            hashObj.update(chunk)
+            wfile.write(chunk)
+            remaining -= len(chunk)
+
+    return hashObj.hexdigest()
+
+
+def __GetHashName(hashFunc: Callable) -> str:
+    hashObj = hashFunc()
+    return f"{getattr(hashObj, 'name', '')}:{hashObj.digest_size}"
+
+
+def __LoadBigManifest(absManifest: str) -> dict | None:
+    try:
+        with open(absManifest, "r", encoding="utf-8") as rfile:
+            manifest: dict = json.load(rfile)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != BIG_MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def __SaveBigManifest(absManifest: str, absTarget: str, entries: BigEntriesT, hashFunc: Callable, indexSize: int) -> None:
+    entry: BigEntry
+    manifest: dict = {
+        "version": BIG_MANIFEST_VERSION,
+        "hashName": __GetHashName(hashFunc),
+        "targetFingerprint": util.GetFileFingerprint(absTarget),
+        "indexSize": indexSize,
+        "archiveSize": os.path.getsize(absTarget),
+        # name: offset, size, source fingerprint, digest
+        "entries": {entry.name: [entry.offset, entry.size, entry.fingerprint, entry.digest] for entry in entries}}
+
+    util.MakeDirsForFile(absManifest)
+    with open(absManifest, "w", encoding="utf-8") as wfile:
+        json.dump(manifest, wfile)
+
+
+def __CopyFileRange(rfile, wfile, size: int) -> None:
+    """
+    Copies size bytes from the current position of rfile to the end of wfile,
+    with copy_file_range or sendfile where available.
+    """
+    remaining: int = size
+    rfd: int = rfile.fileno()
+    wfd: int = wfile.fileno()
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            while remaining > 0:
+                copiedSize: int = os.copy_file_range(rfd, wfd, remaining)
+                if copiedSize == 0:
+                    break
+                remaining -= copiedSize
+        except OSError:
+            pass
+
+    if remaining > 0 and hasattr(os, "sendfile"):
+        try:
+            while remaining > 0:
+                copiedSize: int = os.sendfile(wfd, rfd, None, remaining)
+                if copiedSize == 0:
+                    break
+                remaining -= copiedSize
+        except OSError:
+            pass
+
+    if remaining > 0:
+        os.lseek(rfd, size - remaining, os.SEEK_SET)
+        os.lseek(wfd, 0, os.SEEK_END)
+        while remaining > 0:
+            chunk: bytes = os.read(rfd, min(1024 * 256, remaining))
+            util.Verify(bool(chunk), f"File '{rfile.name}' changed while writing BIG archive '{wfile.name}'")
+            os.write(wfd, chunk)
+            remaining -= len(chunk)
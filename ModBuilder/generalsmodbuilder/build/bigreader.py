@@ -0,0 +1,266 @@
+import json
+import mmap
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterator
+from generalsmodbuilder.build.bigfile import BIG_MAGIC, BIG_HEADER_SIZE, BigEntriesT, MakeBigEntriesFromDir
+from generalsmodbuilder.build.filehasher import FileHasher, FileHashesT, GetDefaultNumHashWorkers
+from generalsmodbuilder import util
+
+
+BIG_CONTENT_MANIFEST_VERSION = 1
+
+
+@dataclass
+class BigReaderEntry:
+    name: str
+    offset: int
+    size: int
+
+
+class BigReader:
+    """
+    Reads BIG archives without extracting them. The archive is memory mapped and its file index is parsed once,
+    so that entries can be looked up by name and read or hashed at random without copying them to disk.
+    Entry names are looked up case insensitive and with either path separator, like the game does.
+    """
+    absPath: str
+    archiveSize: int
+    entries: list[BigReaderEntry]
+    entryDict: dict[str, BigReaderEntry]
+    __file: object
+    __map: mmap.mmap | None
+
+    def __init__(self, absPath: str):
+        self.absPath = absPath
+        self.archiveSize = 0
+        self.entries = list[BigReaderEntry]()
+        self.entryDict = dict[str, BigReaderEntry]()
+        self.__file = open(absPath, "rb")
+        self.__map = None
+
+        try:
+            fileSize: int = os.fstat(self.__file.fileno()).st_size
+            util.Verify(fileSize >= BIG_HEADER_SIZE, f"BIG archive '{absPath}' is too small")
+            self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__ParseIndex(fileSize)
+        except:
+            self.Close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.Close()
+
+    def Close(self) -> None:
+        if self.__map != None:
+            self.__map.close()
+            self.__map = None
+        if self.__file != None:
+            self.__file.close()
+            self.__file = None
+
+    def __ParseIndex(self, fileSize: int) -> None:
+        data: mmap.mmap = self.__map
+        util.Verify(data[0:4] == BIG_MAGIC, f"File '{self.absPath}' is not a BIG archive")
+
+        self.archiveSize = struct.unpack_from("<I", data, 4)[0]
+        count: int
+        indexSize: int
+        count, indexSize = struct.unpack_from(">II", data, 8)
+        util.Verify(indexSize <= fileSize, f"BIG archive '{self.absPath}' has an index size of {indexSize} beyond its file size of {fileSize}")
+
+        pos: int = BIG_HEADER_SIZE
+        for _ in range(count):
+            util.Verify(pos + 8 <= indexSize, f"BIG archive '{self.absPath}' has a truncated file index")
+            offset: int
+            size: int
+            offset, size = struct.unpack_from(">II", data, pos)
+            nameEnd: int = data.find(b"\0", pos + 8, indexSize)
+            util.Verify(nameEnd >= 0, f"BIG archive '{self.absPath}' has a truncated file index")
+            name: str = data[pos + 8:nameEnd].decode("utf-8", errors="replace")
+            util.Verify(offset + size <= fileSize, f"BIG archive '{self.absPath}' entry '{name}' is beyond its file size of {fileSize}")
+            pos = nameEnd + 1
+
+            entry = BigReaderEntry(name=name, offset=offset, size=size)
+            self.entries.append(entry)
+            # Later entries of the same name are ignored, as the game uses the first one.
+            self.entryDict.setdefault(MakeBigEntryKey(name), entry)
+
+    def FindEntry(self, name: str) -> BigReaderEntry | None:
+        return self.entryDict.get(MakeBigEntryKey(name))
+
+    def ReadEntry(self, entry: BigReaderEntry) -> memoryview:
+        """
+        Returns view of the entry data in the mapped archive. The view must be released before the reader is closed.
+        """
+        return memoryview(self.__map)[entry.offset:entry.offset + entry.size]
+
+    def IterEntryChunks(self, entry: BigReaderEntry, chunkSize: int = 1024 * 256) -> Iterator[memoryview]:
+        with memoryview(self.__map) as view:
+            pos: int = entry.offset
+            end: int = entry.offset + entry.size
+            while pos < end:
+                with view[pos:min(pos + chunkSize, end)] as chunk:
+                    yield chunk
+                pos += chunkSize
+
+    def HashEntry(self, entry: BigReaderEntry, hashFunc: Callable) -> str:
+        hashObj = hashFunc()
+        chunk: memoryview
+        for chunk in self.IterEntryChunks(entry):
+            hashObj.update(chunk)
+        return hashObj.hexdigest()
+
+    def HashEntries(self, hashFunc: Callable, numWorkers: int = 0) -> list[str]:
+        """
+        Returns hashes of all entries in the order of entries, so that entries with duplicate names keep their own hash.
+        Entries are hashed with a thread pool straight from the mapped archive.
+        """
+        numWorkers = numWorkers if numWorkers > 0 else GetDefaultNumHashWorkers()
+        hashes: list[str]
+
+        if numWorkers <= 1 or len(self.entries) <= 1:
+            hashes = [self.HashEntry(entry, hashFunc) for entry in self.entries]
+        else:
+            with ThreadPoolExecutor(max_workers=min(numWorkers, len(self.entries))) as pool:
+                hashes = list(pool.map(lambda entry: self.HashEntry(entry, hashFunc), self.entries))
+
+        return hashes
+
+
+def MakeBigEntryKey(name: str) -> str:
+    return name.replace("/", "\\").lower()
+
+
+@dataclass
+class BigContentEntry:
+    name: str
+    size: int
+    digest: str
+
+
+@dataclass(init=False)
+class BigContentManifest:
+    """
+    Names, sizes and hashes of all files in a BIG archive or in a directory that is packed into one.
+    Manifests of archives and directories are comparable, so that installed archives can be diffed
+    against build outputs without extracting them.
+    """
+    source: str
+    hashName: str
+    entries: dict[str, BigContentEntry]
+
+    def __init__(self, source: str = "", hashName: str = ""):
+        self.source = source
+        self.hashName = hashName
+        self.entries = dict[str, BigContentEntry]()
+
+    def AddEntry(self, name: str, size: int, digest: str) -> None:
+        self.entries.setdefault(MakeBigEntryKey(name), BigContentEntry(name=name, size=size, digest=digest))
+
+    def Save(self, absPath: str) -> None:
+        jManifest: dict = {
+            "version": BIG_CONTENT_MANIFEST_VERSION,
+            "source": self.source,
+            "hashName": self.hashName,
+            "entries": [[entry.name, entry.size, entry.digest] for entry in self.entries.values()]}
+
+        util.MakeDirsForFile(absPath)
+        with open(absPath, "w", encoding="utf-8") as wfile:
+            json.dump(jManifest, wfile, indent=1)
+
+
+@dataclass(init=False)
+class BigContentDiff:
+    added: list[str]
+    removed: list[str]
+    changed: list[str]
+
+    def __init__(self):
+        self.added = list[str]()
+        self.removed = list[str]()
+        self.changed = list[str]()
+
+    def IsEmpty(self) -> bool:
+        return not self.added and not self.removed and not self.changed
+
+
+def __GetHashName(hashFunc: Callable) -> str:
+    hashObj = hashFunc()
+    return f"{getattr(hashObj, 'name', '')}:{hashObj.digest_size}"
+
+
+def MakeBigContentManifestFromBig(absBig: str, hashFunc: Callable, numWorkers: int = 0) -> BigContentManifest:
+    manifest = BigContentManifest(absBig, __GetHashName(hashFunc))
+
+    with BigReader(absBig) as reader:
+        hashes: list[str] = reader.HashEntries(hashFunc, numWorkers)
+        entry: BigReaderEntry
+        digest: str
+        for entry, digest in zip(reader.entries, hashes):
+            manifest.AddEntry(entry.name, entry.size, digest)
+
+    return manifest
+
+
+def MakeBigContentManifestFromDir(absDir: str, hashFunc: Callable, numWorkers: int = 0) -> BigContentManifest:
+    manifest = BigContentManifest(absDir, __GetHashName(hashFunc))
+    entries: BigEntriesT = MakeBigEntriesFromDir(absDir)
+    hasher = FileHasher(hashFunc=hashFunc, numWorkers=numWorkers)
+    hashes: FileHashesT = hasher.HashFiles([entry.absSource for entry in entries])
+
+    for entry in entries:
+        manifest.AddEntry(entry.name, util.GetFileSize(entry.absSource), hashes[entry.absSource])
+
+    return manifest
+
+
+def LoadBigContentManifest(absPath: str) -> BigContentManifest:
+    jsonFile = util.JsonFile(absPath)
+    jManifest: dict = jsonFile.data
+    util.Verify(jManifest.get("version") == BIG_CONTENT_MANIFEST_VERSION, f"BIG content manifest '{absPath}' has an unsupported version")
+
+    manifest = BigContentManifest(jManifest.get("source", ""), jManifest.get("hashName", ""))
+    jEntry: list
+    for jEntry in jManifest.get("entries", []):
+        manifest.AddEntry(jEntry[0], jEntry[1], jEntry[2])
+
+    return manifest
+
+
+def MakeBigContentManifest(path: str, hashFunc: Callable, numWorkers: int = 0) -> BigContentManifest:
+    """
+    Returns content manifest of a BIG archive, a directory or a saved manifest json file.
+    """
+    if os.path.isdir(path):
+        return MakeBigContentManifestFromDir(path, hashFunc, numWorkers)
+    if util.HasFileExt(path, "json"):
+        return LoadBigContentManifest(path)
+    return MakeBigContentManifestFromBig(path, hashFunc, numWorkers)
+
+
+def DiffBigContentManifests(oldManifest: BigContentManifest, newManifest: BigContentManifest) -> BigContentDiff:
+    util.Verify(oldManifest.hashName == newManifest.hashName,
+        f"BIG content manifests of '{oldManifest.source}' and '{newManifest.source}' use different hashes")
+
+    diff = BigContentDiff()
+    key: str
+    newEntry: BigContentEntry
+
+    for key, newEntry in newManifest.entries.items():
+        oldEntry: BigContentEntry = oldManifest.entries.get(key)
+        if oldEntry == None:
+            diff.added.append(newEntry.name)
+        elif oldEntry.size != newEntry.size or oldEntry.digest != newEntry.digest:
+            diff.changed.append(newEntry.name)
+
+    for key, oldEntry in oldManifest.entries.items():
+        if not key in newManifest.entries:
+            diff.removed.append(oldEntry.name)
+
+    return diff
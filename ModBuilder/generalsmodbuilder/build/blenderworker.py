@@ -0,0 +1,162 @@
+import json
+import queue
+import subprocess
+import threading
+from typing import Any
+
+
+# Max seconds to wait for Blender to start up or to export a single file before it is considered hung.
+BLENDER_WORKER_STARTUP_TIMEOUT = 300
+BLENDER_WORKER_EXPORT_TIMEOUT = 600
+
+BLENDER_WORKER_READY = "GMB_BLENDER_WORKER_READY"
+BLENDER_WORKER_RESULT = "GMB_BLENDER_WORKER_RESULT "
+
+# Runs inside Blender. Reads one export request per line from stdin and answers each with one result line on stdout.
+# Blender exits when stdin is closed, which also happens when the builder process terminates.
+BLENDER_WORKER_SCRIPT = f"""
+import bpy
+import json
+import sys
+bpy.ops.preferences.addon_enable(module='io_mesh_w3d')
+print({BLENDER_WORKER_READY!r}, flush=True)
+for line in sys.stdin:
+    if not line.strip():
+        continue
+    request = json.loads(line)
+    try:
+        bpy.ops.wm.open_mainfile(filepath=request['source'])
+        status = bpy.ops.export_mesh.westwood_w3d(filepath=request['target'], **request['args'])
+        result = {{'success': 'FINISHED' in status}}
+    except Exception as e:
+        result = {{'success': False, 'error': str(e)}}
+    print({BLENDER_WORKER_RESULT!r} + json.dumps(result), flush=True)
+"""
+
+
+class BlenderWorker:
+    """
+    Long-lived Blender process that exports W3D files on request. Blender starts up and enables the W3D add-on once,
+    instead of once per exported file. A worker that crashes or hangs is killed and started again with the next request.
+    """
+    exec: str
+    process: subprocess.Popen | None
+    lines: queue.Queue
+    startCount: int
+
+    def __init__(self, exec: str):
+        self.exec = exec
+        self.process = None
+        self.lines = queue.Queue()
+        self.startCount = 0
+
+    def IsRunning(self) -> bool:
+        return self.process != None and self.process.poll() == None
+
+    def Start(self) -> bool:
+        self.Stop()
+
+        args: list[str] = [self.exec, "--background", "--python-expr", BLENDER_WORKER_SCRIPT]
+        self.process = subprocess.Popen(
+            args=args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1)
+        self.lines = queue.Queue()
+        self.startCount += 1
+
+        thread = threading.Thread(target=BlenderWorker.__ReadLines, args=(self.process, self.lines), daemon=True)
+        thread.start()
+
+        if self.__WaitForLine(BLENDER_WORKER_READY, BLENDER_WORKER_STARTUP_TIMEOUT) == None:
+            print(f"Blender worker '{self.exec}' failed to start")
+            self.Stop()
+            return False
+
+        return True
+
+    def Stop(self) -> None:
+        if self.process != None:
+            if self.process.poll() == None:
+                try:
+                    self.process.stdin.close()
+                    self.process.wait(timeout=10)
+                except (OSError, subprocess.TimeoutExpired):
+                    self.process.kill()
+                    self.process.wait()
+            self.process = None
+
+    def Export(self, source: str, target: str, args: dict[str, Any], timeout: float = BLENDER_WORKER_EXPORT_TIMEOUT) -> bool:
+        """
+        Exports source .blend file to target W3D file with the arguments of the W3D export operator. Returns False when
+        the export failed, or when the worker crashed or hung, in which case it is restarted with the next request.
+        """
+        if not self.IsRunning():
+            if not self.Start():
+                return False
+
+        request: str = json.dumps({"source": source, "target": target, "args": args})
+        try:
+            self.process.stdin.write(request + "\n")
+            self.process.stdin.flush()
+        except OSError:
+            print(f"Blender worker crashed before export of '{source}'")
+            self.Stop()
+            return False
+
+        line: str | None = self.__WaitForLine(BLENDER_WORKER_RESULT, timeout)
+        if line == None:
+            print(f"Blender worker crashed or timed out on export of '{source}'")
+            self.Stop()
+            return False
+
+        result: dict = json.loads(line[len(BLENDER_WORKER_RESULT):])
+        if not result.get("success", False):
+            print(f"Blender worker failed to export '{source}': {result.get('error', '')}")
+            return False
+
+        return True
+
+    def __WaitForLine(self, prefix: str, timeout: float) -> str | None:
+        while True:
+            try:
+                line: str | None = self.lines.get(timeout=timeout)
+            except queue.Empty:
+                return None
+            if line == None:
+                # End of output, Blender has exited.
+                return None
+            if line.startswith(prefix):
+                return line
+
+    @staticmethod
+    def __ReadLines(process: subprocess.Popen, lines: queue.Queue) -> None:
+        line: str
+        for line in process.stdout:
+            line = line.rstrip("\r\n")
+            if line.startswith(BLENDER_WORKER_READY) or line.startswith(BLENDER_WORKER_RESULT):
+                lines.put(line)
+            else:
+                # Forward the regular Blender output.
+                print(line)
+        lines.put(None)
+
+
+g_blenderWorkers = dict[str, BlenderWorker]()
+g_blenderWorkersLock = threading.Lock()
+
+
+def GetBlenderWorker(exec: str) -> BlenderWorker:
+    """
+    Returns the Blender worker of this process for the Blender executable. Each process of the process pool keeps its
+    own worker, so that exports run in parallel.
+    """
+    with g_blenderWorkersLock:
+        worker: BlenderWorker = g_blenderWorkers.get(exec)
+        if worker == None:
+            worker = BlenderWorker(exec)
+            g_blenderWorkers[exec] = worker
+        return worker
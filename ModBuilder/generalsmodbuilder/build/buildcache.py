@@ -0,0 +1,288 @@
+import certifi
+import hashlib
+import http.client
+import os
+import shutil
+import ssl
+import threading
+import urllib.error
+import urllib.request
+from typing import Callable
+from generalsmodbuilder import util
+
+
+# Header of remote cache requests and responses with the sha256 hex digest of the entry.
+# Entries are only accepted when their digest matches, so that truncated or corrupted transfers never become entries.
+BUILD_CACHE_DIGEST_HEADER = "X-Content-SHA256"
+
+# Remote cache urls that failed to connect or timed out in this process. Are not requested again for the rest of the run.
+g_disabledRemoteUrls = set[str]()
+g_disabledRemoteUrlsLock = threading.Lock()
+
+
+class BuildCache:
+    """
+    Content addressed store of converted files. Entries are keyed by everything that determines the output of a conversion,
+    which is the source content, the params, the converter and the tools it uses. Outputs are therefore shared between
+    clean builds, branches and projects. The least recently used entries are evicted when the size limit is exceeded.
+    Optionally, entries that are missing locally are downloaded from a remote cache with HTTP GET of the key,
+    and new entries are uploaded with HTTP PUT of the key. Both carry the digest of the entry, which is verified by the receiver.
+    Remote errors are reported and fall back to building locally.
+    After the first connection error or timeout, the remote cache is disabled in the process for the rest of the run.
+    Instances are passed to build processes and hold no open resources.
+    """
+    absDir: str
+    maxSize: int
+    useHardlinks: bool
+    storeDecodedImages: bool
+    remoteUrl: str
+    remoteWrite: bool
+    remoteTimeout: float
+
+    def __init__(
+            self,
+            absDir: str,
+            maxSizeMB: int,
+            useHardlinks: bool = False,
+            storeDecodedImages: bool = False,
+            remoteUrl: str = "",
+            remoteWrite: bool = False,
+            remoteTimeout: float = 10.0):
+        """
+        absDir : str
+            Directory of the cache entries.
+        maxSizeMB : int
+            Size limit of all entries in megabytes.
+        useHardlinks : bool
+            Restore entries as hardlinks where possible instead of copying them.
+            Hardlinked targets must not be modified in place, because that would modify the cache entry as well.
+        storeDecodedImages : bool
+            Store decoded images, like composited PSD files, as entries as well. They are large and therefore opt-in.
+        remoteUrl : str
+            Base url of the remote cache. Is disabled when empty.
+        remoteWrite : bool
+            Upload new entries to the remote cache.
+        remoteTimeout : float
+            Timeout of remote requests in seconds.
+        """
+        self.absDir = absDir
+        self.maxSize = maxSizeMB * 1024 * 1024
+        self.useHardlinks = useHardlinks
+        self.storeDecodedImages = storeDecodedImages
+        self.remoteUrl = remoteUrl
+        self.remoteWrite = remoteWrite
+        self.remoteTimeout = remoteTimeout
+
+    @staticmethod
+    def MakeKey(parts: list[str]) -> str:
+        hashObj = hashlib.sha256()
+        part: str
+        for part in parts:
+            hashObj.update(part.encode("utf-8"))
+            hashObj.update(b"\0")
+        return hashObj.hexdigest()
+
+    def GetEntryPath(self, key: str) -> str:
+        return os.path.join(self.absDir, key[:2], key)
+
+    def Restore(self, key: str, target: str, hashFunc: Callable) -> str | None:
+        """
+        Writes the cache entry of key to target. Returns the digest of the target file, or None if there is no entry.
+        The digest of a hardlinked target is empty and needs to be computed by the caller.
+        """
+        entryPath: str = self.GetEntryPath(key)
+
+        if not os.path.isfile(entryPath):
+            if not self.__IsRemoteEnabled() or not self.__Download(key):
+                return None
+
+        digest: str = None
+
+        if self.useHardlinks:
+            try:
+                os.link(entryPath, target)
+                digest = ""
+            except OSError:
+                pass
+
+        if digest == None:
+            try:
+                digest = util.CopyFileWithHash(entryPath, target, hashFunc)
+            except OSError:
+                # Entry was evicted by another build in the meantime.
+                util.DeleteFile(target)
+                return None
+
+        BuildCache.__Touch(entryPath)
+        return digest
+
+    def Store(self, key: str, source: str) -> bool:
+        """
+        Adds the file of a successful conversion to the cache. The entry is written to a temporary file first,
+        so that concurrent builds never see a partial entry.
+        """
+        if not os.path.isfile(source):
+            return False
+
+        entryPath: str = self.GetEntryPath(key)
+        tmpPath: str = f"{entryPath}.{os.getpid()}.tmp"
+
+        try:
+            util.MakeDirsForFile(entryPath)
+            shutil.copyfile(source, tmpPath)
+            os.replace(tmpPath, entryPath)
+        except OSError:
+            util.DeleteFile(tmpPath)
+            return False
+
+        if self.remoteWrite and self.__IsRemoteEnabled():
+            self.__Upload(key, entryPath)
+
+        return True
+
+    def Evict(self) -> None:
+        """
+        Deletes the least recently used entries until the size of all entries is within the size limit.
+        """
+        timer = util.Timer()
+        print(f"Evict build cache {self.absDir} ...")
+
+        entries = list[tuple[int, int, str]]()
+        totalSize: int = 0
+
+        if os.path.isdir(self.absDir):
+            for dirEntry in os.scandir(self.absDir):
+                if dirEntry.is_dir():
+                    for fileEntry in os.scandir(dirEntry.path):
+                        if fileEntry.is_file() and not fileEntry.name.endswith(".tmp"):
+                            result: os.stat_result = fileEntry.stat()
+                            entries.append((result.st_mtime_ns, result.st_size, fileEntry.path))
+                            totalSize += result.st_size
+
+        evictedCount: int = 0
+
+        if totalSize > self.maxSize:
+            entries.sort()
+            entry: tuple[int, int, str]
+            for entry in entries:
+                if totalSize <= self.maxSize:
+                    break
+                if util.DeleteFile(entry[2]):
+                    totalSize -= entry[1]
+                    evictedCount += 1
+
+        print(f"Evict build cache with {evictedCount} evicted and {len(entries) - evictedCount} remaining entries")
+
+        if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
+            print(f"Evict build cache completed in {timer.GetElapsedSecondsString()} s")
+
+    def __IsRemoteEnabled(self) -> bool:
+        if not self.remoteUrl:
+            return False
+        with g_disabledRemoteUrlsLock:
+            return not self.remoteUrl in g_disabledRemoteUrls
+
+    def __DisableRemote(self, error: OSError) -> None:
+        """
+        Disables the remote cache in this process, so that each following request does not wait for the timeout again.
+        The warning is printed by the first failing request only.
+        """
+        with g_disabledRemoteUrlsLock:
+            if self.remoteUrl in g_disabledRemoteUrls:
+                return
+            g_disabledRemoteUrls.add(self.remoteUrl)
+
+        print(f"Warning: Build cache remote '{self.remoteUrl}' is unreachable and disabled for this build: {error}")
+
+    @staticmethod
+    def __IsConnectionError(error: OSError) -> bool:
+        return isinstance(error, (urllib.error.URLError, ConnectionError, TimeoutError))
+
+    def __MakeRemoteUrl(self, key: str) -> str:
+        return f"{self.remoteUrl}/{key}"
+
+    def __MakeSslContext(self) -> ssl.SSLContext | None:
+        if self.remoteUrl.startswith("https://"):
+            return ssl.create_default_context(cafile=certifi.where())
+        return None
+
+    @staticmethod
+    def MakeEntryDigest(path: str) -> str:
+        """
+        Returns the digest of an entry file that is sent with BUILD_CACHE_DIGEST_HEADER.
+        """
+        return util.GetFileHash(path, hashlib.sha256, log=False)
+
+    def __Download(self, key: str) -> bool:
+        """
+        Downloads the remote entry of key into the local cache. Returns False on miss or error.
+        The entry is only added when the digest of the received bytes matches the digest that the remote sent.
+        """
+        url: str = self.__MakeRemoteUrl(key)
+        entryPath: str = self.GetEntryPath(key)
+        tmpPath: str = f"{entryPath}.{os.getpid()}.tmp"
+
+        try:
+            response: http.client.HTTPResponse
+            with urllib.request.urlopen(url, timeout=self.remoteTimeout, context=self.__MakeSslContext()) as response:
+                util.MakeDirsForFile(entryPath)
+                with util.HashingFileWriter(tmpPath, hashlib.sha256) as wfile:
+                    shutil.copyfileobj(response, wfile)
+                    size: int = wfile.tell()
+                contentLength: str = response.headers.get("Content-Length")
+                if contentLength and int(contentLength) != size:
+                    raise OSError(f"Received {size} of {contentLength} bytes")
+                digest: str = response.headers.get(BUILD_CACHE_DIGEST_HEADER, "").lower()
+                if digest != wfile.hexdigest():
+                    raise OSError(f"Received digest {wfile.hexdigest()} does not match '{digest}'")
+            os.replace(tmpPath, entryPath)
+            return True
+        except urllib.error.HTTPError as error:
+            if error.code != 404:
+                print(f"Warning: Build cache download of '{url}' failed with HTTP {error.code}")
+        except OSError as error:
+            if BuildCache.__IsConnectionError(error):
+                self.__DisableRemote(error)
+            else:
+                print(f"Warning: Build cache download of '{url}' failed: {error}")
+        except ValueError as error:
+            print(f"Warning: Build cache download of '{url}' failed: {error}")
+
+        util.DeleteFile(tmpPath)
+        return False
+
+    def __Upload(self, key: str, path: str) -> bool:
+        url: str = self.__MakeRemoteUrl(key)
+
+        try:
+            digest: str = BuildCache.MakeEntryDigest(path)
+            if not digest:
+                return False
+            with open(path, "rb") as rfile:
+                headers: dict[str, str] = {
+                    "Content-Type": "application/octet-stream",
+                    "Content-Length": str(os.fstat(rfile.fileno()).st_size),
+                    BUILD_CACHE_DIGEST_HEADER: digest}
+                request = urllib.request.Request(url, data=rfile, headers=headers, method="PUT")
+                with urllib.request.urlopen(request, timeout=self.remoteTimeout, context=self.__MakeSslContext()):
+                    pass
+            return True
+        except urllib.error.HTTPError as error:
+            print(f"Warning: Build cache upload to '{url}' failed with HTTP {error.code}")
+        except OSError as error:
+            if BuildCache.__IsConnectionError(error):
+                self.__DisableRemote(error)
+            else:
+                print(f"Warning: Build cache upload to '{url}' failed: {error}")
+        except ValueError as error:
+            print(f"Warning: Build cache upload to '{url}' failed: {error}")
+
+        return False
+
+    @staticmethod
+    def __Touch(path: str) -> None:
+        # The modified time orders the entries for eviction.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
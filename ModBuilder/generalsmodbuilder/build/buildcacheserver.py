@@ -0,0 +1,127 @@
+import hashlib
+import os
+import re
+import shutil
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from generalsmodbuilder.build.buildcache import BUILD_CACHE_DIGEST_HEADER, BuildCache
+from generalsmodbuilder import util
+
+
+class BuildCacheRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the remote build cache protocol from a local build cache directory.
+    GET /<key> responds 200 with the entry and its digest header, or 404 if there is none.
+    PUT /<key> stores the request body as the entry and responds 201. It responds 400 when the body does not match its digest header.
+    Keys are lower case sha256 hex digests. Other paths respond 400.
+    """
+    KEY_REGEX = re.compile("^/([0-9a-f]{64})$")
+
+    cache: BuildCache = None
+    readOnly: bool = False
+
+    def do_GET(self) -> None:
+        key: str = self.__GetKey()
+        if key == None:
+            return
+
+        entryPath: str = self.cache.GetEntryPath(key)
+
+        try:
+            with open(entryPath, "rb") as rfile:
+                digest: str = util.GetFileHash(entryPath, hashlib.sha256, log=False)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(os.fstat(rfile.fileno()).st_size))
+                self.send_header(BUILD_CACHE_DIGEST_HEADER, digest)
+                self.end_headers()
+                shutil.copyfileobj(rfile, self.wfile)
+        except FileNotFoundError:
+            self.send_error(404)
+
+    def do_PUT(self) -> None:
+        key: str = self.__GetKey()
+        if key == None:
+            return
+
+        if self.readOnly:
+            self.send_error(403)
+            return
+
+        contentLength: str = self.headers.get("Content-Length")
+        if not contentLength:
+            self.send_error(411)
+            return
+
+        digest: str = self.headers.get(BUILD_CACHE_DIGEST_HEADER, "").lower()
+        if not digest:
+            self.send_error(400)
+            return
+
+        size: int = int(contentLength)
+        entryPath: str = self.cache.GetEntryPath(key)
+        tmpPath: str = f"{entryPath}.{os.getpid()}.{id(self)}.tmp"
+        util.MakeDirsForFile(entryPath)
+
+        with util.HashingFileWriter(tmpPath, hashlib.sha256) as wfile:
+            BUF_SIZE = 1024 * 64
+            remaining: int = size
+            while remaining > 0:
+                chunk: bytes = self.rfile.read(min(BUF_SIZE, remaining))
+                if not chunk:
+                    break
+                wfile.write(chunk)
+                remaining -= len(chunk)
+
+        if remaining > 0 or wfile.hexdigest() != digest:
+            util.DeleteFile(tmpPath)
+            self.send_error(400)
+            return
+
+        os.replace(tmpPath, entryPath)
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def __GetKey(self) -> str | None:
+        match: re.Match = BuildCacheRequestHandler.KEY_REGEX.match(self.path)
+        if match == None:
+            self.send_error(400)
+            return None
+        return match.group(1)
+
+
+def MakeBuildCacheServer(absDir: str, host: str = "localhost", port: int = 8765, readOnly: bool = False) -> ThreadingHTTPServer:
+    """
+    Creates reference server of the remote build cache. Call serve_forever() to run it and shutdown() to stop it.
+    Port 0 selects a free port, which is then available in server_address.
+    """
+    handlerClass = type("BoundBuildCacheRequestHandler", (BuildCacheRequestHandler,), {
+        "cache": BuildCache(absDir, maxSizeMB=0),
+        "readOnly": readOnly})
+
+    return ThreadingHTTPServer((host, port), handlerClass)
+
+
+def Main(args=None):
+    parser = ArgumentParser(description="Reference server of the remote build cache.")
+    parser.add_argument('--dir', type=str, required=True, help='Directory to store the cache entries in.')
+    parser.add_argument('--host', type=str, default="localhost", help='Host name or address to listen on.')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on.')
+    parser.add_argument('--read-only', action='store_true', help='Rejects uploads.')
+
+    args = parser.parse_args(args=args)
+
+    server: ThreadingHTTPServer = MakeBuildCacheServer(os.path.abspath(args.dir), args.host, args.port, args.read_only)
+    print(f"Serve build cache {os.path.abspath(args.dir)} on http://{server.server_address[0]}:{server.server_address[1]} ...")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,222 @@
+import os
+import sqlite3
+from typing import Iterable
+from generalsmodbuilder import util
+
+
+# path, fingerprint, digest, paramsDigest
+BuildStateRowT = tuple[str, util.FileFingerprintT | None, str, str]
+BuildStateRowsT = dict[str, BuildStateRowT]
+
+# path, fingerprint, digest, md5
+FileStateRowT = tuple[str, util.FileFingerprintT | None, str, str]
+FileStateRowsT = dict[str, FileStateRowT]
+
+# width, height, mode, channels, hasAlpha
+ImageInfoRowT = tuple[int, int, str, int, bool]
+ImageInfoRowsT = dict[str, ImageInfoRowT]
+
+
+class BuildStateStore:
+    """
+    Persists the build diff file infos of all build indices in a single sqlite database.
+    Rows are keyed by build index name and normalized path. They can be looked up, written and deleted individually,
+    which avoids reading and writing the complete build state on every build.
+    Additionally persists the file states that are shared by all build indices,
+    and the image infos of image files, which are keyed by file digest.
+    All digests are created with one hash algorithm. The build state is cleared when the hash algorithm changes.
+    """
+    SCHEMA_VERSION = 5
+    MAX_QUERY_VARIABLES = 500
+
+    absPath: str
+    hashAlgorithm: str
+    connection: sqlite3.Connection
+
+    def __init__(self, absPath: str, hashAlgorithm: str):
+        self.absPath = absPath
+        self.hashAlgorithm = hashAlgorithm
+        self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.Close()
+
+    def Open(self) -> None:
+        if self.connection != None:
+            return
+
+        print(f"Open build state {self.absPath} ...")
+        util.MakeDirsForFile(self.absPath)
+        self.connection = sqlite3.connect(self.absPath)
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+        version: int = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        hashAlgorithm: str = None
+
+        if version == BuildStateStore.SCHEMA_VERSION:
+            row: tuple = self.connection.execute("SELECT value FROM Metadata WHERE key='hashAlgorithm'").fetchone()
+            hashAlgorithm = row[0] if row != None else None
+            if hashAlgorithm != self.hashAlgorithm:
+                print(f"Build state was hashed with '{hashAlgorithm}' and is cleared for '{self.hashAlgorithm}'")
+
+        if version != BuildStateStore.SCHEMA_VERSION or hashAlgorithm != self.hashAlgorithm:
+            with self.connection:
+                self.connection.execute("DROP TABLE IF EXISTS Metadata")
+                self.connection.execute("DROP TABLE IF EXISTS FilePathInfos")
+                self.connection.execute("DROP TABLE IF EXISTS FileStates")
+                self.connection.execute("DROP TABLE IF EXISTS ImageInfos")
+                self.connection.execute(
+                    "CREATE TABLE Metadata ("
+                    "key TEXT NOT NULL PRIMARY KEY, "
+                    "value TEXT NOT NULL) WITHOUT ROWID")
+                self.connection.execute("INSERT INTO Metadata (key, value) VALUES ('hashAlgorithm', ?)", (self.hashAlgorithm,))
+                self.connection.execute(
+                    "CREATE TABLE FilePathInfos ("
+                    "buildIndex TEXT NOT NULL, "
+                    "key TEXT NOT NULL, "
+                    "path TEXT NOT NULL, "
+                    "fingerprint TEXT, "
+                    "digest TEXT NOT NULL, "
+                    "paramsDigest TEXT NOT NULL, "
+                    "PRIMARY KEY (buildIndex, key)) WITHOUT ROWID")
+                self.connection.execute(
+                    "CREATE TABLE FileStates ("
+                    "key TEXT NOT NULL PRIMARY KEY, "
+                    "path TEXT NOT NULL, "
+                    "fingerprint TEXT, "
+                    "digest TEXT NOT NULL, "
+                    "md5 TEXT NOT NULL) WITHOUT ROWID")
+                self.connection.execute(
+                    "CREATE TABLE ImageInfos ("
+                    "key TEXT NOT NULL PRIMARY KEY, "
+                    "width INTEGER NOT NULL, "
+                    "height INTEGER NOT NULL, "
+                    "mode TEXT NOT NULL, "
+                    "channels INTEGER NOT NULL, "
+                    "hasAlpha INTEGER NOT NULL) WITHOUT ROWID")
+                self.connection.execute(f"PRAGMA user_version={BuildStateStore.SCHEMA_VERSION}")
+
+    def Close(self) -> None:
+        if self.connection != None:
+            self.connection.close()
+            self.connection = None
+
+    def HasRows(self, buildIndex: str) -> bool:
+        self.Open()
+        cursor = self.connection.execute("SELECT 1 FROM FilePathInfos WHERE buildIndex=? LIMIT 1", (buildIndex,))
+        return cursor.fetchone() != None
+
+    def LoadRows(self, buildIndex: str, keys: Iterable[str]) -> BuildStateRowsT:
+        """
+        Loads the rows of the given keys. Keys without row are not part of the returned dictionary.
+        """
+        rows = BuildStateRowsT()
+        for key, path, fingerprint, digest, paramsDigest in self.__SelectKeys(
+                "SELECT key, path, fingerprint, digest, paramsDigest FROM FilePathInfos WHERE buildIndex=? AND", (buildIndex,), keys):
+            rows[key] = (path, BuildStateStore.__LoadFingerprint(fingerprint), digest, paramsDigest)
+        return rows
+
+    def LoadKeys(self, buildIndex: str) -> list[str]:
+        self.Open()
+        cursor = self.connection.execute("SELECT key FROM FilePathInfos WHERE buildIndex=?", (buildIndex,))
+        return [row[0] for row in cursor]
+
+    def LoadPaths(self, buildIndex: str) -> list[str]:
+        self.Open()
+        cursor = self.connection.execute("SELECT path FROM FilePathInfos WHERE buildIndex=?", (buildIndex,))
+        return [row[0] for row in cursor]
+
+    def WriteRows(self, buildIndex: str, rows: BuildStateRowsT, deleteKeys: Iterable[str]) -> None:
+        """
+        Writes and deletes rows in one transaction.
+        """
+        self.Open()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO FilePathInfos (buildIndex, key, path, fingerprint, digest, paramsDigest) VALUES (?, ?, ?, ?, ?, ?)",
+                ((buildIndex, key, path, BuildStateStore.__SaveFingerprint(fingerprint), digest, paramsDigest)
+                    for key, (path, fingerprint, digest, paramsDigest) in rows.items()))
+            self.connection.executemany(
+                "DELETE FROM FilePathInfos WHERE buildIndex=? AND key=?",
+                ((buildIndex, key) for key in deleteKeys))
+
+    def LoadFileStateRows(self, keys: Iterable[str]) -> FileStateRowsT:
+        rows = FileStateRowsT()
+        for key, path, fingerprint, digest, md5 in self.__SelectKeys("SELECT key, path, fingerprint, digest, md5 FROM FileStates WHERE", (), keys):
+            rows[key] = (path, BuildStateStore.__LoadFingerprint(fingerprint), digest, md5)
+        return rows
+
+    def LoadUnreferencedFileStateKeys(self) -> list[str]:
+        """
+        Loads the keys of the file states whose files are not part of any build index.
+        """
+        self.Open()
+        cursor = self.connection.execute("SELECT key FROM FileStates WHERE key NOT IN (SELECT key FROM FilePathInfos)")
+        return [row[0] for row in cursor]
+
+    def WriteFileStateRows(self, rows: FileStateRowsT, deleteKeys: Iterable[str]) -> None:
+        """
+        Writes and deletes rows in one transaction.
+        """
+        self.Open()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO FileStates (key, path, fingerprint, digest, md5) VALUES (?, ?, ?, ?, ?)",
+                ((key, path, BuildStateStore.__SaveFingerprint(fingerprint), digest, md5)
+                    for key, (path, fingerprint, digest, md5) in rows.items()))
+            self.connection.executemany(
+                "DELETE FROM FileStates WHERE key=?",
+                ((key,) for key in deleteKeys))
+
+    def LoadImageInfoRows(self, digests: Iterable[str]) -> ImageInfoRowsT:
+        """
+        Loads the image infos of the given file digests. Digests without row are not part of the returned dictionary.
+        """
+        rows = ImageInfoRowsT()
+        for key, width, height, mode, channels, hasAlpha in self.__SelectKeys("SELECT key, width, height, mode, channels, hasAlpha FROM ImageInfos WHERE", (), digests):
+            rows[key] = (width, height, mode, channels, bool(hasAlpha))
+        return rows
+
+    def WriteImageInfoRows(self, rows: ImageInfoRowsT) -> None:
+        self.Open()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO ImageInfos (key, width, height, mode, channels, hasAlpha) VALUES (?, ?, ?, ?, ?, ?)",
+                ((key, width, height, mode, channels, int(hasAlpha))
+                    for key, (width, height, mode, channels, hasAlpha) in rows.items()))
+
+    @staticmethod
+    def __SaveFingerprint(fingerprint: util.FileFingerprintT | None) -> str | None:
+        # Is stored as text, because inode numbers can exceed the signed 64 bit integer range of sqlite.
+        if fingerprint == None:
+            return None
+        return ":".join(str(value) for value in fingerprint)
+
+    @staticmethod
+    def __LoadFingerprint(fingerprint: str | None) -> util.FileFingerprintT | None:
+        if fingerprint == None:
+            return None
+        return tuple(int(value) for value in fingerprint.split(":"))
+
+    def __SelectKeys(self, select: str, args: tuple, keys: Iterable[str]) -> list[tuple]:
+        """
+        Runs select query with an appended key IN (...) condition, in chunks to stay below the sqlite variable limit.
+        """
+        self.Open()
+        result = list[tuple]()
+        keyList: list[str] = list(keys)
+
+        for begin in range(0, len(keyList), BuildStateStore.MAX_QUERY_VARIABLES):
+            chunk: list[str] = keyList[begin:begin + BuildStateStore.MAX_QUERY_VARIABLES]
+            marks: str = ",".join("?" * len(chunk))
+            cursor = self.connection.execute(f"{select} key IN ({marks})", (*args, *chunk))
+            result.extend(cursor)
+
+        return result
+
+
+def MakeBuildStatePath(absBuildDir: str) -> str:
+    return os.path.join(absBuildDir, "BuildState.sqlite")
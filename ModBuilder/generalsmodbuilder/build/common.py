@@ -1,3 +1,5 @@
+import hashlib
+import json
 from re import search, Match
 from generalsmodbuilder.data.common import ParamT, ParamsT
 
@@ -31,3 +33,13 @@ def ParamsToArgs(params: ParamsT, includeRegex: str = None, excludeRegex: str =
 def __AppendParamToArgs(args: list[str], val: ParamT) -> None:
     if strVal := str(val):
         args.append(strVal)
+
+
+def MakeParamsDigest(params: ParamsT) -> str:
+    """
+    Returns digest of params that is independent of dictionary order. Returns empty string for no params.
+    """
+    if params == None:
+        return ""
+    text: str = json.dumps(params, sort_keys=True)
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
@@ -1,23 +1,38 @@
 import concurrent.futures
 import enum
+import io
+import numpy as np
 import os
+import psd_tools
+import subprocess
+import PIL
 import PIL.Image
 import PIL.TiffImagePlugin
-import shutil
 from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass, field
 from psd_tools import PSDImage
 from psd_tools.constants import ColorMode as PSDColorMode
 from enum import Enum, Flag
 from generalsmodbuilder.data.bundles import ParamsT
-from generalsmodbuilder.data.tools import Tool, ToolsT
+from generalsmodbuilder.__version__ import VERSIONSTR
+from generalsmodbuilder.data.tools import Tool, ToolFile, ToolsT
+from generalsmodbuilder.build.archivefile import MakeZipInputDigest, ReadZipInputDigest, WriteGzTarFile, WriteTarFile, WriteZipFile, ZipCompressionPolicy
 from generalsmodbuilder.build.caseinsensitivedict import CaseInsensitiveDict
-from generalsmodbuilder.build.common import ParamsToArgs
-from generalsmodbuilder.build.thing import BuildFile, BuildThing
+from generalsmodbuilder.build.blenderworker import BlenderWorker, GetBlenderWorker
+from generalsmodbuilder.build.bigfile import BIG_DEFAULT_MAX_FRAGMENTATION, BigEntriesT, MakeBigEntriesFromDir, UpdateBigFile, WriteBigFile
+from generalsmodbuilder.build.buildcache import BuildCache
+from generalsmodbuilder.build.common import MakeParamsDigest, ParamsToArgs
+from generalsmodbuilder.build.gametext import GAME_TEXT_CONVERTER_VERSION, CompileStrToCsf, DecompileCsfToStr, GameTextLanguage, MakeGameTextLanguageFromStr, MakeGameTextLanguagesFromStr
+from generalsmodbuilder.build.ddsfile import DDS_ENCODER_VERSION, DdsFormat, DdsQuality, EncodeDdsFile, MakeDdsFormatFromCrunchArg, MakeDdsQualityFromStr
+from generalsmodbuilder.build.imagecache import DecodedImageCache, GetDecodedImageCache
+from generalsmodbuilder.build.imageops import IMAGE_OPS_VERSION, CompositeAlphaChannels, ResizeImageChannels
+from generalsmodbuilder.build.imageinfo import HasImageInfo, ImageInfo, ImageInfosT, ReadImageInfo
+from generalsmodbuilder.build.filehasher import DEFAULT_DIFF_HASH_ALGORITHM, FileHashesT, GetDiffHashFunction
+from generalsmodbuilder.build.thing import BuildFile, BuildFilesT, BuildThing
 from generalsmodbuilder import util
 from PIL.Image import Image as PILImage
 from PIL.Image import Resampling
-from typing import Callable
+from typing import Any, Callable
 
 
 class BuildFileType(Enum):
@@ -82,6 +97,8 @@ CrunchTextureFormatSet: set[str] = {
     "-A8R8G8B8"
 }
 
+CrunchTextureFormatLowerSet: set[str] = {format.lower() for format in CrunchTextureFormatSet}
+
 
 class BuildCopyOption(Flag):
     Zero = 0
@@ -95,12 +112,16 @@ class BuildCopyPrintType(Enum):
     Copy = enum.auto()
     Link = enum.auto()
     Make = enum.auto()
+    Restore = enum.auto()
+    Keep = enum.auto()
 
 
 @dataclass
 class BuildCopyResult:
     success: bool = field(default=False)
     printType: BuildCopyPrintType = field(default=BuildCopyPrintType.Nothing)
+    # Digest of the target file, computed while writing it. Is empty when the target is a symlink or written by a tool.
+    digest: str = field(default="")
 
 
 BuildCopyResultFunctionT = Callable[[str, str], None]
@@ -112,6 +133,62 @@ class BuildJob:
     absSource: str
     absTarget: str
     params: ParamsT
+    sourceType: BuildFileType
+    targetType: BuildFileType
+    # Is hashed by the copy when it needs it and it is empty.
+    sourceDigest: str
+    # Files of a source directory without digest are hashed by the copy when it needs them.
+    sourceFileDigests: FileHashesT | None
+    # Is set to the image info of the source when the copy needed it.
+    sourceImageInfo: ImageInfo | None
+
+    def __init__(
+            self,
+            absSource: str,
+            absTarget: str,
+            params: ParamsT = None,
+            sourceType = BuildFileType.Auto,
+            targetType = BuildFileType.Auto,
+            sourceDigest: str = "",
+            sourceFileDigests: FileHashesT = None,
+            sourceImageInfo: ImageInfo = None):
+        self.result = BuildCopyResult()
+        self.absSource = absSource
+        self.absTarget = absTarget
+        self.params = params
+        self.sourceType = sourceType
+        self.targetType = targetType
+        self.sourceDigest = sourceDigest
+        self.sourceFileDigests = sourceFileDigests
+        self.sourceImageInfo = sourceImageInfo
+
+
+BuildJobsT = list[BuildJob]
+BuildCopyBatchFunctionT = Callable[[BuildJobsT], None]
+
+
+def GetDefaultNumCopyProcesses() -> int:
+    # The process pool on Windows supports 61 processes at most.
+    return min(os.cpu_count() or 1, 61)
+
+
+class BuildThingJobs:
+    thing: BuildThing
+    # Files of each future. A future copies a batch of one or more files.
+    fileGroups: list[BuildFilesT]
+    futures: list[Future]
+
+    def __init__(self, thing: BuildThing):
+        self.thing = thing
+        self.fileGroups = list[BuildFilesT]()
+        self.futures = list[Future]()
+
+    def IsDone(self) -> bool:
+        future: Future
+        for future in self.futures:
+            if not future.done():
+                return False
+        return True
 
 
 @dataclass
@@ -119,6 +196,14 @@ class BuildCopy:
     tools: ToolsT
     options: BuildCopyOption = field(default=BuildCopyOption.Zero)
     processPool: ProcessPoolExecutor = field(default=None)
+    # Number of processes of the process pool.
+    numProcesses: int = field(default=1)
+    hashAlgorithm: str = field(default=DEFAULT_DIFF_HASH_ALGORITHM)
+    cache: BuildCache = field(default=None)
+    # Digests and image infos of the sources of the jobs that are copied, by source path.
+    sourceDigests: dict[str, str] = field(default_factory=dict)
+    sourceFileDigests: dict[str, FileHashesT] = field(default_factory=dict)
+    imageInfos: ImageInfosT = field(default_factory=ImageInfosT)
 
     def CopyThing(self, thing: BuildThing) -> bool:
         if self.processPool != None:
@@ -128,48 +213,92 @@ class BuildCopy:
 
 
     def CopyThingSingleProcess(self, thing: BuildThing) -> bool:
-        success: bool = True
+        files = BuildFilesT()
+        buildJobs = BuildJobsT()
         file: BuildFile
 
         for file in thing.files:
             if file.RequiresRebuild():
-                absSource: str = file.AbsSource()
-                absTarget: str = file.AbsTarget(thing.absParentDir)
-                params: ParamsT = file.params
-                result: BuildCopyResult = self.Copy(absSource, absTarget, params)
-                success &= result.success
-                if result.success:
-                    if self.options & BuildCopyOption.EnableLogging:
-                        BuildCopy.__PrintResult(result.printType, absSource, absTarget)
-                else:
-                    raise Exception(f"Unable to copy source '{absSource}' to target '{absTarget}'.")
+                files.append(file)
+                buildJobs.append(BuildJob(file.AbsSource(), file.AbsTarget(thing.absParentDir), file.params,
+                    sourceDigest=file.sourceDigest, sourceFileDigests=file.sourceFileDigests, sourceImageInfo=file.sourceImageInfo))
 
-        return success
+        self.CopyJobs(buildJobs)
+
+        return self.__FinishJobs(files, buildJobs)
 
 
     def CopyThingMultiProcess(self, thing: BuildThing) -> bool:
-        success: bool = True
+        jobs: BuildThingJobs = self.SubmitThing(thing)
+        concurrent.futures.wait(jobs.futures, return_when=concurrent.futures.ALL_COMPLETED)
+        return self.FinishThing(jobs)
+
+
+    def SubmitThing(self, thing: BuildThing) -> BuildThingJobs:
+        """
+        Submits the copy jobs of all files of thing that require a rebuild to the process pool and returns without waiting.
+        FinishThing must be called when all jobs are done.
+        """
+        assert self.processPool != None
         options = self.options & ~BuildCopyOption.EnableLogging
-        futures = list[Future]()
+        jobs = BuildThingJobs(thing)
+        batches = dict[str, tuple[BuildFilesT, BuildJobsT]]()
         future: Future
         buildJob: BuildJob
         file: BuildFile
 
         for file in thing.files:
             if file.RequiresRebuild():
-                buildJob = BuildJob()
-                buildJob.result = BuildCopyResult()
-                buildJob.absSource = file.AbsSource()
-                buildJob.absTarget = file.AbsTarget(thing.absParentDir)
-                buildJob.params = file.params
-                future = self.processPool.submit(CopyWithProcess, self.tools, options, buildJob)
-                futures.append(future)
-
-        concurrent.futures.wait(futures, return_when=concurrent.futures.ALL_COMPLETED)
-
-        for future in futures:
-            buildJob = future.result()
+                buildJob = BuildJob(file.AbsSource(), file.AbsTarget(thing.absParentDir), file.params,
+                    sourceDigest=file.sourceDigest, sourceFileDigests=file.sourceFileDigests, sourceImageInfo=file.sourceImageInfo)
+                batchName: str = self.__GetBatchName(buildJob)
+
+                if batchName:
+                    batch: tuple[BuildFilesT, BuildJobsT] = batches.setdefault(batchName, (BuildFilesT(), BuildJobsT()))
+                    batch[0].append(file)
+                    batch[1].append(buildJob)
+                else:
+                    future = self.processPool.submit(CopyWithProcess, self.tools, options, self.hashAlgorithm, self.cache, [buildJob])
+                    jobs.fileGroups.append([file])
+                    jobs.futures.append(future)
+
+        # Batches are split into one part per process to keep all processes busy with the jobs of large things.
+        files: BuildFilesT
+        buildJobs: BuildJobsT
+        for files, buildJobs in batches.values():
+            partSize: int = -(-len(buildJobs) // max(1, self.numProcesses))
+            for begin in range(0, len(buildJobs), partSize):
+                end: int = begin + partSize
+                future = self.processPool.submit(CopyWithProcess, self.tools, options, self.hashAlgorithm, self.cache, buildJobs[begin:end])
+                jobs.fileGroups.append(files[begin:end])
+                jobs.futures.append(future)
+
+        return jobs
+
+
+    def FinishThing(self, jobs: BuildThingJobs) -> bool:
+        """
+        Collects the results of the done copy jobs of a thing.
+        """
+        success: bool = True
+        future: Future
+        files: BuildFilesT
+
+        for future, files in zip(jobs.futures, jobs.fileGroups):
+            success &= self.__FinishJobs(files, future.result())
+
+        return success
+
+
+    def __FinishJobs(self, files: BuildFilesT, buildJobs: BuildJobsT) -> bool:
+        success: bool = True
+        file: BuildFile
+        buildJob: BuildJob
+
+        for file, buildJob in zip(files, buildJobs):
             success &= buildJob.result.success
+            file.targetDigest = buildJob.result.digest
+            file.sourceImageInfo = buildJob.sourceImageInfo
             if buildJob.result.success:
                 if self.options & BuildCopyOption.EnableLogging:
                     BuildCopy.__PrintResult(buildJob.result.printType, buildJob.absSource, buildJob.absTarget)
@@ -199,8 +328,77 @@ class BuildCopy:
             sourceType = BuildFileType.Auto,
             targetType = BuildFileType.Auto) -> BuildCopyResult:
 
+        buildJob = BuildJob(source, target, params, sourceType, targetType)
+        self.CopyJobs([buildJob])
+        return buildJob.result
+
+
+    def CopyJobs(self, buildJobs: BuildJobsT) -> None:
+        """
+        Copies the files of all jobs and writes their results to the jobs. Jobs that are converted with the same tool
+        are run together with a single tool invocation where the tool supports it.
+        """
+        batches = dict[BuildCopyBatchFunctionT, BuildJobsT]()
+        cacheKeys = dict[int, str]()
+        buildJob: BuildJob
+
+        self.sourceDigests = dict[str, str]()
+        self.sourceFileDigests = dict[str, FileHashesT]()
+        self.imageInfos = ImageInfosT()
+        for buildJob in buildJobs:
+            if buildJob.sourceDigest:
+                self.sourceDigests[buildJob.absSource] = buildJob.sourceDigest
+            if buildJob.sourceFileDigests:
+                self.sourceFileDigests[buildJob.absSource] = buildJob.sourceFileDigests
+            if buildJob.sourceImageInfo != None:
+                self.imageInfos[buildJob.absSource] = buildJob.sourceImageInfo
+
+        for buildJob in buildJobs:
+            copyFunction: BuildCopyFunctionT | None
+            cacheKey: str
+            copyFunction, cacheKey = self.__PrepareJob(buildJob)
+            if copyFunction == None:
+                continue
+
+            cacheKeys[id(buildJob)] = cacheKey
+            batchFunction: BuildCopyBatchFunctionT = self.__GetBatchCopyFunction(copyFunction)
+
+            if batchFunction != None:
+                batches.setdefault(batchFunction, BuildJobsT()).append(buildJob)
+            else:
+                buildJob.result = copyFunction(buildJob.absSource, buildJob.absTarget, buildJob.params)
+
+        batchFunction: BuildCopyBatchFunctionT
+        batchJobs: BuildJobsT
+        for batchFunction, batchJobs in batches.items():
+            batchFunction(batchJobs)
+
+        for buildJob in buildJobs:
+            cacheKey: str = cacheKeys.get(id(buildJob))
+            if cacheKey and buildJob.result.success:
+                self.cache.Store(cacheKey, buildJob.absTarget)
+            buildJob.sourceImageInfo = self.imageInfos.get(buildJob.absSource)
+
+        self.sourceDigests = dict[str, str]()
+        self.sourceFileDigests = dict[str, FileHashesT]()
+        self.imageInfos = ImageInfosT()
+
+
+    def __PrepareJob(self, buildJob: BuildJob) -> tuple[BuildCopyFunctionT | None, str]:
+        """
+        Prepares the target of a job and returns its copy function and cache key.
+        Returns no copy function when the job is already done.
+        """
+        source: str = buildJob.absSource
+        target: str = buildJob.absTarget
+        params: ParamsT = buildJob.params
+
         if not os.path.exists(source):
-            return BuildCopyResult(success=False)
+            buildJob.result = BuildCopyResult(success=False)
+            return None, ""
+
+        sourceType: BuildFileType = buildJob.sourceType
+        targetType: BuildFileType = buildJob.targetType
 
         if sourceType == BuildFileType.Auto:
             sourceType = GetFileType(source)
@@ -213,10 +411,54 @@ class BuildCopy:
         if self.options & BuildCopyOption.EnableBackup:
             BuildCopy.__CreateBackup(target)
 
-        util.DeleteFileOrDir(target)
+        copyFunction: BuildCopyFunctionT = self.__GetCopyFunction(sourceType, targetType)
+
+        if not self.__UpdatesTargetInPlace(copyFunction, params):
+            util.DeleteFileOrDir(target)
+
+        cacheKey: str = self.__MakeCacheKey(copyFunction, source, sourceType, targetType, params)
+
+        if cacheKey:
+            digest: str = self.cache.Restore(cacheKey, target, self.__GetHashFunction())
+            if digest != None:
+                buildJob.result = BuildCopyResult(success=True, printType=BuildCopyPrintType.Restore, digest=digest)
+                return None, ""
+
+        return copyFunction, cacheKey
+
+
+    def __GetBatchCopyFunction(self, copyFunction: BuildCopyFunctionT) -> BuildCopyBatchFunctionT | None:
+        if copyFunction == self.__CopyToDDS:
+            return self.__CopyToDDSBatch
+
+        if copyFunction == self.__CopyToW3D:
+            return self.__CopyToW3DBatch
+
+        return None
 
+
+    def __GetBatchName(self, buildJob: BuildJob) -> str:
+        """
+        Returns the name of the batch that the job can be run with, or an empty string if the job is not batched.
+        Only jobs that can share a tool invocation are batched. DDS jobs that are copied or encoded natively are not,
+        because their work runs in the process itself.
+        """
+        sourceType: BuildFileType = GetFileType(buildJob.absSource)
+        targetType: BuildFileType = GetFileType(buildJob.absTarget)
         copyFunction: BuildCopyFunctionT = self.__GetCopyFunction(sourceType, targetType)
-        return copyFunction(source, target, params)
+
+        if copyFunction == self.__CopyToDDS:
+            if sourceType == targetType and not bool(buildJob.params):
+                return ""
+            if BuildCopy.__GetNativeDdsEncoding(buildJob.params) != None:
+                return ""
+            # Crunch is invoked once per distinct arguments.
+            return "crunch " + " ".join(ParamsToArgs(buildJob.params if buildJob.params != None else {}, includeRegex="^-"))
+
+        if copyFunction == self.__CopyToW3D:
+            return "blender"
+
+        return ""
 
 
     def Uncopy(self, file: str) -> bool:
@@ -269,6 +511,10 @@ class BuildCopy:
             BuildCopy.__PrintLinkResult(source, target)
         elif type == BuildCopyPrintType.Make:
             BuildCopy.__PrintMakeResult(source, target)
+        elif type == BuildCopyPrintType.Restore:
+            BuildCopy.__PrintRestoreResult(source, target)
+        elif type == BuildCopyPrintType.Keep:
+            BuildCopy.__PrintKeepResult(source, target)
 
 
     @staticmethod
@@ -289,6 +535,18 @@ class BuildCopy:
         print("make", target)
 
 
+    @staticmethod
+    def __PrintRestoreResult(source: str, target: str) -> None:
+        print("With", source)
+        print("restore", target)
+
+
+    @staticmethod
+    def __PrintKeepResult(source: str, target: str) -> None:
+        print("With", source)
+        print("keep", target)
+
+
     @staticmethod
     def __PrintUncopyResult(file: str) -> None:
         print("Remove", file)
@@ -360,95 +618,150 @@ class BuildCopy:
             except OSError:
                 pass
 
-        shutil.copy(src=source, dst=target)
-        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Copy)
+        digest: str = util.CopyFileWithHash(source, target, self.__GetHashFunction())
+        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Copy, digest=digest)
 
 
     def __CopySTRtoCSF(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
-        tmpTarget: str = target + ".tmp"
-        result: BuildCopyResult = self.__CopyToTextFileIfNeeded(source, tmpTarget, params)
-        if result.success:
-            source = tmpTarget
-
         iparams = CaseInsensitiveDict(params)
-        exec: str = self.__GetToolExePath("gametextcompiler")
-        args: list[str] = [exec,
-            "-LOAD_STR", source,
-            "-SAVE_CSF", target]
+        text: str | None = self.__ReadTransformedText(source, params)
+        if text == None:
+            text = BuildCopy.__ReadGameText(source, iparams.get("sourceEncoding"))
 
+        languages: list[GameTextLanguage] = None
         language: str = iparams.get("language")
         if isinstance(language, str) and bool(language):
-            args.extend(["-LOAD_STR_LANGUAGES", language])
+            languages = MakeGameTextLanguagesFromStr(language)
 
-        swapAndSetLanguage: str = iparams.get("swapAndSetLanguage")
-        if isinstance(swapAndSetLanguage, str) and bool(swapAndSetLanguage):
-            args.extend(["-SWAP_AND_SET_LANGUAGE", swapAndSetLanguage])
+        swapAndSetLanguage: GameTextLanguage = None
+        swapAndSetLanguageStr: str = iparams.get("swapAndSetLanguage")
+        if isinstance(swapAndSetLanguageStr, str) and bool(swapAndSetLanguageStr):
+            swapAndSetLanguage = MakeGameTextLanguageFromStr(swapAndSetLanguageStr)
 
-        success: bool = util.RunProcess(args)
-
-        if tmpTarget == source:
-            util.DeleteFile(tmpTarget)
-
-        return BuildCopyResult(success=success, printType=BuildCopyPrintType.Make)
+        data: bytes = CompileStrToCsf(text, languages, swapAndSetLanguage, source)
+        digest: str = util.WriteFileWithHash(target, data, self.__GetHashFunction())
+        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Make, digest=digest)
 
 
     def __CopyCSFtoSTR(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
         iparams = CaseInsensitiveDict(params)
-        exec: str = self.__GetToolExePath("gametextcompiler")
-        args: list[str] = [exec,
-            "-LOAD_CSF", source,
-            "-SAVE_STR", target]
-
+        languages: list[GameTextLanguage] = None
         language: str = iparams.get("language")
         if isinstance(language, str) and bool(language):
-            args.extend(["-SAVE_STR_LANGUAGES", language])
+            languages = MakeGameTextLanguagesFromStr(language)
 
-        success: bool = util.RunProcess(args)
-        return BuildCopyResult(success=success, printType=BuildCopyPrintType.Make)
+        with open(source, "rb") as sourceFile:
+            text: str = DecompileCsfToStr(sourceFile.read(), languages, source)
+
+        data: bytes = text.encode(iparams.get("targetEncoding") or "utf-8")
+        digest: str = util.WriteFileWithHash(target, data, self.__GetHashFunction())
+        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Make, digest=digest)
+
+
+    @staticmethod
+    def __ReadGameText(source: str, sourceEncoding: str | None) -> str:
+        with open(source, "r", encoding=sourceEncoding or "utf-8-sig") as sourceFile:
+            return sourceFile.read()
 
 
     def __CopyToBIG(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
-        exec: str = self.__GetToolExePath("generalsbigcreator")
-        args: list[str] = [exec,
-            "-source", source,
-            "-dest", target]
+        entries: BigEntriesT = MakeBigEntriesFromDir(source)
+        digest: str
+
+        if BuildCopy.__IsIncrementalBig(params):
+            iparams = CaseInsensitiveDict(params)
+            absManifest: str = iparams.get("bigManifest")
+            maxFragmentation: float = iparams.get("bigMaxFragmentation", BIG_DEFAULT_MAX_FRAGMENTATION)
+            util.Verify(bool(absManifest), f"Incremental BIG target '{target}' requires a 'bigManifest' param")
+            digest = UpdateBigFile(target, entries, self.__GetHashFunction(), absManifest, maxFragmentation)
+        else:
+            digest = WriteBigFile(target, entries, self.__GetHashFunction())
 
-        success: bool = util.RunProcess(args)
-        return BuildCopyResult(success=success, printType=BuildCopyPrintType.Make)
+        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Make, digest=digest)
+
+
+    @staticmethod
+    def __IsIncrementalBig(params: ParamsT) -> bool:
+        if not params:
+            return False
+        return bool(CaseInsensitiveDict(params).get("bigIncremental", False))
+
+
+    @staticmethod
+    def __GetZipManifest(params: ParamsT) -> str | None:
+        if not params:
+            return None
+        return CaseInsensitiveDict(params).get("zipManifest", None)
+
+
+    def __UpdatesTargetInPlace(self, copyFunction: BuildCopyFunctionT, params: ParamsT) -> bool:
+        if copyFunction == self.__CopyToBIG:
+            return BuildCopy.__IsIncrementalBig(params)
+        if copyFunction == self.__CopyToZIP:
+            # The previous archive is read to reuse its unchanged entries.
+            return BuildCopy.__GetZipManifest(params) != None
+        return False
 
 
     def __CopyToZIP(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
-        shutil.make_archive(base_name=util.GetFileDirAndName(target), format="zip", root_dir=source)
-        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Make)
+        absManifest: str = BuildCopy.__GetZipManifest(params)
+        util.Verify(absManifest == None or (isinstance(absManifest, str) and bool(absManifest)), "zipManifest must be a file path")
+        iparams = CaseInsensitiveDict(params if params != None else {})
+        compression = ZipCompressionPolicy(iparams.get("zipCompression", None))
+        hashFunc: Callable = self.__GetHashFunction()
+        inputDigest: str = MakeZipInputDigest(source, hashFunc, compression, knownDigests=self.sourceFileDigests.get(source))
+
+        if ReadZipInputDigest(target) == inputDigest:
+            # The existing archive was written from the same input and would be written with the same bytes.
+            return BuildCopyResult(success=True, printType=BuildCopyPrintType.Keep)
+
+        digest: str = WriteZipFile(target, source, hashFunc, compression=compression, absManifest=absManifest, inputDigest=inputDigest)
+        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Make, digest=digest)
 
 
     def __CopyToTAR(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
-        shutil.make_archive(base_name=util.GetFileDirAndName(target), format="tar", root_dir=source)
-        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Make)
+        digest: str = WriteTarFile(target, source, self.__GetHashFunction())
+        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Make, digest=digest)
 
 
     def __CopyToGZTAR(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
-        shutil.make_archive(base_name=util.GetFileDirAndName(target), format="gztar", root_dir=source)
-        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Make)
+        digest: str = WriteGzTarFile(target, source, self.__GetHashFunction())
+        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Make, digest=digest)
 
 
     def __CopyToBMP(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
-        return BuildCopy.__CopyToImage(source, target, params)
+        return self.__CopyToImage(source, target, params)
 
 
     def __CopyToTGA(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
-        return BuildCopy.__CopyToImage(source, target, params)
+        return self.__CopyToImage(source, target, params)
 
 
-    @staticmethod
-    def __CopyToImage(source: str, target: str, params: ParamsT) -> BuildCopyResult:
+    def __CopyToImage(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
         success: bool = False
+        img: PILImage = self.__LoadImage(source, params)
+        digest: str = ""
+
+        if img != None:
+            imgFormat: str = PIL.Image.registered_extensions().get(os.path.splitext(target)[1].lower())
+            buffer = io.BytesIO()
+            img.save(buffer, format=imgFormat, compression=None)
+            img.close()
+            digest = util.WriteFileWithHash(target, buffer.getbuffer(), self.__GetHashFunction())
+            success = True
+
+        return BuildCopyResult(success=success, printType=BuildCopyPrintType.Make, digest=digest)
 
+
+    def __LoadImage(self, source: str, params: ParamsT) -> PILImage | None:
+        """
+        Returns decoded and resized image of source.
+        """
         img: PILImage = None
         fileType: BuildFileType = GetFileType(source)
 
         if fileType == BuildFileType.psd:
-            img = BuildCopy.__BuildImageFromPSD(source)
+            img = self.__LoadCompositedPSD(source)
         elif fileType == BuildFileType.tiff:
             img = BuildCopy.__BuildImageFromTIFF(source)
         else:
@@ -456,11 +769,34 @@ class BuildCopy:
 
         if img != None:
             img = BuildCopy.__ResizeImageWithParams(img, params)
-            img.save(target, compression=None)
-            img.close()
-            success = True
 
-        return BuildCopyResult(success=success, printType=BuildCopyPrintType.Make)
+        return img
+
+
+    def __LoadCompositedPSD(self, source: str) -> PILImage | None:
+        """
+        Returns composited image of a PSD source. Compositing is expensive, so the result is cached for all targets
+        that are built from the same PSD.
+        """
+        imageCache: DecodedImageCache = GetDecodedImageCache()
+        # The digest is known from the build diff, so the PSD is not hashed again in each process.
+        digest: str = self.__GetSourceDigest(source)
+        key: str | None = DecodedImageCache.MakeKey(digest, "psd") if digest else None
+        # Decoded images are only stored on disk when the build cache opts in, because they are large.
+        buildCache: BuildCache | None = self.cache if self.cache != None and self.cache.storeDecodedImages else None
+        img: PILImage | None = None
+
+        if key != None:
+            img = imageCache.Get(key, buildCache)
+            if img != None:
+                return img
+
+        img = BuildCopy.__BuildImageFromPSD(source)
+
+        if key != None and img != None:
+            imageCache.Put(key, img, buildCache)
+
+        return img
 
 
     @staticmethod
@@ -480,19 +816,11 @@ class BuildCopy:
             # Does composite the image and preserves background alpha.
             # If the psd was saved with "Maximize Compatibility", then the precomputed composite is read from it.
             img: PILImage = psd.composite(color=0.0, alpha=1.0)
-            r: PILImage = img.getchannel(0)
-            g: PILImage = img.getchannel(1)
-            b: PILImage = img.getchannel(2)
 
             # Composite alpha from each alpha channel.
-            white: PILImage = PIL.Image.new("L", psd.size, 255)
-            black: PILImage = PIL.Image.new("L", psd.size, 0)
-            a: PILImage = white
-            for channel in range(3, psd.channels):
-                an: PILImage = psd.topil(channel=channel)
-                a = PIL.Image.composite(an, black, a)
+            alphas: list[PILImage] = [psd.topil(channel=channel) for channel in range(3, psd.channels)]
 
-            return PIL.Image.merge("RGBA", (r, g, b, a))
+            return CompositeAlphaChannels(img, alphas)
 
         return None
 
@@ -532,6 +860,173 @@ class BuildCopy:
                 # Simply copy the file when no processing is required.
                 return self.__CopyTo(source, target, params)
 
+        ddsEncoding: tuple[DdsFormat, int] | None = BuildCopy.__GetNativeDdsEncoding(params)
+        if ddsEncoding != None:
+            return self.__EncodeDDS(source, target, params, ddsEncoding)
+
+        crunchArgs: list[str] = self.__MakeCrunchArgs(source, params)
+        tmpSource: str = self.__PrepareCrunchSource(source, target, params)
+        exec: str = self.__GetToolExePath("crunch")
+        args: list[str] = [exec,
+            "-file", tmpSource,
+            "-out", target]
+        args.extend(crunchArgs)
+
+        success: bool = util.RunProcess(args)
+
+        if tmpSource != source:
+            util.DeleteFile(tmpSource)
+
+        return BuildCopyResult(success=success, printType=BuildCopyPrintType.Make)
+
+
+    def __CopyToDDSBatch(self, buildJobs: BuildJobsT) -> None:
+        """
+        Converts textures with as few crunch invocations as possible. Crunch takes multiple input files and writes them
+        to an output directory, named like the input files. Textures with the same crunch arguments and distinct names
+        are crunched together into a temporary directory and then moved to their targets.
+        """
+        batches = dict[tuple[str, ...], list[list[tuple[BuildJob, str]]]]()
+        buildJob: BuildJob
+
+        for buildJob in buildJobs:
+            source: str = buildJob.absSource
+            if ((GetFileType(source) == GetFileType(buildJob.absTarget) and not bool(buildJob.params)) or
+                BuildCopy.__GetNativeDdsEncoding(buildJob.params) != None):
+                buildJob.result = self.__CopyToDDS(source, buildJob.absTarget, buildJob.params)
+                continue
+
+            args: tuple[str, ...] = tuple(self.__MakeCrunchArgs(source, buildJob.params))
+            tmpSource: str = self.__PrepareCrunchSource(source, buildJob.absTarget, buildJob.params)
+            outName: str = BuildCopy.__MakeCrunchOutName(tmpSource).lower()
+
+            # Add to the first batch of the same arguments that does not yet write a file of the same name.
+            batchList: list[list[tuple[BuildJob, str]]] = batches.setdefault(args, [])
+            batch: list[tuple[BuildJob, str]]
+            for batch in batchList:
+                if not any(BuildCopy.__MakeCrunchOutName(other[1]).lower() == outName for other in batch):
+                    batch.append((buildJob, tmpSource))
+                    break
+            else:
+                batchList.append([(buildJob, tmpSource)])
+
+        if not batches:
+            return
+
+        exec: str = self.__GetToolExePath("crunch")
+
+        for args, batchList in batches.items():
+            for batch in batchList:
+                if len(batch) > 1:
+                    self.__RunCrunchBatch(exec, list(args), batch)
+
+                for buildJob, tmpSource in batch:
+                    if not buildJob.result.success:
+                        # Falls back to a single invocation for files that failed or were not batched.
+                        buildJob.result = BuildCopyResult(
+                            success=util.RunProcess([exec, "-file", tmpSource, "-out", buildJob.absTarget, *args]),
+                            printType=BuildCopyPrintType.Make)
+
+                    if tmpSource != buildJob.absSource:
+                        util.DeleteFile(tmpSource)
+
+
+    def __EncodeDDS(self, source: str, target: str, params: ParamsT, ddsEncoding: tuple[DdsFormat | None, int]) -> BuildCopyResult:
+        """
+        Encodes the decoded and resized image straight from memory to the DDS target, without crunch and temporary files.
+        """
+        img: PILImage = self.__LoadImage(source, params)
+        util.Verify(img != None, f"Unable to load image '{source}'")
+
+        format: DdsFormat | None = ddsEncoding[0]
+        if format == None:
+            # Auto select DDS texture format depending on source format, like with crunch.
+            format = DdsFormat.DXT5 if img.mode == "RGBA" or img.mode == "RGBX" else DdsFormat.DXT1
+
+        iparams = CaseInsensitiveDict(params)
+        quality: DdsQuality = MakeDdsQualityFromStr(iparams.get("ddsQuality", DdsQuality.Normal.name))
+        data: bytes = EncodeDdsFile(img, format, ddsEncoding[1], quality)
+        img.close()
+        digest: str = util.WriteFileWithHash(target, data, self.__GetHashFunction())
+        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Make, digest=digest)
+
+
+    @staticmethod
+    def __GetNativeDdsEncoding(params: ParamsT) -> tuple[DdsFormat | None, int] | None:
+        """
+        Returns DDS format and mip count of a conversion that is encoded natively, or None if it requires crunch.
+        Conversions are only encoded natively with param ddsEncoder set to native. Then all conversions to DXT1, DXT5
+        and uncompressed formats are encoded natively and other crunch arguments than mipmap settings are ignored.
+        Only one texture format can be set. Format None means auto selection by alpha channel. Mip count 0 means a full mip chain.
+        """
+        if not params:
+            return None
+
+        iparams = CaseInsensitiveDict(params)
+        ddsEncoder: str = str(iparams.get("ddsEncoder", "")).lower()
+        util.Verify(ddsEncoder in ("", "crunch", "native"), f"DDS encoder '{ddsEncoder}' is not supported")
+        if ddsEncoder != "native":
+            return None
+
+        format: DdsFormat | None = None
+        mipCount: int = 0
+        key: str
+        for key, value in params.items():
+            if not key.startswith("-"):
+                continue
+            keyLower: str = key.lower()
+            if keyLower in CrunchTextureFormatLowerSet:
+                keyFormat: DdsFormat | None = MakeDdsFormatFromCrunchArg(key)
+                util.Verify(keyFormat != None, f"Texture format '{key}' is not supported by the native DDS encoder")
+                util.Verify(format == None, f"Texture format '{key}' conflicts with another texture format for the native DDS encoder")
+                format = keyFormat
+            elif keyLower == "-mipmode":
+                if str(value).lower() == "none":
+                    mipCount = 1
+            elif keyLower == "-maxmips":
+                if mipCount != 1:
+                    mipCount = int(value)
+
+        return format, mipCount
+
+
+    @staticmethod
+    def __RunCrunchBatch(exec: str, args: list[str], batch: list[tuple[BuildJob, str]]) -> None:
+        absOutDir: str = os.path.join(os.path.dirname(batch[0][0].absTarget), f".crunch_{os.getpid()}_{id(batch)}")
+        util.DeleteDir(absOutDir)
+        os.makedirs(absOutDir)
+
+        batchArgs: list[str] = [exec]
+        for buildJob, tmpSource in batch:
+            batchArgs.extend(["-file", tmpSource])
+        batchArgs.extend(["-outdir", absOutDir])
+        batchArgs.extend(args)
+
+        try:
+            util.RunProcess(batchArgs)
+        except subprocess.CalledProcessError:
+            # Files that were written are still used, the others are retried one by one.
+            pass
+
+        for buildJob, tmpSource in batch:
+            absOutFile: str = os.path.join(absOutDir, BuildCopy.__MakeCrunchOutName(tmpSource))
+            if os.path.isfile(absOutFile):
+                os.replace(absOutFile, buildJob.absTarget)
+                buildJob.result = BuildCopyResult(success=True, printType=BuildCopyPrintType.Make)
+
+        util.DeleteDir(absOutDir)
+
+
+    @staticmethod
+    def __MakeCrunchOutName(source: str) -> str:
+        return util.GetFileNameNoExt(source) + ".dds"
+
+
+    def __PrepareCrunchSource(self, source: str, target: str, params: ParamsT) -> str:
+        """
+        Returns the file that crunch converts to the target. Is a temporary TGA file when the source needs processing first.
+        """
+        tmpSourceType: BuildFileType = GetFileType(source)
         tmpSource: str = source
 
         if (BuildCopy.__HasResizeParams(params) or
@@ -542,14 +1037,18 @@ class BuildCopy:
             # 2. When halving source image resolution it introduces unnecessary visual glitches.
             # Therefore, PSD, TIFF and scaled texture is converted to TGA first, and then passed to crunch tool afterwards.
             tmpSource = target + ".tga"
-            tmpSourceType = BuildFileType.tga
             result: BuildCopyResult = self.__CopyToTGA(source, tmpSource, params)
             assert result.success == True
 
-        exec: str = self.__GetToolExePath("crunch")
-        args: list[str] = [exec,
-            "-file", tmpSource,
-            "-out", target,
+        return tmpSource
+
+
+    def __MakeCrunchArgs(self, source: str, params: ParamsT) -> list[str]:
+        """
+        Returns the crunch arguments of a conversion, except for its input and output files.
+        Does not need the converted source that crunch reads, because the texture format is selected from the source header.
+        """
+        args: list[str] = [
             "-fileformat", "dds",
             "-noprogress"]
 
@@ -565,15 +1064,10 @@ class BuildCopy:
 
         if not hasTextureFormat:
             # Auto select DDS texture format depending on source format.
-            hasAlpha: bool = BuildCopy.__HasAlphaChannel(tmpSource, tmpSourceType)
+            hasAlpha: bool = self.__HasAlphaChannel(source, params)
             args.append("-DXT5" if hasAlpha else "-DXT1")
 
-        success: bool = util.RunProcess(args)
-
-        if tmpSource != source:
-            util.DeleteFile(tmpSource)
-
-        return BuildCopyResult(success=success, printType=BuildCopyPrintType.Make)
+        return args
 
 
     @staticmethod
@@ -627,43 +1121,169 @@ class BuildCopy:
                     break
 
         if size != img.size:
-            r: PILImage
-            g: PILImage
-            b: PILImage
-            a: PILImage
-
-            if img.mode == "RGBA":
-                # The RGB channels lose color information on image resize where the Alpha channel is black.
-                # To workaround this issue, resize each channel separately.
-                r, g, b, a = img.split()
-                r = r.resize(size=size, resample=resample)
-                g = g.resize(size=size, resample=resample)
-                b = b.resize(size=size, resample=resample)
-                a = a.resize(size=size, resample=resample)
-                img = PIL.Image.merge("RGBA", (r, g, b, a))
-
-            else:
-                img = img.resize(size=size, resample=resample)
+            # The RGB channels lose color information on image resize where the Alpha channel is black.
+            # To workaround this issue, each channel is resized independently.
+            img = ResizeImageChannels(img, size, resample)
 
         return img
 
 
-    @staticmethod
-    def __HasAlphaChannel(source: str, fileType: BuildFileType) -> bool:
-        hasAlpha: bool = False
+    def __HasAlphaChannel(self, source: str, params: ParamsT) -> bool:
+        """
+        Returns whether the file that crunch reads for source has an alpha channel.
+        PSD, TIFF and resized images are converted to TGA first, which keeps the alpha channel of the source.
+        """
+        fileType: BuildFileType = GetFileType(source)
 
-        if fileType == BuildFileType.psd:
-            psd: PSDImage = PSDImage.open(fp=source)
-            hasAlpha = psd.channels > 3
-
-        elif (fileType == BuildFileType.tga or
-              fileType == BuildFileType.dds or
-              fileType == BuildFileType.tiff):
-            img: PILImage = PIL.Image.open(fp=source)
-            hasAlpha = img.mode == "RGBA" or img.mode == "RGBX"
-            img.close()
+        if BuildCopy.__HasResizeParams(params) or fileType == BuildFileType.psd:
+            fileType = BuildFileType.tga
+
+        if (fileType == BuildFileType.tga or
+            fileType == BuildFileType.dds or
+            fileType == BuildFileType.tiff):
+            info: ImageInfo | None = self.__GetImageInfo(source)
+            return info != None and info.hasAlpha
+
+        return False
+
+
+    def __GetImageInfo(self, source: str) -> ImageInfo | None:
+        """
+        Returns image info of source. Is read from the source header when it is not known from a previous build.
+        """
+        info: ImageInfo | None = self.imageInfos.get(source)
+
+        if info == None and HasImageInfo(source):
+            info = ReadImageInfo(source)
+            if info != None:
+                self.imageInfos[source] = info
+
+        return info
+
+
+    def __MakeCacheKey(
+            self,
+            copyFunction: BuildCopyFunctionT,
+            source: str,
+            sourceType: BuildFileType,
+            targetType: BuildFileType,
+            params: ParamsT) -> str | None:
+        """
+        Returns the build cache key of a conversion, or None if its result is not cached.
+        """
+        if self.cache == None:
+            return None
+
+        toolNames: list[str] = self.__GetCachedToolNames(copyFunction, sourceType, targetType, params)
+        if toolNames == None:
+            return None
+
+        sourceDigest: str = self.__GetSourceDigest(source)
+        if not sourceDigest:
+            return None
+
+        parts: list[str] = [
+            VERSIONSTR,
+            copyFunction.__name__,
+            sourceType.name,
+            targetType.name,
+            self.hashAlgorithm,
+            sourceDigest,
+            MakeParamsDigest(params)]
+
+        parts.extend(self.__GetConverterVersions(copyFunction, params))
+
+        toolName: str
+        for toolName in toolNames:
+            parts.append(self.__MakeToolIdentity(toolName))
+
+        return BuildCache.MakeKey(parts)
+
+
+    def __GetCachedToolNames(self, copyFunction: BuildCopyFunctionT, sourceType: BuildFileType, targetType: BuildFileType, params: ParamsT) -> list[str] | None:
+        """
+        Returns the names of the tools that a cached conversion depends on, or None if the conversion is not cached.
+        Only expensive conversions that write a single target file are cached.
+        """
+        if copyFunction == self.__CopyToDDS:
+            if sourceType == targetType and not bool(params):
+                return None
+            if BuildCopy.__GetNativeDdsEncoding(params) != None:
+                return []
+            return ["crunch"]
+
+        if copyFunction == self.__CopySTRtoCSF or copyFunction == self.__CopyCSFtoSTR:
+            return []
+
+        if copyFunction == self.__CopyToW3D:
+            iparams = CaseInsensitiveDict(params if params != None else {})
+            if iparams.get("w3dCreateIndividualFiles", False) or iparams.get("w3dCreateTextureXmls", False):
+                return None
+            return ["blender"]
+
+        if copyFunction == self.__CopyToBMP or copyFunction == self.__CopyToTGA:
+            return []
+
+        return None
+
+
+    def __GetConverterVersions(self, copyFunction: BuildCopyFunctionT, params: ParamsT) -> list[str]:
+        """
+        Returns the versions of the converters in this process and of the libraries that a cached conversion depends on.
+        """
+        if copyFunction == self.__CopySTRtoCSF or copyFunction == self.__CopyCSFtoSTR:
+            return [GAME_TEXT_CONVERTER_VERSION]
+
+        if copyFunction == self.__CopyToW3D:
+            return []
+
+        # Images are loaded, composited and resized in this process, also before they are crunched.
+        versions: list[str] = [IMAGE_OPS_VERSION, PIL.__version__, psd_tools.__version__, np.__version__]
+
+        if copyFunction == self.__CopyToDDS and BuildCopy.__GetNativeDdsEncoding(params) != None:
+            versions.append(DDS_ENCODER_VERSION)
 
-        return hasAlpha
+        return versions
+
+
+    def __MakeToolIdentity(self, name: str) -> str:
+        tool: Tool = self.tools.get(name)
+        if tool == None:
+            return name
+
+        parts: list[str] = [tool.name, tool.versionStr, str(tool.version)]
+        file: ToolFile
+
+        for file in tool.files:
+            if file.sha256:
+                parts.append(file.sha256)
+            elif file.md5:
+                parts.append(file.md5)
+            elif file.runnable:
+                # Tools without configured hash are identified by size and modified time of the executable.
+                fingerprint: util.FileFingerprintT = util.GetFileFingerprint(file.absTarget)
+                if fingerprint != None:
+                    parts.append(f"{fingerprint[1]}:{fingerprint[0]}")
+
+        return ":".join(parts)
+
+
+    def __GetSourceDigest(self, source: str) -> str:
+        """
+        Returns digest of source. Is hashed only when it is not known from the build diff.
+        """
+        digest: str = self.sourceDigests.get(source, "")
+
+        if not digest:
+            digest = util.GetFileHash(source, self.__GetHashFunction(), log=False)
+            if digest:
+                self.sourceDigests[source] = digest
+
+        return digest
+
+
+    def __GetHashFunction(self) -> Callable:
+        return GetDiffHashFunction(self.hashAlgorithm)
 
 
     def __GetToolExePath(self, name: str) -> str:
@@ -711,7 +1331,21 @@ class BuildCopy:
 
 
     def __CopyToTextFileIfNeeded(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
-        success: bool = False
+        iparams = CaseInsensitiveDict(params)
+        text: str | None = self.__ReadTransformedText(source, params)
+        if text == None:
+            return BuildCopyResult(success=False, printType=BuildCopyPrintType.Make)
+
+        targetEncoding: str = iparams.get("targetEncoding")
+        data: bytes = text.encode(targetEncoding if targetEncoding else "utf-8")
+        digest: str = util.WriteFileWithHash(target, data, self.__GetHashFunction())
+        return BuildCopyResult(success=True, printType=BuildCopyPrintType.Make, digest=digest)
+
+
+    def __ReadTransformedText(self, source: str, params: ParamsT) -> str | None:
+        """
+        Returns text of source with the text transforms of params applied, or None if params has no text transforms.
+        """
         iparams = CaseInsensitiveDict(params)
 
         forceEOL: str = iparams.get("forceEOL")
@@ -734,49 +1368,79 @@ class BuildCopy:
         if doDeleteWhitespace or doDeleteComments or doForceEOL or doEncode or doExclude:
             if not sourceEncoding:
                 sourceEncoding = "utf-8"
-            if not targetEncoding:
-                targetEncoding = "utf-8"
 
             with open(source, "r", encoding=sourceEncoding) as sourceFile:
-                with open(target, "w", encoding=targetEncoding, newline="") as targetFile:
-                    sourceLines: list[str] = [line.rstrip("\r\n") for line in sourceFile]
+                sourceLines: list[str] = [line.rstrip("\r\n") for line in sourceFile]
+
+            # Exclude text inside markers ...
+            if doExclude:
+                sourceLines = BuildCopy.__FilterText(sourceLines, excludeMarkers)
+
+            # Delete comments ...
+            if doDeleteComments:
+                for i, s in enumerate(sourceLines):
+                    sourceLines[i] = s.split(deleteComments, 1)[0]
+
+            # Delete obsolete spaces ...
+            if doDeleteWhitespace:
+                for i, s in enumerate(sourceLines):
+                    sourceLines[i] = " ".join(s.split())
+
+            # Delete empty lines ...
+            if doDeleteWhitespace:
+                sourceLines[:] = [line for line in sourceLines if line.strip()]
+
+            # Set line ending ...
+            if doForceEOL:
+                for i, s in enumerate(sourceLines):
+                    sourceLines[i] = s + forceEOL
+            else:
+                for i, s in enumerate(sourceLines):
+                    sourceLines[i] = s + "\n"
 
-                    # Exclude text inside markers ...
-                    if doExclude:
-                        sourceLines = BuildCopy.__FilterText(sourceLines, excludeMarkers)
+            return "".join(sourceLines)
 
-                    # Delete comments ...
-                    if doDeleteComments:
-                        for i, s in enumerate(sourceLines):
-                            sourceLines[i] = s.split(deleteComments, 1)[0]
+        return None
 
-                    # Delete obsolete spaces ...
-                    if doDeleteWhitespace:
-                        for i, s in enumerate(sourceLines):
-                            sourceLines[i] = " ".join(s.split())
 
-                    # Delete empty lines ...
-                    if doDeleteWhitespace:
-                        sourceLines[:] = [line for line in sourceLines if line.strip()]
+    def __CopyToW3D(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
+        exportArgs: dict[str, Any] = BuildCopy.__MakeW3DExportArgs(source, params)
+        expr = f"""
+import bpy
+bpy.ops.preferences.addon_enable(module='io_mesh_w3d')
+bpy.ops.export_mesh.westwood_w3d(
+    filepath=r'{target}',
+    {", ".join(f"{key}={value!r}" for key, value in exportArgs.items())})
+"""
+
+        exec: str = self.__GetToolExePath("blender")
+        args: list[str] = [exec, source, "--background", "--python-expr", expr]
 
-                    # Set line ending ...
-                    if doForceEOL:
-                        for i, s in enumerate(sourceLines):
-                            sourceLines[i] = s + forceEOL
-                    else:
-                        for i, s in enumerate(sourceLines):
-                            sourceLines[i] = s + "\n"
+        success: bool = util.RunProcess(args)
+        return BuildCopyResult(success=success, printType=BuildCopyPrintType.Make)
 
-                    # Write out ...
-                    for line in sourceLines:
-                        targetFile.write(line)
 
-                    success = True
+    def __CopyToW3DBatch(self, buildJobs: BuildJobsT) -> None:
+        """
+        Exports W3D files with the Blender worker of this process, which stays alive between exports.
+        Files that the worker fails to export are exported with their own Blender invocation afterwards.
+        """
+        worker: BlenderWorker = GetBlenderWorker(self.__GetToolExePath("blender"))
+        buildJob: BuildJob
 
-        return BuildCopyResult(success=success, printType=BuildCopyPrintType.Make)
+        for buildJob in buildJobs:
+            exportArgs: dict[str, Any] = BuildCopy.__MakeW3DExportArgs(buildJob.absSource, buildJob.params)
+            if worker.Export(buildJob.absSource, buildJob.absTarget, exportArgs) and os.path.isfile(buildJob.absTarget):
+                buildJob.result = BuildCopyResult(success=True, printType=BuildCopyPrintType.Make)
+            else:
+                buildJob.result = self.__CopyToW3D(buildJob.absSource, buildJob.absTarget, buildJob.params)
 
 
-    def __CopyToW3D(self, source: str, target: str, params: ParamsT) -> BuildCopyResult:
+    @staticmethod
+    def __MakeW3DExportArgs(source: str, params: ParamsT) -> dict[str, Any]:
+        """
+        Returns the arguments of the W3D export operator, except for the target file.
+        """
         iparams = CaseInsensitiveDict(params)
         w3dExportHierarchy: bool = iparams.get("w3dExportHierarchy", True)
         w3dExportAnimation: bool = iparams.get("w3dExportAnimation", False)
@@ -805,30 +1469,92 @@ class BuildCopy:
         else:
             animation_compression = "U"
 
-        expr = f"""
-import bpy
-bpy.ops.preferences.addon_enable(module='io_mesh_w3d')
-bpy.ops.export_mesh.westwood_w3d(
-    filepath=r'{target}',
-    check_existing=False,
-    file_format='W3D',
-    export_mode='{export_mode}',
-    use_existing_skeleton={w3dUseExistingSkeleton},
-    animation_compression='{animation_compression}',
-    force_vertex_materials={w3dForceVertexMaterials},
-    individual_files={w3dCreateIndividualFiles},
-    create_texture_xmls={w3dCreateTextureXmls})
-"""
+        return {
+            "check_existing": False,
+            "file_format": "W3D",
+            "export_mode": export_mode,
+            "use_existing_skeleton": w3dUseExistingSkeleton,
+            "animation_compression": animation_compression,
+            "force_vertex_materials": w3dForceVertexMaterials,
+            "individual_files": w3dCreateIndividualFiles,
+            "create_texture_xmls": w3dCreateTextureXmls}
 
-        exec: str = self.__GetToolExePath("blender")
-        args: list[str] = [exec, source, "--background", "--python-expr", expr]
 
-        success: bool = util.RunProcess(args)
-        return BuildCopyResult(success=success, printType=BuildCopyPrintType.Make)
+BuildThingCallbackT = Callable[[BuildThing], None]
+
+
+class BuildCopyQueue:
+    """
+    Copies the files of multiple things at the same time. With a process pool, the copy jobs of all submitted things
+    run together and their results are collected as they complete. The callback of a thing is called on this thread
+    as soon as all jobs of that thing are done. Without a process pool, things are copied when they are submitted.
+    """
+    pendingJobs: dict[Future, tuple[BuildCopy, BuildThingJobs, BuildThingCallbackT]]
+    remainingJobCounts: dict[int, int]
+
+    def __init__(self):
+        self.pendingJobs = dict[Future, tuple[BuildCopy, BuildThingJobs, BuildThingCallbackT]]()
+        self.remainingJobCounts = dict[int, int]()
+
+    def IsEmpty(self) -> bool:
+        return not self.pendingJobs
+
+    def Submit(self, copy: BuildCopy, thing: BuildThing, onCopied: BuildThingCallbackT = None) -> None:
+        if copy.processPool == None:
+            copy.CopyThingSingleProcess(thing)
+            BuildCopyQueue.__Notify(thing, onCopied)
+            return
+
+        jobs: BuildThingJobs = copy.SubmitThing(thing)
+
+        if not jobs.futures:
+            copy.FinishThing(jobs)
+            BuildCopyQueue.__Notify(thing, onCopied)
+            return
 
+        future: Future
+        for future in jobs.futures:
+            self.pendingJobs[future] = (copy, jobs, onCopied)
+        self.remainingJobCounts[id(jobs)] = len(jobs.futures)
+
+    def WaitAny(self) -> None:
+        """
+        Waits until at least one job is done and finishes all things whose jobs are done.
+        """
+        if self.pendingJobs:
+            done, notDone = concurrent.futures.wait(self.pendingJobs.keys(), return_when=concurrent.futures.FIRST_COMPLETED)
+            future: Future
+            for future in done:
+                self.__CompleteJob(future)
+
+    def WaitAll(self) -> None:
+        """
+        Waits until all jobs are done and finishes the things in the order their jobs complete.
+        """
+        future: Future
+        for future in concurrent.futures.as_completed(list(self.pendingJobs.keys())):
+            self.__CompleteJob(future)
+
+    def __CompleteJob(self, future: Future) -> None:
+        copy: BuildCopy
+        jobs: BuildThingJobs
+        onCopied: BuildThingCallbackT
+        copy, jobs, onCopied = self.pendingJobs.pop(future)
+
+        self.remainingJobCounts[id(jobs)] -= 1
+
+        if self.remainingJobCounts[id(jobs)] == 0:
+            del self.remainingJobCounts[id(jobs)]
+            copy.FinishThing(jobs)
+            BuildCopyQueue.__Notify(jobs.thing, onCopied)
+
+    @staticmethod
+    def __Notify(thing: BuildThing, onCopied: BuildThingCallbackT) -> None:
+        if onCopied != None:
+            onCopied(thing)
 
 
-def CopyWithProcess(tools: ToolsT, options: BuildCopyOption, buildJob: BuildJob) -> BuildJob:
-    buildCopy = BuildCopy(tools=tools, options=options)
-    buildJob.result = buildCopy.Copy(buildJob.absSource, buildJob.absTarget, buildJob.params)
-    return buildJob
+def CopyWithProcess(tools: ToolsT, options: BuildCopyOption, hashAlgorithm: str, cache: BuildCache, buildJobs: BuildJobsT) -> BuildJobsT:
+    buildCopy = BuildCopy(tools=tools, options=options, hashAlgorithm=hashAlgorithm, cache=cache)
+    buildCopy.CopyJobs(buildJobs)
+    return buildJobs
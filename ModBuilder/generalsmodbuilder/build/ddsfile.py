@@ -0,0 +1,380 @@
+import enum
+import numpy as np
+import struct
+from dataclasses import dataclass
+from enum import Enum
+import PIL
+import PIL.Image
+from PIL.Image import Image as PILImage
+from PIL.Image import Resampling
+from generalsmodbuilder.build.imageops import ResizeChannels
+
+
+# Is part of the build cache keys of natively encoded DDS files. Must be changed when their output changes.
+DDS_ENCODER_VERSION = "1"
+
+DDS_MAGIC = b"DDS "
+DDS_HEADER_SIZE = 124
+DDS_PIXELFORMAT_SIZE = 32
+
+DDSD_CAPS = 0x1
+DDSD_HEIGHT = 0x2
+DDSD_WIDTH = 0x4
+DDSD_PITCH = 0x8
+DDSD_PIXELFORMAT = 0x1000
+DDSD_MIPMAPCOUNT = 0x20000
+DDSD_LINEARSIZE = 0x80000
+
+DDPF_ALPHAPIXELS = 0x1
+DDPF_ALPHA = 0x2
+DDPF_FOURCC = 0x4
+DDPF_RGB = 0x40
+DDPF_LUMINANCE = 0x20000
+
+DDSCAPS_COMPLEX = 0x8
+DDSCAPS_TEXTURE = 0x1000
+DDSCAPS_MIPMAP = 0x400000
+
+
+# Number of 4x4 blocks that are compressed at once. Bounds the memory of the intermediate arrays.
+DDS_BLOCK_CHUNK_SIZE = 1024 * 32
+
+
+class DdsFormat(Enum):
+    DXT1 = enum.auto()
+    DXT5 = enum.auto()
+    A8R8G8B8 = enum.auto()
+    R8G8B8 = enum.auto()
+    A8L8 = enum.auto()
+    L8 = enum.auto()
+    A8 = enum.auto()
+
+
+@dataclass
+class DdsPixelFormat:
+    flags: int
+    fourCC: bytes
+    bitCount: int
+    masks: tuple[int, int, int, int]
+    # Image mode and raw mode that the pixels are packed with. Block compressed formats have no raw mode.
+    mode: str
+    rawMode: str
+    blockSize: int = 0
+
+
+DdsPixelFormats: dict[DdsFormat, DdsPixelFormat] = {
+    DdsFormat.DXT1: DdsPixelFormat(DDPF_FOURCC, b"DXT1", 0, (0, 0, 0, 0), "RGB", "", 8),
+    DdsFormat.DXT5: DdsPixelFormat(DDPF_FOURCC, b"DXT5", 0, (0, 0, 0, 0), "RGBA", "", 16),
+    DdsFormat.A8R8G8B8: DdsPixelFormat(DDPF_RGB | DDPF_ALPHAPIXELS, b"\0\0\0\0", 32, (0xFF0000, 0xFF00, 0xFF, 0xFF000000), "RGBA", "BGRA"),
+    DdsFormat.R8G8B8: DdsPixelFormat(DDPF_RGB, b"\0\0\0\0", 24, (0xFF0000, 0xFF00, 0xFF, 0), "RGB", "BGR"),
+    DdsFormat.A8L8: DdsPixelFormat(DDPF_LUMINANCE | DDPF_ALPHAPIXELS, b"\0\0\0\0", 16, (0xFF, 0, 0, 0xFF00), "LA", "LA"),
+    DdsFormat.L8: DdsPixelFormat(DDPF_LUMINANCE, b"\0\0\0\0", 8, (0xFF, 0, 0, 0), "L", "L"),
+    DdsFormat.A8: DdsPixelFormat(DDPF_ALPHA, b"\0\0\0\0", 8, (0, 0, 0, 0xFF), "A", "L"),
+}
+
+
+class DdsQuality(Enum):
+    """
+    Endpoint selection of the block compression.
+    Fast uses the inset bounding box of the block colors.
+    Normal uses the principal axis of the block colors.
+    High refines the endpoints of Normal with least squares fits to the selected palette indices.
+    """
+    Fast = enum.auto()
+    Normal = enum.auto()
+    High = enum.auto()
+
+
+def MakeDdsQualityFromStr(name: str) -> DdsQuality:
+    quality: DdsQuality
+    for quality in DdsQuality:
+        if quality.name.lower() == name.lower():
+            return quality
+    raise Exception(f"DDS quality '{name}' is not supported")
+
+
+def MakeDdsFormatFromCrunchArg(arg: str) -> DdsFormat | None:
+    """
+    Returns DDS format of a crunch texture format argument, like -A8R8G8B8, or None if the format is not encoded natively.
+    """
+    name: str = arg.lstrip("-").upper()
+    format: DdsFormat
+    for format in DdsFormat:
+        if format.name == name:
+            return format
+    return None
+
+
+def GetDdsMipCount(width: int, height: int, maxMips: int = 0) -> int:
+    """
+    Returns number of mip levels of a full mip chain down to 1x1, limited to maxMips if it is greater than 0.
+    """
+    count: int = max(width, height).bit_length()
+    if maxMips > 0:
+        count = min(count, maxMips)
+    return count
+
+
+def MakeDdsMipImages(img: PILImage, mipCount: int) -> list[PILImage]:
+    """
+    Returns images of all mip levels, starting with img. Each level is box filtered from the previous level.
+    Channels are filtered separately, so that color is kept where alpha is zero.
+    """
+    images: list[PILImage] = [img]
+
+    while len(images) < mipCount:
+        prev: PILImage = images[-1]
+        size: tuple[int, int] = (max(1, prev.width // 2), max(1, prev.height // 2))
+        if prev.mode == "RGBA" or prev.mode == "LA":
+            images.append(PIL.Image.fromarray(ResizeChannels(np.asarray(prev), size, Resampling.BOX), prev.mode))
+        else:
+            images.append(prev.resize(size=size, resample=Resampling.BOX))
+
+    return images
+
+
+def PackDdsHeader(width: int, height: int, mipCount: int, pixelFormat: DdsPixelFormat, pitchOrLinearSize: int) -> bytes:
+    flags: int = DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PIXELFORMAT
+    flags |= DDSD_LINEARSIZE if pixelFormat.flags & DDPF_FOURCC else DDSD_PITCH
+    caps: int = DDSCAPS_TEXTURE
+
+    if mipCount > 1:
+        flags |= DDSD_MIPMAPCOUNT
+        caps |= DDSCAPS_COMPLEX | DDSCAPS_MIPMAP
+
+    return (DDS_MAGIC
+        + struct.pack("<7I", DDS_HEADER_SIZE, flags, height, width, pitchOrLinearSize, 0, mipCount)
+        + bytes(4 * 11)
+        + struct.pack("<2I", DDS_PIXELFORMAT_SIZE, pixelFormat.flags)
+        + pixelFormat.fourCC
+        + struct.pack("<5I", pixelFormat.bitCount, *pixelFormat.masks)
+        + struct.pack("<5I", caps, 0, 0, 0, 0))
+
+
+def __ConvertImage(img: PILImage, mode: str) -> PILImage:
+    if mode == "A":
+        return img.getchannel("A") if "A" in img.getbands() else PIL.Image.new("L", img.size, 255)
+    if img.mode == mode:
+        return img
+    return img.convert(mode)
+
+
+def EncodeDdsFile(img: PILImage, format: DdsFormat, mipCount: int = 0, quality: DdsQuality = DdsQuality.Normal) -> bytes:
+    """
+    Returns DDS file data of img with mipCount mip levels. With mipCount 0, writes a full mip chain.
+    DXT1 and DXT5 are block compressed with quality, the other formats are uncompressed.
+    """
+    pixelFormat: DdsPixelFormat = DdsPixelFormats[format]
+    img = __ConvertImage(img, pixelFormat.mode)
+
+    mipCount = GetDdsMipCount(img.width, img.height, mipCount)
+
+    if pixelFormat.blockSize > 0:
+        pitchOrLinearSize: int = ((img.width + 3) // 4) * ((img.height + 3) // 4) * pixelFormat.blockSize
+    else:
+        pitchOrLinearSize: int = (img.width * pixelFormat.bitCount + 7) // 8
+
+    chunks: list[bytes] = [PackDdsHeader(img.width, img.height, mipCount, pixelFormat, pitchOrLinearSize)]
+    mipImage: PILImage
+
+    for mipImage in MakeDdsMipImages(img, mipCount):
+        if format == DdsFormat.DXT1:
+            chunks.append(EncodeDxt1(np.asarray(mipImage), quality))
+        elif format == DdsFormat.DXT5:
+            chunks.append(EncodeDxt5(np.asarray(mipImage), quality))
+        else:
+            chunks.append(mipImage.tobytes("raw", pixelFormat.rawMode))
+
+    return b"".join(chunks)
+
+
+def MakeDdsBlocks(pixels: np.ndarray) -> np.ndarray:
+    """
+    Returns array of shape (blocks, 16, channels) of all 4x4 pixel blocks of a (height, width, channels) image,
+    in the order of the DDS file. Images with a size that is not a multiple of 4 are padded with their edge pixels.
+    """
+    height: int = pixels.shape[0]
+    width: int = pixels.shape[1]
+    padHeight: int = -height % 4
+    padWidth: int = -width % 4
+
+    if padHeight or padWidth:
+        pixels = np.pad(pixels, ((0, padHeight), (0, padWidth), (0, 0)), mode="edge")
+
+    channels: int = pixels.shape[2]
+    blocks: np.ndarray = pixels.reshape(pixels.shape[0] // 4, 4, pixels.shape[1] // 4, 4, channels)
+    return blocks.transpose(0, 2, 1, 3, 4).reshape(-1, 16, channels)
+
+
+def EncodeDxt1(pixels: np.ndarray, quality: DdsQuality = DdsQuality.Normal) -> bytes:
+    """
+    Returns DXT1 (BC1) blocks of a (height, width, 3 or more channels) image. Alpha is ignored.
+    """
+    blocks: np.ndarray = MakeDdsBlocks(pixels)
+    output = np.empty(len(blocks), dtype=[("color", "<u2", 2), ("indices", "<u4")])
+
+    for begin in range(0, len(blocks), DDS_BLOCK_CHUNK_SIZE):
+        end: int = begin + DDS_BLOCK_CHUNK_SIZE
+        colors, indices = __EncodeColorBlocks(blocks[begin:end, :, 0:3].astype(np.float32), quality)
+        output["color"][begin:end] = colors
+        output["indices"][begin:end] = indices
+
+    return output.tobytes()
+
+
+def EncodeDxt5(pixels: np.ndarray, quality: DdsQuality = DdsQuality.Normal) -> bytes:
+    """
+    Returns DXT5 (BC3) blocks of a (height, width, 4 channels) image.
+    """
+    blocks: np.ndarray = MakeDdsBlocks(pixels)
+    output = np.empty(len(blocks), dtype=[("alpha", "u1", 2), ("alphaIndices", "u1", 6), ("color", "<u2", 2), ("indices", "<u4")])
+
+    for begin in range(0, len(blocks), DDS_BLOCK_CHUNK_SIZE):
+        end: int = begin + DDS_BLOCK_CHUNK_SIZE
+        alpha, alphaIndices = __EncodeAlphaBlocks(blocks[begin:end, :, 3].astype(np.float32))
+        colors, indices = __EncodeColorBlocks(blocks[begin:end, :, 0:3].astype(np.float32), quality)
+        output["alpha"][begin:end] = alpha
+        output["alphaIndices"][begin:end] = alphaIndices
+        output["color"][begin:end] = colors
+        output["indices"][begin:end] = indices
+
+    return output.tobytes()
+
+
+# Weights of the first endpoint for the palette indices 0 to 3 of a 4 color block.
+DXT_COLOR_WEIGHTS = np.array([1.0, 0.0, 2.0 / 3.0, 1.0 / 3.0], dtype=np.float32)
+
+# Weights of the first endpoint for the palette indices 0 to 7 of an 8 alpha block.
+DXT_ALPHA_WEIGHTS = np.array([1.0, 0.0, 6.0 / 7.0, 5.0 / 7.0, 4.0 / 7.0, 3.0 / 7.0, 2.0 / 7.0, 1.0 / 7.0], dtype=np.float32)
+
+DXT_INDEX_SHIFTS_2 = np.arange(16, dtype=np.uint32) * 2
+DXT_INDEX_SHIFTS_3 = np.arange(16, dtype=np.uint64) * 3
+
+
+def __EncodeColorBlocks(colors: np.ndarray, quality: DdsQuality) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns endpoints of shape (blocks, 2) as RGB565 and packed 2 bit indices of shape (blocks) of float colors of
+    shape (blocks, 16, 3). Endpoints are ordered so that the blocks decode in 4 color mode.
+    """
+    if quality == DdsQuality.Fast:
+        minColor: np.ndarray = colors.min(axis=1)
+        maxColor: np.ndarray = colors.max(axis=1)
+        inset: np.ndarray = (maxColor - minColor) / 16.0
+        endpoint0: np.ndarray = maxColor - inset
+        endpoint1: np.ndarray = minColor + inset
+    else:
+        endpoint0, endpoint1 = __GetPrincipalAxisEndpoints(colors)
+
+    packed0, packed1, indices = __QuantizeColorBlocks(colors, endpoint0, endpoint1)
+
+    if quality == DdsQuality.High:
+        for _ in range(2):
+            endpoint0, endpoint1 = __RefineEndpoints(colors, indices, DXT_COLOR_WEIGHTS, endpoint0, endpoint1)
+            packed0, packed1, indices = __QuantizeColorBlocks(colors, endpoint0, endpoint1)
+
+    packedIndices: np.ndarray = (indices.astype(np.uint32) << DXT_INDEX_SHIFTS_2).sum(axis=1, dtype=np.uint32)
+    return np.stack([packed0, packed1], axis=1), packedIndices
+
+
+def __GetPrincipalAxisEndpoints(colors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the endpoints of the extent of the block colors along their principal axis, found with power iteration.
+    """
+    mean: np.ndarray = colors.mean(axis=1)
+    centered: np.ndarray = colors - mean[:, None, :]
+    covariance: np.ndarray = np.einsum("nki,nkj->nij", centered, centered)
+    axis: np.ndarray = colors.max(axis=1) - colors.min(axis=1)
+
+    for _ in range(4):
+        axis = np.einsum("nij,nj->ni", covariance, axis)
+        length: np.ndarray = np.linalg.norm(axis, axis=1, keepdims=True)
+        axis = np.divide(axis, length, out=np.zeros_like(axis), where=length > 0.0)
+
+    projection: np.ndarray = np.einsum("nki,ni->nk", centered, axis)
+    endpoint0: np.ndarray = mean + axis * projection.max(axis=1, keepdims=True)
+    endpoint1: np.ndarray = mean + axis * projection.min(axis=1, keepdims=True)
+    return endpoint0, endpoint1
+
+
+def __RefineEndpoints(
+        values: np.ndarray,
+        indices: np.ndarray,
+        weights: np.ndarray,
+        endpoint0: np.ndarray,
+        endpoint1: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns endpoints that fit the values best for the given palette indices, solved with least squares per block.
+    Blocks without a unique solution keep their endpoints.
+    """
+    a: np.ndarray = weights[indices]
+    b: np.ndarray = 1.0 - a
+    aa: np.ndarray = (a * a).sum(axis=1)
+    bb: np.ndarray = (b * b).sum(axis=1)
+    ab: np.ndarray = (a * b).sum(axis=1)
+    ax: np.ndarray = np.einsum("nk,nki->ni", a, values)
+    bx: np.ndarray = np.einsum("nk,nki->ni", b, values)
+    determinant: np.ndarray = aa * bb - ab * ab
+    valid: np.ndarray = np.abs(determinant) > 1e-6
+    safeDeterminant: np.ndarray = np.where(valid, determinant, 1.0)[:, None]
+
+    refined0: np.ndarray = (ax * bb[:, None] - bx * ab[:, None]) / safeDeterminant
+    refined1: np.ndarray = (bx * aa[:, None] - ax * ab[:, None]) / safeDeterminant
+    return np.where(valid[:, None], refined0, endpoint0), np.where(valid[:, None], refined1, endpoint1)
+
+
+def __QuantizeColorBlocks(colors: np.ndarray, endpoint0: np.ndarray, endpoint1: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns RGB565 endpoints and 2 bit palette indices of shape (blocks, 16) that are closest to the colors.
+    """
+    packed0: np.ndarray = __PackRgb565(endpoint0)
+    packed1: np.ndarray = __PackRgb565(endpoint1)
+
+    # The first endpoint must be greater to select 4 color mode.
+    swap: np.ndarray = packed0 < packed1
+    packed0, packed1 = np.where(swap, packed1, packed0), np.where(swap, packed0, packed1)
+
+    color0: np.ndarray = __UnpackRgb565(packed0)
+    color1: np.ndarray = __UnpackRgb565(packed1)
+    palette: np.ndarray = (DXT_COLOR_WEIGHTS[None, :, None] * color0[:, None, :]
+        + (1.0 - DXT_COLOR_WEIGHTS)[None, :, None] * color1[:, None, :])
+
+    distances: np.ndarray = ((colors[:, :, None, :] - palette[:, None, :, :]) ** 2).sum(axis=3)
+    indices: np.ndarray = distances.argmin(axis=2)
+
+    # Equal endpoints decode in 3 color mode, in which only index 0 is the endpoint color.
+    indices[packed0 == packed1] = 0
+
+    return packed0, packed1, indices
+
+
+def __PackRgb565(color: np.ndarray) -> np.ndarray:
+    color = np.clip(color, 0.0, 255.0)
+    r: np.ndarray = np.rint(color[:, 0] * (31.0 / 255.0)).astype(np.uint16)
+    g: np.ndarray = np.rint(color[:, 1] * (63.0 / 255.0)).astype(np.uint16)
+    b: np.ndarray = np.rint(color[:, 2] * (31.0 / 255.0)).astype(np.uint16)
+    return (r << 11) | (g << 5) | b
+
+
+def __UnpackRgb565(packed: np.ndarray) -> np.ndarray:
+    r: np.ndarray = (packed >> 11) & 0x1F
+    g: np.ndarray = (packed >> 5) & 0x3F
+    b: np.ndarray = packed & 0x1F
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=1).astype(np.float32)
+
+
+def __EncodeAlphaBlocks(alpha: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns endpoints of shape (blocks, 2) and packed 3 bit indices of shape (blocks, 6) of float alpha of shape (blocks, 16).
+    Endpoints are the block extremes in 8 alpha mode.
+    """
+    alpha0: np.ndarray = alpha.max(axis=1)
+    alpha1: np.ndarray = alpha.min(axis=1)
+    palette: np.ndarray = DXT_ALPHA_WEIGHTS[None, :] * alpha0[:, None] + (1.0 - DXT_ALPHA_WEIGHTS)[None, :] * alpha1[:, None]
+
+    indices: np.ndarray = np.abs(alpha[:, :, None] - palette[:, None, :]).argmin(axis=2)
+    indices[alpha0 == alpha1] = 0
+
+    packedIndices: np.ndarray = (indices.astype(np.uint64) << DXT_INDEX_SHIFTS_3).sum(axis=1, dtype=np.uint64)
+    packedBytes: np.ndarray = packedIndices.astype("<u8").view(np.uint8).reshape(-1, 8)[:, 0:6]
+    return np.stack([alpha0, alpha1], axis=1).astype(np.uint8), packedBytes
+
@@ -1,3 +1,4 @@
+import functools
 import importlib
 import subprocess
 import sys
@@ -6,14 +7,21 @@ import threading
 import time
 from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, auto
 from glob import glob
-from generalsmodbuilder.build.common import ParamsToArgs
-from generalsmodbuilder.build.copy import BuildCopy, BuildCopyOption
+from generalsmodbuilder.build.archivefile import ListZipSourceFiles
+from generalsmodbuilder.build.buildcache import BuildCache
+from generalsmodbuilder.build.buildstate import BuildStateRowsT, BuildStateStore, MakeBuildStatePath
+from generalsmodbuilder.build.common import MakeParamsDigest, ParamsToArgs
+from generalsmodbuilder.build.copy import BuildCopy, BuildCopyOption, BuildCopyQueue, BuildFileType, BuildThingCallbackT, GetDefaultNumCopyProcesses, GetFileType
+from generalsmodbuilder.build.filehasher import FileHashesT
+from generalsmodbuilder.build.filestate import FileState, FileStateCache, FileStatesT
 from generalsmodbuilder.build.filehashregistry import FileHash, FileHashRegistry
+from generalsmodbuilder.build.imageinfo import HasImageInfo, ImageInfoCache, ImageInfosT
 from generalsmodbuilder.build.thing import BuildFile, BuildFileStatus, BuildThing, BuildFilesT, BuildThingsT, IsStatusRelevantForBuild
 from generalsmodbuilder.build.setup import BuildSetup, BuildStep
+from generalsmodbuilder.data.cache import Cache, CacheRemoteMode
 from generalsmodbuilder.data.bundles import BundleRegistryDefinition, Bundles, BundlePack, BundleItem, BundleFile, BundleEvent, BundleEventType
 from generalsmodbuilder.data.common import ParamsT
 from generalsmodbuilder.data.folders import Folders
@@ -27,21 +35,26 @@ from typing import Any
 class BuildFilePathInfo:
     # This class is serialized and therefore may be missing attributes.
     path: str
-    modifiedTime: float
-    md5: str
-    params: ParamsT
+    fingerprint: util.FileFingerprintT | None
+    digest: str
+    paramsDigest: str
 
     def Matches(self, other: Any) -> bool:
         try:
-            return self.md5 == other.md5 and self.params == other.params
+            if self.paramsDigest != other.paramsDigest:
+                return False
+            if self.digest and other.digest:
+                return self.digest == other.digest
+            # Hash is deferred when the file size changed. Then the fingerprints differ too.
+            return self.fingerprint == other.fingerprint
         except AttributeError:
             return False
 
-    def GetModifiedTime(self) -> float:
+    def HasFile(self) -> bool:
         try:
-            return self.modifiedTime
+            return self.fingerprint != None or bool(self.digest)
         except AttributeError:
-            return 0.0
+            return False
 
     def GetPath(self) -> str:
         try:
@@ -56,33 +69,67 @@ BuildFilePathInfosT = dict[str, BuildFilePathInfo]
 class BuildDiffRegistry:
     filePathInfos: BuildFilePathInfosT
     lowerPath: bool
+    store: BuildStateStore
+    storeIndex: str
+    storeQueriedKeys: set[str]
 
-    def __init__(self):
+    def __init__(self, store: BuildStateStore = None, storeIndex: str = None):
+        """
+        store : BuildStateStore
+            Optional store to look up file infos from when they are not loaded yet.
+        storeIndex : str
+            Name of the build index in the store.
+        """
         self.filePathInfos = BuildFilePathInfosT()
         self.lowerPath = True
+        self.store = store
+        self.storeIndex = storeIndex
+        self.storeQueriedKeys = set[str]()
 
     def __ProcessPath(self, filepath: str) -> str:
         if self.lowerPath:
             filepath = filepath.lower()
         return filepath
 
-    def AddFile(self, filepath: str, modifiedTime = 0.0, md5: str = "", params: ParamsT = None) -> BuildFilePathInfo:
+    def AddFile(self, filepath: str, fingerprint: util.FileFingerprintT = None, digest: str = "", paramsDigest: str = "") -> BuildFilePathInfo:
         dictpath = self.__ProcessPath(filepath)
-        pathinfo = BuildFilePathInfo(filepath, modifiedTime, md5, params)
+        pathinfo = BuildFilePathInfo(filepath, fingerprint, digest, paramsDigest)
         self.filePathInfos[dictpath] = pathinfo
         return pathinfo
 
     def FindFile(self, filepath: str) -> BuildFilePathInfo | None:
         filepath = self.__ProcessPath(filepath)
-        return self.filePathInfos.get(filepath)
+        info: BuildFilePathInfo = self.filePathInfos.get(filepath)
+        if info == None and self.store != None and not filepath in self.storeQueriedKeys:
+            self.__LoadKeys([filepath])
+            info = self.filePathInfos.get(filepath)
+        return info
+
+    def LoadFiles(self, filepaths: list[str]) -> None:
+        """
+        Loads file infos from the store in bulk. Is an optimization over many individual lookups with FindFile.
+        """
+        if self.store != None:
+            keys: dict[str, None] = dict.fromkeys(self.__ProcessPath(filepath) for filepath in filepaths)
+            self.__LoadKeys([key for key in keys if not key in self.storeQueriedKeys])
+
+    def __LoadKeys(self, keys: list[str]) -> None:
+        if keys:
+            rows: BuildStateRowsT = self.store.LoadRows(self.storeIndex, keys)
+            for key, (path, fingerprint, digest, paramsDigest) in rows.items():
+                self.filePathInfos[key] = BuildFilePathInfo(path, fingerprint, digest, paramsDigest)
+            self.storeQueriedKeys.update(keys)
 
     def GetFilePathList(self) -> list[str]:
         filePathList = list[str]()
-        info: BuildFilePathInfo
-        for info in self.filePathInfos.values():
-            path: str = info.GetPath()
-            if path != "":
-                filePathList.append(path)
+        if self.store != None:
+            filePathList = self.store.LoadPaths(self.storeIndex)
+        else:
+            info: BuildFilePathInfo
+            for info in self.filePathInfos.values():
+                path: str = info.GetPath()
+                if path != "":
+                    filePathList.append(path)
         return filePathList
 
 
@@ -90,26 +137,44 @@ class BuildDiffRegistry:
 class BuildDiff:
     newDiffRegistry: BuildDiffRegistry
     oldDiffRegistry: BuildDiffRegistry
-    loadPath: str
+    store: BuildStateStore
+    storeIndex: str
     includesParentDiff: bool
     registryDict: dict[int, FileHashRegistry]
+    registryMd5s: FileHashesT
 
-    def __init__(self, loadPath: str, includesParentDiff: bool, useFileHashRegistry: bool):
+    def __init__(
+            self,
+            store: BuildStateStore,
+            storeIndex: str,
+            includesParentDiff: bool,
+            useFileHashRegistry: bool,
+            legacyLoadPath: str = None,
+            cache: FileStateCache = None):
         """
-        loadPath : str
-            String path to serialization file.
+        store : BuildStateStore
+            Store to load old diff from and save new diff to.
+        storeIndex : str
+            Name of the build index in the store.
         includesParentDiff : bool
             Diff contains parent file diffs. This option is required when a build step can be run in isolation from other build steps.
             For example if a Build is run without a Release Build, then the Release diff would lose information if it did not store the parent diff.
         useFileHashRegistry : bool
             Intended to be used with file hash registry.
+        legacyLoadPath : str
+            Optional path to a pickled diff of an older Mod Builder version. Is imported into the store once.
+        cache : FileStateCache
+            File state cache to translate the md5 hashes of a legacy diff with. Is required for hash algorithms other than md5.
         """
         self.newDiffRegistry = BuildDiffRegistry()
-        self.oldDiffRegistry = BuildDiffRegistry()
-        self.loadPath = loadPath
+        self.oldDiffRegistry = BuildDiffRegistry(store, storeIndex)
+        self.store = store
+        self.storeIndex = storeIndex
         self.includesParentDiff = includesParentDiff
         self.registryDict = dict[int, FileHashRegistry]() if useFileHashRegistry else None
-        self.TryLoadOldDiffRegistry()
+        self.registryMd5s = FileHashesT()
+        if legacyLoadPath:
+            self.TryImportLegacyDiffRegistry(legacyLoadPath, cache)
 
     def UseFileHashRegistry(self) -> bool:
         return self.registryDict != None
@@ -134,15 +199,72 @@ class BuildDiff:
         else:
             return None
 
-    def TryLoadOldDiffRegistry(self) -> bool:
-        try:
-            self.oldDiffRegistry.filePathInfos = util.LoadPickle(self.loadPath)
-            return True
-        except:
+    def TryImportLegacyDiffRegistry(self, loadPath: str, cache: FileStateCache = None) -> bool:
+        """
+        Imports a legacy diff, which is hashed with md5. With another hash algorithm, the files that still have their
+        legacy md5 are imported with their digest of that hash algorithm, so that upgrading does not force a full rebuild.
+        The other files keep their legacy md5, which does not match any digest, and are rebuilt.
+        """
+        if not os.path.isfile(loadPath):
             return False
 
+        useMd5: bool = self.store.hashAlgorithm == "md5"
+
+        if (useMd5 or cache != None) and not self.store.HasRows(self.storeIndex):
+            try:
+                legacyInfos: BuildFilePathInfosT = util.LoadPickle(loadPath)
+            except:
+                legacyInfos = BuildFilePathInfosT()
+
+            md5s = FileHashesT()
+            states = FileStatesT()
+            if not useMd5:
+                paths: list[str] = [info.GetPath() for info in legacyInfos.values() if os.path.isfile(info.GetPath())]
+                md5s = cache.GetMd5s(paths)
+                states = cache.GetStates(paths, allowDeferredHash=False)
+
+            rows = BuildStateRowsT()
+            info: BuildFilePathInfo
+            for key, info in legacyInfos.items():
+                path: str = info.GetPath()
+                md5: str = getattr(info, "md5", "")
+                paramsDigest: str = MakeParamsDigest(getattr(info, "params", None))
+                if not useMd5 and md5 and md5s.get(path) == md5:
+                    rows[key] = (path, states[path].fingerprint, states[path].digest, paramsDigest)
+                else:
+                    rows[key] = (path, None, md5, paramsDigest)
+            self.store.WriteRows(self.storeIndex, rows, deleteKeys=[])
+
+        util.DeleteFile(loadPath)
+        return True
+
     def SaveNewDiffRegistry(self) -> bool:
-        util.SavePickle(self.loadPath, self.newDiffRegistry.filePathInfos)
+        """
+        Writes new and changed file infos to the store and deletes file infos that no longer exist.
+        """
+        timer = util.Timer()
+        print(f"Save build state {self.storeIndex} ...")
+
+        newInfos: BuildFilePathInfosT = self.newDiffRegistry.filePathInfos
+        self.oldDiffRegistry.LoadFiles(list(newInfos.keys()))
+        oldInfos: BuildFilePathInfosT = self.oldDiffRegistry.filePathInfos
+
+        changedRows = BuildStateRowsT()
+        for key, newInfo in newInfos.items():
+            oldInfo: BuildFilePathInfo = oldInfos.get(key)
+            if oldInfo == None or oldInfo != newInfo:
+                changedRows[key] = (newInfo.path, newInfo.fingerprint, newInfo.digest, newInfo.paramsDigest)
+
+        deletedKeys: list[str] = [key for key in self.store.LoadKeys(self.storeIndex) if not key in newInfos]
+
+        if changedRows or deletedKeys:
+            self.store.WriteRows(self.storeIndex, changedRows, deletedKeys)
+
+        print(f"Save build state {self.storeIndex} with {len(changedRows)} changed and {len(deletedKeys)} deleted files")
+
+        if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
+            print(f"Save build state {self.storeIndex} completed in {timer.GetElapsedSecondsString()} s")
+
         return True
 
 
@@ -160,7 +282,7 @@ def GetBuildIndexName(index: BuildIndex) -> str:
 def MakeThingName(index: BuildIndex, thingName: str) -> str:
     return f"{GetBuildIndexName(index)}_{thingName}"
 
-def MakeDiffPath(index: BuildIndex, folders: Folders) -> str:
+def MakeLegacyDiffPath(index: BuildIndex, folders: Folders) -> str:
     return os.path.join(folders.absBuildDir, f"{GetBuildIndexName(index)}.pickle")
 
 
@@ -187,6 +309,15 @@ def GetFinishBuildEvent(index: BuildIndex) -> BundleEventType:
     return g_buildIndexToFinishBuildEvent.get(index)
 
 
+@dataclass
+class BuildIndexOptions:
+    index: BuildIndex
+    deleteRemovedFiles: bool = field(default=False)
+    deleteObsoleteFiles: bool = field(default=False)
+    diffWithParentThings: bool = field(default=False)
+    diffWithFileHashRegistry: bool = field(default=False)
+
+
 @dataclass(init=False)
 class BuildIndexData:
     index: BuildIndex
@@ -242,10 +373,18 @@ class BuildEngine:
     processPool: ProcessPoolExecutor
     processHandle: subprocess.Popen
     processLock: threading.RLock
+    stateStore: BuildStateStore
+    fileStateCache: FileStateCache
+    imageInfoCache: ImageInfoCache
+    buildCache: BuildCache
 
 
     def __init__(self):
         self.processPool = None
+        self.stateStore = None
+        self.fileStateCache = None
+        self.imageInfoCache = None
+        self.buildCache = None
         self.__Reset()
 
     def __enter__(self):
@@ -263,11 +402,46 @@ class BuildEngine:
         self.processPool = None
         self.processHandle = None
         self.processLock = threading.RLock()
+        self.stateStore = None
+        self.fileStateCache = None
+        self.imageInfoCache = None
+        self.buildCache = None
 
 
     def Shutdown(self) -> None:
         if self.processPool != None:
             self.processPool.shutdown()
+        if self.stateStore != None:
+            self.stateStore.Close()
+
+
+    def __GetStateStore(self) -> BuildStateStore:
+        # Is created on first use, because the build folder can be deleted by the Clean step before.
+        if self.stateStore == None:
+            self.stateStore = BuildStateStore(MakeBuildStatePath(self.setup.folders.absBuildDir), self.setup.diffHashAlgorithm)
+        return self.stateStore
+
+
+    def __GetFileStateCache(self) -> FileStateCache:
+        if self.fileStateCache == None:
+            self.fileStateCache = FileStateCache(self.__GetStateStore(), self.setup.numHashWorkers, self.setup.verboseLogging)
+        return self.fileStateCache
+
+
+    def __SaveFileStateCache(self) -> None:
+        if self.fileStateCache != None:
+            self.fileStateCache.Save()
+
+
+    def __GetImageInfoCache(self) -> ImageInfoCache:
+        if self.imageInfoCache == None:
+            self.imageInfoCache = ImageInfoCache(self.__GetStateStore())
+        return self.imageInfoCache
+
+
+    def __SaveImageInfoCache(self) -> None:
+        if self.imageInfoCache != None:
+            self.imageInfoCache.Save()
 
 
     def Run(self, setup: BuildSetup) -> bool:
@@ -314,6 +488,8 @@ class BuildEngine:
         if success and self.setup.step & BuildStep.Uninstall:
             success &= self.__Uninstall()
 
+        self.__SaveFileStateCache()
+        self.__SaveImageInfoCache()
         self.__Reset()
 
         return success
@@ -355,6 +531,23 @@ class BuildEngine:
         return True
 
 
+    @staticmethod
+    def __HasBundleEvents(setup: BuildSetup, eventType: BundleEventType) -> bool:
+        bundles: Bundles = setup.bundles
+        item: BundleItem
+        pack: BundlePack
+
+        for item in bundles.items:
+            if item.events.get(eventType) != None:
+                return True
+
+        for pack in bundles.packs:
+            if pack.events.get(eventType) != None:
+                return True
+
+        return False
+
+
     @staticmethod
     def __SendBundleEvents(structure: BuildStructure, setup: BuildSetup, eventType: BundleEventType) -> None:
         bundles: Bundles = setup.bundles
@@ -403,22 +596,36 @@ class BuildEngine:
         if self.setup.verboseLogging:
             options |= BuildCopyOption.EnableLogging
 
-        processPool = ProcessPoolExecutor() if self.setup.multiProcessing else None
+        numProcesses: int = GetDefaultNumCopyProcesses()
+        processPool = ProcessPoolExecutor(max_workers=numProcesses) if self.setup.multiProcessing else None
         self.processPool = processPool
+        hashAlgorithm: str = self.setup.diffHashAlgorithm
+        cache: Cache = self.setup.cache
+        buildCache: BuildCache = None
+        if cache != None and cache.enabled:
+            buildCache = BuildCache(
+                absDir=cache.absDir,
+                maxSizeMB=cache.maxSizeMB,
+                useHardlinks=cache.useHardlinks,
+                storeDecodedImages=cache.decodedImages,
+                remoteUrl=cache.remoteUrl,
+                remoteWrite=cache.remoteMode == CacheRemoteMode.ReadWrite,
+                remoteTimeout=cache.remoteTimeout)
+        self.buildCache = buildCache
 
         self.structure = BuildStructure()
         self.copyDict = {
-            BuildIndex.RawBundleItem: BuildCopy(tools=tools, options=options | BuildCopyOption.EnableSymlinks, processPool=processPool),
-            BuildIndex.BigBundleItem: BuildCopy(tools=tools, options=options | BuildCopyOption.EnableSymlinks, processPool=processPool),
-            BuildIndex.RawBundlePack: BuildCopy(tools=tools, options=options | BuildCopyOption.EnableSymlinks, processPool=processPool),
-            BuildIndex.ReleaseBundlePack: BuildCopy(tools=tools, options=options, processPool=processPool),
-            BuildIndex.InstallBundlePack: BuildCopy(tools=tools, options=options | BuildCopyOption.EnableBackup | BuildCopyOption.EnableSymlinks),
+            BuildIndex.RawBundleItem: BuildCopy(tools=tools, options=options | BuildCopyOption.EnableSymlinks, processPool=processPool, numProcesses=numProcesses, hashAlgorithm=hashAlgorithm, cache=buildCache),
+            BuildIndex.BigBundleItem: BuildCopy(tools=tools, options=options | BuildCopyOption.EnableSymlinks, processPool=processPool, numProcesses=numProcesses, hashAlgorithm=hashAlgorithm, cache=buildCache),
+            BuildIndex.RawBundlePack: BuildCopy(tools=tools, options=options | BuildCopyOption.EnableSymlinks, processPool=processPool, numProcesses=numProcesses, hashAlgorithm=hashAlgorithm, cache=buildCache),
+            BuildIndex.ReleaseBundlePack: BuildCopy(tools=tools, options=options, processPool=processPool, numProcesses=numProcesses, hashAlgorithm=hashAlgorithm, cache=buildCache),
+            BuildIndex.InstallBundlePack: BuildCopy(tools=tools, options=options | BuildCopyOption.EnableBackup | BuildCopyOption.EnableSymlinks, hashAlgorithm=hashAlgorithm),
         }
 
         BuildEngine.__SendBundleEvents(self.structure, self.setup, BundleEventType.OnPreBuild)
 
         BuildEngine.__PopulateStructureRawBundleItems(self.structure, bundles, folders)
-        BuildEngine.__PopulateStructureBigBundleItems(self.structure, bundles, folders)
+        BuildEngine.__PopulateStructureBigBundleItems(self.structure, bundles, folders, self.setup.incrementalBig)
         BuildEngine.__PopulateStructureRawBundlePacks(self.structure, bundles, folders)
         BuildEngine.__PopulateStructureZipBundlePacks(self.structure, bundles, folders)
         BuildEngine.__PopulateStructureInstallBundlePacks(self.structure, bundles, runner)
@@ -432,6 +639,11 @@ class BuildEngine:
     def __Clean(self) -> bool:
         print("Do Clean ...")
 
+        if self.stateStore != None:
+            self.stateStore.Close()
+        self.stateStore = None
+        self.fileStateCache = None
+
         if util.DeleteDir(self.setup.folders.absBuildDir):
             print(f"Deleted {self.setup.folders.absBuildDir}")
         if util.DeleteDir(self.setup.folders.absReleaseDir):
@@ -466,7 +678,7 @@ class BuildEngine:
 
 
     @staticmethod
-    def __PopulateStructureBigBundleItems(structure: BuildStructure, bundles: Bundles, folders: Folders) -> None:
+    def __PopulateStructureBigBundleItems(structure: BuildStructure, bundles: Bundles, folders: Folders, incrementalBig: bool) -> None:
         item: BundleItem
 
         for item in bundles.items:
@@ -485,6 +697,11 @@ class BuildEngine:
                 newThing.files[0].relTarget = item.namePrefix + item.name + item.nameSuffix + ".big"
                 newThing.parentThing = parentThing
 
+                if incrementalBig:
+                    # Manifest is kept outside of the thing folder, because obsolete files are deleted from there.
+                    absManifest: str = os.path.join(folders.absBuildDir, "BigBundleManifests", newThing.files[0].relTarget + ".json")
+                    newThing.files[0].params = {"bigIncremental": True, "bigManifest": absManifest}
+
                 structure.AddThing(BuildIndex.BigBundleItem, newThing)
 
 
@@ -547,6 +764,10 @@ class BuildEngine:
             newThing.files = [BuildFile()]
             newThing.files[0].absSource = parentThing.absParentDir
             newThing.files[0].relTarget = pack.namePrefix + pack.name + pack.nameSuffix + ".zip"
+            # Manifest of the compressed entries to reuse in the next release. Is kept outside of the release folder,
+            # because obsolete files are deleted from there.
+            absManifest: str = os.path.join(folders.absBuildDir, "ReleaseBundleManifests", newThing.files[0].relTarget + ".json")
+            newThing.files[0].params = {"zipManifest": absManifest, "zipCompression": pack.compression}
             newThing.parentThing = parentThing
 
             structure.AddThing(BuildIndex.ReleaseBundlePack, newThing)
@@ -588,9 +809,25 @@ class BuildEngine:
 
         BuildEngine.__SendBundleEvents(self.structure, self.setup, BundleEventType.OnBuild)
 
-        self.__BuildWithData(BuildIndex.RawBundleItem, deleteObsoleteFiles=True, diffWithFileHashRegistry=True)
-        self.__BuildWithData(BuildIndex.BigBundleItem, deleteObsoleteFiles=True)
-        self.__BuildWithData(BuildIndex.RawBundlePack, deleteObsoleteFiles=True)
+        optionsList: list[BuildIndexOptions] = [
+            BuildIndexOptions(BuildIndex.RawBundleItem, deleteObsoleteFiles=True, diffWithFileHashRegistry=True),
+            BuildIndexOptions(BuildIndex.BigBundleItem, deleteObsoleteFiles=True),
+            BuildIndexOptions(BuildIndex.RawBundlePack, deleteObsoleteFiles=True)]
+
+        if self.__CanBuildPipelined(optionsList):
+            self.__BuildPipelined(optionsList)
+        else:
+            options: BuildIndexOptions
+            for options in optionsList:
+                self.__BuildWithData(
+                    options.index,
+                    deleteRemovedFiles=options.deleteRemovedFiles,
+                    deleteObsoleteFiles=options.deleteObsoleteFiles,
+                    diffWithParentThings=options.diffWithParentThings,
+                    diffWithFileHashRegistry=options.diffWithFileHashRegistry)
+
+        if self.buildCache != None:
+            self.buildCache.Evict()
 
         if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
             print(f"Build completed in {timer.GetElapsedSecondsString()} s")
@@ -626,8 +863,9 @@ class BuildEngine:
         # Start event is sent before populating the build diff to allow for file modifications and file injections.
         BuildEngine.__SendBundleEvents(structure, setup, GetStartBuildEvent(index))
 
-        BuildEngine.__PopulateDiff(data, setup, diffWithParentThings, diffWithFileHashRegistry)
+        BuildEngine.__PopulateDiff(data, setup, self.__GetStateStore(), self.__GetFileStateCache(), diffWithParentThings, diffWithFileHashRegistry)
         BuildEngine.__PopulateBuildFileStatusInThings(data.things, data.diff)
+        BuildEngine.__PopulateSourceInfosInThings(data.things, self.__GetFileStateCache(), self.__GetImageInfoCache())
 
         if deleteRemovedFiles:
             BuildEngine.__DeleteRemovedFilesOfThings(data.things, data.diff)
@@ -635,106 +873,397 @@ class BuildEngine:
             BuildEngine.__DeleteObsoleteFilesOfThings(data.things, data.diff)
 
         BuildEngine.__CopyFilesOfThings(data.things, copy)
+        BuildEngine.__CollectImageInfosOfThings(data.things, self.__GetImageInfoCache())
 
         # Finish event is sent before finalizing the build diff to allow for file verifications with hard failures.
         BuildEngine.__SendBundleEvents(structure, setup, GetFinishBuildEvent(index))
 
-        BuildEngine.__RehashFilePathInfoDict(data.diff.newDiffRegistry, data.things, setup)
+        # Digests computed during copy cannot be trusted when the finish event had the chance to modify the files.
+        useCopyDigests: bool = not BuildEngine.__HasBundleEvents(setup, GetFinishBuildEvent(index))
+
+        BuildEngine.__RehashFilePathInfoDict(data.diff.newDiffRegistry, data.things, self.__GetFileStateCache(), useCopyDigests)
+
+        data.diff.SaveNewDiffRegistry()
+
+
+    def __CanBuildPipelined(self, optionsList: list[BuildIndexOptions]) -> bool:
+        """
+        Things can only be pipelined across build indices when their files are copied in the process pool
+        and when no start or finish events expect a build index to be built as a whole.
+        """
+        if self.processPool == None:
+            return False
+
+        options: BuildIndexOptions
+        for options in optionsList:
+            if BuildEngine.__HasBundleEvents(self.setup, GetStartBuildEvent(options.index)):
+                return False
+            if BuildEngine.__HasBundleEvents(self.setup, GetFinishBuildEvent(options.index)):
+                return False
+
+        return True
+
+
+    def __BuildPipelined(self, optionsList: list[BuildIndexOptions]) -> None:
+        """
+        Builds the things of multiple build indices in one go. Each thing is built as soon as all things it is built from are done,
+        instead of waiting for all things of the previous build index. The copy jobs of multiple things run in the process pool
+        at the same time, while diffing and hashing of the other things happens on this thread.
+        """
+        timer = util.Timer()
+        print("Build pipelined ...")
+
+        structure: BuildStructure = self.structure
+        store: BuildStateStore = self.__GetStateStore()
+        cache: FileStateCache = self.__GetFileStateCache()
+        dependencies: dict[str, set[str]] = BuildEngine.__MakeThingDependencies(structure, [options.index for options in optionsList])
+        pendingThings = dict[str, tuple[BuildIndexOptions, BuildThing]]()
+        remainingThingCounts = dict[BuildIndex, int]()
+        sharedDirThings = dict[BuildIndex, BuildThingsT]()
+        doneNames = set[str]()
+        queue = BuildCopyQueue()
+        options: BuildIndexOptions
+        thing: BuildThing
+
+        for options in optionsList:
+            data: BuildIndexData = structure.GetIndexData(options.index)
+            BuildEngine.__CreateDiff(data, self.setup, store, cache, options.diffWithParentThings, options.diffWithFileHashRegistry)
+            remainingThingCounts[options.index] = len(data.things)
+            sharedDirThings[options.index] = BuildEngine.__GetThingsWithSharedParentDir(data.things)
+            for thing in data.things.values():
+                pendingThings[thing.name] = (options, thing)
+
+        for options in optionsList:
+            if remainingThingCounts[options.index] == 0:
+                self.__FinishPipelinedIndex(options, sharedDirThings[options.index])
+
+        def OnThingCopied(options: BuildIndexOptions, copiedThing: BuildThing) -> None:
+            self.__FinishPipelinedThing(options, copiedThing, cache)
+            doneNames.add(copiedThing.name)
+            remainingThingCounts[options.index] -= 1
+            if remainingThingCounts[options.index] == 0:
+                self.__FinishPipelinedIndex(options, sharedDirThings[options.index])
+
+        while pendingThings or not queue.IsEmpty():
+            startedCount: int = 0
+            name: str
+            for name in list(pendingThings.keys()):
+                if dependencies[name].issubset(doneNames):
+                    options, thing = pendingThings.pop(name)
+                    isSharedDir: bool = thing.name in sharedDirThings[options.index]
+                    onCopied: BuildThingCallbackT = functools.partial(OnThingCopied, options)
+                    self.__StartPipelinedThing(options, thing, cache, isSharedDir, queue, onCopied)
+                    startedCount += 1
+
+            if queue.IsEmpty():
+                util.Verify(startedCount > 0 or not pendingThings, "Build things have cyclic dependencies")
+            else:
+                queue.WaitAny()
+
+        if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
+            print(f"Build pipelined completed in {timer.GetElapsedSecondsString()} s")
+
+
+    def __StartPipelinedThing(
+            self,
+            options: BuildIndexOptions,
+            thing: BuildThing,
+            cache: FileStateCache,
+            isSharedDir: bool,
+            queue: BuildCopyQueue,
+            onCopied: BuildThingCallbackT) -> None:
+
+        data: BuildIndexData = self.structure.GetIndexData(options.index)
+        things = BuildThingsT()
+        things[thing.name] = thing
+
+        BuildEngine.__PopulateDiffFromThings(data.diff, things, cache)
+        BuildEngine.__PopulateBuildFileStatusInThings(things, data.diff)
+        BuildEngine.__PopulateSourceInfosInThings(things, cache, self.__GetImageInfoCache())
+
+        # Files in a parent dir that is shared with other things can only be deleted when the diff of all these things is populated.
+        if not isSharedDir:
+            if options.deleteRemovedFiles:
+                BuildEngine.__DeleteRemovedFilesOfThings(things, data.diff)
+            if options.deleteObsoleteFiles:
+                BuildEngine.__DeleteObsoleteFilesOfThings(things, data.diff)
+
+        print(f"Copy files for {thing.name} ...")
+
+        os.makedirs(thing.absParentDir, exist_ok=True)
+
+        queue.Submit(self.copyDict[options.index], thing, onCopied)
+
+
+    def __FinishPipelinedThing(self, options: BuildIndexOptions, thing: BuildThing, cache: FileStateCache) -> None:
+        data: BuildIndexData = self.structure.GetIndexData(options.index)
+        things = BuildThingsT()
+        things[thing.name] = thing
+
+        BuildEngine.__CollectImageInfosOfThings(things, self.__GetImageInfoCache())
+
+        # Copy digests can be trusted, because pipelined builds have no finish events.
+        BuildEngine.__RehashFilePathInfoDict(data.diff.newDiffRegistry, things, cache, useCopyDigests=True)
+
+
+    def __FinishPipelinedIndex(self, options: BuildIndexOptions, sharedDirThings: BuildThingsT) -> None:
+        data: BuildIndexData = self.structure.GetIndexData(options.index)
+
+        if options.deleteRemovedFiles:
+            BuildEngine.__DeleteRemovedFilesOfThings(sharedDirThings, data.diff)
+        if options.deleteObsoleteFiles:
+            BuildEngine.__DeleteObsoleteFilesOfThings(sharedDirThings, data.diff)
 
         data.diff.SaveNewDiffRegistry()
 
 
+    @staticmethod
+    def __MakeThingDependencies(structure: BuildStructure, indices: list[BuildIndex]) -> dict[str, set[str]]:
+        """
+        Returns dictionary of thing name to the names of the things it is built from, within the given build indices.
+        Dependencies come from the parent thing and from the parent files of the thing files.
+        """
+        index: BuildIndex
+        thing: BuildThing
+        file: BuildFile
+        fileOwnerNames = dict[int, str]()
+        dependencies = dict[str, set[str]]()
+
+        for index in indices:
+            for thing in structure.GetThings(index).values():
+                dependencies[thing.name] = set[str]()
+                for file in thing.files:
+                    fileOwnerNames[id(file)] = thing.name
+
+        for index in indices:
+            for thing in structure.GetThings(index).values():
+                names: set[str] = dependencies[thing.name]
+                if thing.parentThing != None and thing.parentThing.name in dependencies:
+                    names.add(thing.parentThing.name)
+                for file in thing.files:
+                    if file.parentFile != None:
+                        ownerName: str = fileOwnerNames.get(id(file.parentFile))
+                        if ownerName != None:
+                            names.add(ownerName)
+
+        return dependencies
+
+
+    @staticmethod
+    def __GetThingsWithSharedParentDir(things: BuildThingsT) -> BuildThingsT:
+        thing: BuildThing
+        dirCounts = dict[str, int]()
+
+        for thing in things.values():
+            absParentDir: str = thing.absParentDir.lower()
+            dirCounts[absParentDir] = dirCounts.get(absParentDir, 0) + 1
+
+        sharedThings = BuildThingsT()
+        for thing in things.values():
+            if dirCounts[thing.absParentDir.lower()] > 1:
+                sharedThings[thing.name] = thing
+
+        return sharedThings
+
+
     @staticmethod
     def __PopulateDiff(
             data: BuildIndexData,
             setup: BuildSetup,
+            store: BuildStateStore,
+            cache: FileStateCache,
+            withParentThings: bool,
+            useFileHashRegistry: bool) -> None:
+
+        BuildEngine.__CreateDiff(data, setup, store, cache, withParentThings, useFileHashRegistry)
+        BuildEngine.__PopulateDiffFromThings(data.diff, data.things, cache)
+
+
+    @staticmethod
+    def __CreateDiff(
+            data: BuildIndexData,
+            setup: BuildSetup,
+            store: BuildStateStore,
+            cache: FileStateCache,
             withParentThings: bool,
             useFileHashRegistry: bool) -> None:
 
-        path: str = MakeDiffPath(data.index, setup.folders)
-        data.diff = BuildDiff(path, withParentThings, useFileHashRegistry)
-        BuildEngine.__PopulateDiffFromThings(data.diff, data.things, setup)
+        legacyPath: str = MakeLegacyDiffPath(data.index, setup.folders)
+        data.diff = BuildDiff(store, GetBuildIndexName(data.index), withParentThings, useFileHashRegistry, legacyPath, cache)
+        BuildEngine.__LoadOldFilePathInfos(data.diff, data.things)
 
 
     @staticmethod
-    def __PopulateDiffFromThings(diff: BuildDiff, things: BuildThingsT, setup: BuildSetup) -> None:
+    def __LoadOldFilePathInfos(diff: BuildDiff, things: BuildThingsT) -> None:
+        """
+        Loads the old file infos of all files in things in bulk. Files of things that are not built are not loaded.
+        """
+        timer = util.Timer()
+        print("Load old file infos ...")
+
+        thing: BuildThing
+        file: BuildFile
+        filePaths = list[str]()
+
+        for thing in things.values():
+            scanThings: list[BuildThing] = [thing]
+            if diff.includesParentDiff and thing.parentThing != None:
+                scanThings.append(thing.parentThing)
+
+            for scanThing in scanThings:
+                for file in scanThing.files:
+                    absTarget: str = file.AbsTarget(scanThing.absParentDir)
+                    filePaths.append(file.AbsSource())
+                    filePaths.append(absTarget)
+                    filePaths.extend(util.GetAbsFileDirs(absTarget, scanThing.absParentDir))
+
+        diff.oldDiffRegistry.LoadFiles(filePaths)
+
+        if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
+            print(f"Load old file infos completed in {timer.GetElapsedSecondsString()} s")
+
+
+    @staticmethod
+    def __PopulateDiffFromThings(diff: BuildDiff, things: BuildThingsT, cache: FileStateCache) -> None:
         thing: BuildThing
 
         for thing in things.values():
             timer = util.Timer()
             print(f"Create file infos for {thing.name} ...")
 
-            BuildEngine.__PopulateFilePathInfosFromThing(diff, thing, setup)
+            BuildEngine.__PopulateFilePathInfosFromThing(diff, thing, cache)
 
             if diff.includesParentDiff and thing.parentThing != None:
-                BuildEngine.__PopulateFilePathInfosFromThing(diff, thing.parentThing, setup)
+                BuildEngine.__PopulateFilePathInfosFromThing(diff, thing.parentThing, cache)
 
             if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
                 print(f"Create file infos for {thing.name} completed in {timer.GetElapsedSecondsString()} s")
 
 
     @staticmethod
-    def __PopulateFilePathInfosFromThing(diff: BuildDiff, thing: BuildThing, setup: BuildSetup) -> None:
+    def __PopulateFilePathInfosFromThing(diff: BuildDiff, thing: BuildThing, cache: FileStateCache) -> None:
+        """
+        Adds file infos of thing to the new diff registry. File hashes are taken from the file state cache.
+        """
         file: BuildFile
+        filePaths = list[str]()
+        registryPaths = list[str]()
+
+        for file in thing.files:
+            if file.registryDef != None and diff.UseFileHashRegistry():
+                # Hash is required for the comparison with the file hash registry.
+                registryPaths.append(file.AbsSource())
+            else:
+                filePaths.append(file.AbsSource())
+            filePaths.append(file.AbsTarget(thing.absParentDir))
+
+        states: FileStatesT = cache.GetStates(filePaths)
+        states.update(cache.GetStates(registryPaths, allowDeferredHash=False))
+        diff.registryMd5s.update(cache.GetMd5s(registryPaths))
+        state: FileState
 
         for file in thing.files:
             absSource = file.AbsSource()
-            sourceTime: float = 0.0
-            sourceMd5: str = ""
 
             if not diff.newDiffRegistry.FindFile(absSource):
-                sourceTime = util.GetFileModifiedTime(absSource)
-                # Optimization: Use old hash when file modification time is unchanged.
-                oldInfo: BuildFilePathInfo = diff.oldDiffRegistry.FindFile(absSource)
-                if oldInfo != None and sourceTime > 0.0 and sourceTime == oldInfo.GetModifiedTime():
-                    sourceMd5 = oldInfo.md5
-                else:
-                    sourceMd5 = util.GetFileMd5(absSource, log=setup.verboseLogging)
-                diff.newDiffRegistry.AddFile(absSource, modifiedTime=sourceTime, md5=sourceMd5, params=None)
+                state = states[absSource]
+                diff.newDiffRegistry.AddFile(absSource, fingerprint=state.fingerprint, digest=state.digest)
 
         for file in thing.files:
             absTarget = file.AbsTarget(thing.absParentDir)
             absTargetDirs: list[str] = util.GetAbsFileDirs(absTarget, thing.absParentDir)
             absTargetDir: str
-            targetTime: float = 0.0
-            targetMd5: str = ""
-            targetParams: ParamsT = None
 
             for absTargetDir in absTargetDirs:
                 if not diff.newDiffRegistry.FindFile(absTargetDir):
                     diff.newDiffRegistry.AddFile(absTargetDir)
 
             if not diff.newDiffRegistry.FindFile(absTarget):
-                targetTime = util.GetFileModifiedTime(absTarget)
-                targetParams = deepcopy(file.params)
-                # Optimization: Use old hash when file modification time is unchanged.
-                oldInfo: BuildFilePathInfo = diff.oldDiffRegistry.FindFile(absTarget)
-                if oldInfo != None and targetTime > 0.0 and targetTime == oldInfo.GetModifiedTime():
-                    targetMd5 = oldInfo.md5
-                else:
-                    targetMd5 = util.GetFileMd5(absTarget, log=setup.verboseLogging)
-                diff.newDiffRegistry.AddFile(absTarget, modifiedTime=targetTime, md5=targetMd5, params=targetParams)
+                state = states[absTarget]
+                diff.newDiffRegistry.AddFile(absTarget, fingerprint=state.fingerprint, digest=state.digest, paramsDigest=MakeParamsDigest(file.params))
 
 
     @staticmethod
-    def __RehashFilePathInfoDict(diffRegistry: BuildDiffRegistry, things: BuildThingsT, setup: BuildSetup) -> None:
+    def __RehashFilePathInfoDict(diffRegistry: BuildDiffRegistry, things: BuildThingsT, cache: FileStateCache, useCopyDigests: bool) -> None:
         thing: BuildThing
         file: BuildFile
+        rebuiltPaths = list[str]()
+        copyDigests = FileHashesT()
 
         for thing in things.values():
-            timer = util.Timer()
-            print(f"Rehash files for {thing.name} ...")
-
             for file in thing.files:
                 if file.RequiresRebuild():
                     absTarget: str = file.AbsTarget(thing.absParentDir)
-                    targetInfo: BuildFilePathInfo = diffRegistry.FindFile(absTarget)
-                    assert targetInfo != None
-                    targetInfo.modifiedTime = util.GetFileModifiedTime(absTarget)
-                    targetInfo.md5 = util.GetFileMd5(absTarget, log=setup.verboseLogging)
+                    rebuiltPaths.append(absTarget)
+                    if useCopyDigests and file.targetDigest:
+                        copyDigests[absTarget] = file.targetDigest
 
-            if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
-                print(f"Rehash files for {thing.name} completed in {timer.GetElapsedSecondsString()} s")
+        print(f"Rehash files of {len(things)} things ...")
+
+        states: FileStatesT = cache.RehashFiles(rebuiltPaths, copyDigests)
+        absTarget: str
+
+        for absTarget in rebuiltPaths:
+            targetInfo: BuildFilePathInfo = diffRegistry.FindFile(absTarget)
+            assert targetInfo != None
+            state: FileState = states[absTarget]
+            targetInfo.fingerprint = state.fingerprint
+            targetInfo.digest = state.digest
+
+
+    @staticmethod
+    def __GetFilesToRebuildOfThings(things: BuildThingsT) -> list[BuildFile]:
+        thing: BuildThing
+        file: BuildFile
+        files = list[BuildFile]()
+
+        for thing in things.values():
+            for file in thing.files:
+                if file.RequiresRebuild():
+                    files.append(file)
+
+        return files
+
+
+    @staticmethod
+    def __PopulateSourceInfosInThings(things: BuildThingsT, cache: FileStateCache, imageInfoCache: ImageInfoCache) -> None:
+        """
+        Populates the source digests of the files to rebuild, as known from the build diff, and the image infos
+        of image sources that are known by their digest. The copy then does not need to hash these sources
+        and read their headers again. Source directories of ZIP archives get the digests of their files.
+        """
+        files: list[BuildFile] = BuildEngine.__GetFilesToRebuildOfThings(things)
+        if not files:
+            return
+
+        file: BuildFile
+        states: FileStatesT = cache.GetStates([file.AbsSource() for file in files])
+        imageDigests: list[str] = [states[file.AbsSource()].digest for file in files if HasImageInfo(file.AbsSource())]
+        infos: ImageInfosT = imageInfoCache.GetInfos(imageDigests)
+
+        for file in files:
+            file.sourceDigest = states[file.AbsSource()].digest
+            file.sourceImageInfo = infos.get(file.sourceDigest)
+
+            if GetFileType(file.relTarget) == BuildFileType.zip and os.path.isdir(file.AbsSource()):
+                fileStates: FileStatesT = cache.GetStates(ListZipSourceFiles(file.AbsSource()))
+                file.sourceFileDigests = FileHashesT({path: state.digest for path, state in fileStates.items() if state.digest})
+
+
+    @staticmethod
+    def __CollectImageInfosOfThings(things: BuildThingsT, imageInfoCache: ImageInfoCache) -> None:
+        """
+        Adds the image infos that the copy has read from source headers to the image info cache, by the digest of the source.
+        Sources with deferred digest are left out.
+        """
+        file: BuildFile
+        infos = ImageInfosT()
+
+        for file in BuildEngine.__GetFilesToRebuildOfThings(things):
+            if file.sourceImageInfo != None and file.sourceDigest:
+                infos[file.sourceDigest] = file.sourceImageInfo
+
+        imageInfoCache.AddInfos(infos)
 
 
     @staticmethod
@@ -810,13 +1339,13 @@ class BuildEngine:
     @staticmethod
     def __GetStatusWithFileHashRegistry(absFilePath: str, relFilePath: str, diff: BuildDiff, registryDef: BundleRegistryDefinition) -> BuildFileStatus:
         if registryDef != None and diff.UseFileHashRegistry():
-            filePathInfo: BuildFilePathInfo = diff.newDiffRegistry.FindFile(absFilePath)
-            if filePathInfo != None:
+            md5: str = diff.registryMd5s.get(absFilePath)
+            if md5:
                 registry: FileHashRegistry = diff.GetOrCreateRegistry(registryDef)
                 assert registry != None
                 fileHash: FileHash = registry.FindFile(relFilePath)
                 if fileHash != None:
-                    if filePathInfo.md5 == fileHash.md5:
+                    if md5 == fileHash.md5:
                         return BuildFileStatus.Irrelevant
 
         return BuildFileStatus.Unknown
@@ -873,7 +1402,7 @@ class BuildEngine:
 
                         elif util.DeleteFile(fileName):
                             oldInfo: BuildFilePathInfo = diff.oldDiffRegistry.FindFile(fileName)
-                            if oldInfo != None and oldInfo.md5:
+                            if oldInfo != None and oldInfo.HasFile():
                                 thing.fileCounts[BuildFileStatus.Removed.value] += 1
                             print("Deleted", fileName)
 
@@ -900,7 +1429,7 @@ class BuildEngine:
                     fileName = buildFile.AbsTarget(thing.absParentDir)
                     if util.DeleteFile(fileName):
                         oldInfo: BuildFilePathInfo = diff.oldDiffRegistry.FindFile(fileName)
-                        if oldInfo != None and oldInfo.md5:
+                        if oldInfo != None and oldInfo.HasFile():
                             thing.fileCounts[BuildFileStatus.Removed.value] += 1
                         print("Deleted", fileName)
 
@@ -916,7 +1445,7 @@ class BuildEngine:
                 if newInfo == None:
                     if util.DeleteFile(fileName):
                         oldInfo: BuildFilePathInfo = diff.oldDiffRegistry.FindFile(fileName)
-                        if oldInfo != None and oldInfo.md5:
+                        if oldInfo != None and oldInfo.HasFile():
                             thing.fileCounts[BuildFileStatus.Removed.value] += 1
                         print("Deleted", fileName)
 
@@ -944,18 +1473,27 @@ class BuildEngine:
 
     @staticmethod
     def __CopyFilesOfThings(things: BuildThingsT, copy: BuildCopy) -> None:
+        """
+        Copies the files of all things. With multi processing, the files of all things are copied at the same time.
+        """
         thing: BuildThing
+        timers = dict[str, util.Timer]()
+        queue = BuildCopyQueue()
+
+        def OnThingCopied(copiedThing: BuildThing) -> None:
+            timer: util.Timer = timers[copiedThing.name]
+            if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
+                print(f"Copy files for {copiedThing.name} completed in {timer.GetElapsedSecondsString()} s")
 
         for thing in things.values():
-            timer = util.Timer()
+            timers[thing.name] = util.Timer()
             print(f"Copy files for {thing.name} ...")
 
             os.makedirs(thing.absParentDir, exist_ok=True)
 
-            copy.CopyThing(thing)
+            queue.Submit(copy, thing, OnThingCopied)
 
-            if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
-                print(f"Copy files for {thing.name} completed in {timer.GetElapsedSecondsString()} s")
+        queue.WaitAll()
 
 
     @staticmethod
@@ -0,0 +1,82 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from generalsmodbuilder import util
+
+
+FileHashesT = dict[str, str]
+
+DIFF_HASH_ALGORITHMS: list[str] = ["blake2b", "md5", "xxh3"]
+DEFAULT_DIFF_HASH_ALGORITHM: str = "blake2b"
+
+
+def __Blake2b128(*args, **kwargs):
+    # 128 bits are plenty to detect file changes and keep digests as short as md5.
+    return hashlib.blake2b(*args, digest_size=16, **kwargs)
+
+
+def GetDiffHashFunction(algorithm: str) -> Callable:
+    """
+    Returns hash constructor for a diff hash algorithm. The constructed objects provide update and hexdigest like hashlib.
+    """
+    if algorithm == "blake2b":
+        return __Blake2b128
+    if algorithm == "md5":
+        return hashlib.md5
+    if algorithm == "xxh3":
+        try:
+            # Is imported here because it is not part of standard Python.
+            import xxhash
+        except ImportError:
+            raise Exception("Diff hash algorithm 'xxh3' requires the xxhash package")
+        return xxhash.xxh3_128
+    raise Exception(f"Diff hash algorithm '{algorithm}' is not supported. Supported are {', '.join(DIFF_HASH_ALGORITHMS)}")
+
+
+def GetDefaultNumHashWorkers() -> int:
+    # Hashing is mostly bound by file reads, so use more threads than cores, similar to ThreadPoolExecutor.
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+class FileHasher:
+    """
+    Hashes files with a thread pool. The hashlib functions release the GIL while hashing large buffers,
+    so files are read and hashed in parallel.
+    """
+    hashFunc: Callable
+    numWorkers: int
+    log: bool
+
+    def __init__(self, hashFunc: Callable = hashlib.md5, numWorkers: int = 0, log: bool = False):
+        """
+        hashFunc : Callable
+            Hash constructor from hashlib.
+        numWorkers : int
+            Number of hash threads. Zero or less selects a default count.
+        log : bool
+            Print every hashed file.
+        """
+        self.hashFunc = hashFunc
+        self.numWorkers = numWorkers if numWorkers > 0 else GetDefaultNumHashWorkers()
+        self.log = log
+
+    def HashFile(self, path: str) -> str:
+        return util.GetFileHash(path, self.hashFunc, self.log)
+
+    def HashFiles(self, paths: list[str]) -> FileHashesT:
+        """
+        Returns dictionary of path to hash. Duplicate paths are hashed once.
+        The result does not depend on the number of workers or the order of completion.
+        """
+        uniquePaths: list[str] = list(dict.fromkeys(paths))
+        hashes: list[str]
+
+        if self.numWorkers <= 1 or len(uniquePaths) <= 1:
+            hashes = [self.HashFile(path) for path in uniquePaths]
+        else:
+            numWorkers: int = min(self.numWorkers, len(uniquePaths))
+            with ThreadPoolExecutor(max_workers=numWorkers) as pool:
+                hashes = list(pool.map(self.HashFile, uniquePaths))
+
+        return FileHashesT(zip(uniquePaths, hashes))
@@ -0,0 +1,209 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from generalsmodbuilder.build.buildstate import BuildStateStore, FileStateRowsT
+from generalsmodbuilder.build.filehasher import FileHasher, FileHashesT, GetDiffHashFunction
+from generalsmodbuilder import util
+
+
+@dataclass
+class FileState:
+    path: str
+    fingerprint: util.FileFingerprintT | None
+    digest: str
+    # Is only created on demand for comparisons with file hash registries, unless the digest is md5 already.
+    md5: str
+
+
+FileStatesT = dict[str, FileState]
+
+
+def IsSizeChanged(fingerprint: util.FileFingerprintT | None, other: util.FileFingerprintT | None) -> bool:
+    return fingerprint != None and other != None and fingerprint[1] != other[1]
+
+
+class FileStateCache:
+    """
+    Holds the state of files for one build run, shared by all build indices.
+    A file that is used by multiple build indices, for example as the target of one and the source of another,
+    is therefore hashed at most once per run. Symlinks resolve to the state of the file they point to.
+    File states are persisted in the build state store and reused in later runs when the stat fingerprint of the file is unchanged.
+    """
+    store: BuildStateStore
+    hasher: FileHasher
+    md5Hasher: FileHasher
+    digestIsMd5: bool
+    lowerPath: bool
+    newStates: FileStatesT
+    oldStates: FileStatesT
+    storeQueriedKeys: set[str]
+
+    def __init__(self, store: BuildStateStore, numWorkers: int = 0, log: bool = False):
+        """
+        store : BuildStateStore
+            Store to load file states from and save file states to. Its hash algorithm is used for the digests.
+        numWorkers : int
+            Number of hash threads. Zero or less selects a default count.
+        log : bool
+            Print every hashed file.
+        """
+        self.store = store
+        self.hasher = FileHasher(hashFunc=GetDiffHashFunction(store.hashAlgorithm), numWorkers=numWorkers, log=log)
+        self.md5Hasher = FileHasher(hashFunc=hashlib.md5, numWorkers=numWorkers, log=log)
+        self.digestIsMd5 = store.hashAlgorithm == "md5"
+        self.lowerPath = True
+        self.newStates = FileStatesT()
+        self.oldStates = FileStatesT()
+        self.storeQueriedKeys = set[str]()
+
+    def __ProcessPath(self, filepath: str) -> str:
+        if self.lowerPath:
+            filepath = filepath.lower()
+        return filepath
+
+    @staticmethod
+    def __ResolvePath(filepath: str) -> str:
+        if os.path.islink(filepath):
+            return os.path.realpath(filepath)
+        return filepath
+
+    def GetStates(self, filepaths: list[str], allowDeferredHash: bool = True) -> FileStatesT:
+        """
+        Returns dictionary of file path to current file state. Missing files and directories have no fingerprint and no hash.
+        Files are checked in tiers against their last known state:
+        1. Fingerprint is unchanged: The last hash is reused.
+        2. Size is changed: The file is changed for certain and hashing is deferred, if allowed. The state has no hash.
+        3. Otherwise: The file is hashed.
+        """
+        realPaths: dict[str, str] = {filepath: FileStateCache.__ResolvePath(filepath) for filepath in filepaths}
+        self.__LoadKeys([self.__ProcessPath(realPath) for realPath in realPaths.values()])
+
+        states = FileStatesT()
+        pendingStates = FileStatesT()
+
+        for filepath, realPath in realPaths.items():
+            key: str = self.__ProcessPath(realPath)
+            fingerprint: util.FileFingerprintT = util.GetFileFingerprint(realPath)
+            state: FileState = self.newStates.get(key)
+
+            if state == None or state.fingerprint != fingerprint:
+                oldState: FileState = self.oldStates.get(key)
+                state = FileState(realPath, fingerprint, "", "")
+                self.newStates[key] = state
+
+                if oldState != None and oldState.fingerprint == fingerprint:
+                    # The old hash may be deferred as well.
+                    state.digest = oldState.digest
+                    state.md5 = oldState.md5
+                elif fingerprint != None:
+                    if not (allowDeferredHash and oldState != None and IsSizeChanged(fingerprint, oldState.fingerprint)):
+                        pendingStates[key] = state
+
+            if fingerprint != None and not state.digest and not allowDeferredHash:
+                pendingStates[key] = state
+
+            states[filepath] = state
+
+        self.__HashStates(list(pendingStates.values()))
+
+        return states
+
+    def GetMd5s(self, filepaths: list[str]) -> FileHashesT:
+        """
+        Returns dictionary of file path to md5 hash, for comparisons with file hash registries. Missing files have no hash.
+        """
+        states: FileStatesT = self.GetStates(filepaths, allowDeferredHash=False)
+        state: FileState
+        pendingStates: list[FileState] = [state for state in states.values() if state.fingerprint != None and not state.md5]
+
+        if pendingStates:
+            hashes: FileHashesT = self.md5Hasher.HashFiles([state.path for state in pendingStates])
+            for state in pendingStates:
+                state.md5 = hashes[state.path]
+
+        return FileHashesT({filepath: state.md5 for filepath, state in states.items()})
+
+    def RehashFiles(self, filepaths: list[str], knownDigests: FileHashesT = None) -> FileStatesT:
+        """
+        Returns dictionary of file path to current file state. Files are always hashed, for example after they were rebuilt.
+        Symlinks are not hashed again, because writing them does not change the file they point to.
+        Files with a known digest, for example one that was computed while writing the file, are not hashed again either.
+        """
+        states = FileStatesT()
+        writtenStates = FileStatesT()
+        pendingStates = list[FileState]()
+        linkPaths = list[str]()
+
+        for filepath in filepaths:
+            if os.path.islink(filepath):
+                linkPaths.append(filepath)
+                continue
+            key: str = self.__ProcessPath(filepath)
+            state: FileState = writtenStates.get(key)
+            if state == None:
+                state = FileState(filepath, util.GetFileFingerprint(filepath), "", "")
+                knownDigest: str = knownDigests.get(filepath) if knownDigests else None
+                if knownDigest:
+                    state.digest = knownDigest
+                    if self.digestIsMd5:
+                        state.md5 = knownDigest
+                elif state.fingerprint != None:
+                    pendingStates.append(state)
+                writtenStates[key] = state
+                self.newStates[key] = state
+            states[filepath] = state
+
+        self.__HashStates(pendingStates)
+        states.update(self.GetStates(linkPaths))
+
+        return states
+
+    def __HashStates(self, states: list[FileState]) -> None:
+        if not states:
+            return
+
+        timer = util.Timer()
+        print(f"Hash {len(states)} files ...")
+
+        state: FileState
+        hashes: FileHashesT = self.hasher.HashFiles([state.path for state in states])
+
+        for state in states:
+            state.digest = hashes[state.path]
+            if self.digestIsMd5:
+                state.md5 = state.digest
+
+        if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
+            print(f"Hash {len(states)} files completed in {timer.GetElapsedSecondsString()} s")
+
+    def __LoadKeys(self, keys: list[str]) -> None:
+        keys = [key for key in dict.fromkeys(keys) if not key in self.storeQueriedKeys and not key in self.newStates]
+        if keys:
+            rows: FileStateRowsT = self.store.LoadFileStateRows(keys)
+            for key, (path, fingerprint, digest, md5) in rows.items():
+                self.oldStates[key] = FileState(path, fingerprint, digest, md5)
+            self.storeQueriedKeys.update(keys)
+
+    def Save(self) -> None:
+        """
+        Writes new and changed file states to the store. States with deferred hash are written as well,
+        so that an unchanged fingerprint does not cause a hash in the next run either.
+        States of files that are neither part of any build index nor used in this run are deleted from the store.
+        """
+        timer = util.Timer()
+        print("Save file states ...")
+
+        changedRows = FileStateRowsT()
+        for key, newState in self.newStates.items():
+            if newState.fingerprint != None and newState != self.oldStates.get(key):
+                changedRows[key] = (newState.path, newState.fingerprint, newState.digest, newState.md5)
+
+        deleteKeys: list[str] = [key for key in self.store.LoadUnreferencedFileStateKeys() if not key in self.newStates]
+
+        if changedRows or deleteKeys:
+            self.store.WriteFileStateRows(changedRows, deleteKeys)
+
+        print(f"Save file states with {len(changedRows)} changed and {len(deleteKeys)} deleted files")
+
+        if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
+            print(f"Save file states completed in {timer.GetElapsedSecondsString()} s")
@@ -0,0 +1,344 @@
+import re
+import struct
+from dataclasses import dataclass
+from enum import Enum
+from generalsmodbuilder import util
+
+
+class GameTextLanguage(Enum):
+    """
+    Languages of the game with their CSF language ids.
+    """
+    English = 0
+    EnglishUK = 1
+    German = 2
+    French = 3
+    Spanish = 4
+    Italian = 5
+    Japanese = 6
+    Jabber = 7
+    Korean = 8
+    Chinese = 9
+    Unused1 = 10
+    Brazilian = 11
+    Polish = 12
+    Unknown = 13
+    Russian = 14
+    Arabic = 15
+
+
+GAME_TEXT_LANGUAGE_CODES: dict[GameTextLanguage, str] = {
+    GameTextLanguage.English: "US",
+    GameTextLanguage.EnglishUK: "UK",
+    GameTextLanguage.German: "DE",
+    GameTextLanguage.French: "FR",
+    GameTextLanguage.Spanish: "ES",
+    GameTextLanguage.Italian: "IT",
+    GameTextLanguage.Japanese: "JA",
+    GameTextLanguage.Jabber: "JB",
+    GameTextLanguage.Korean: "KO",
+    GameTextLanguage.Chinese: "ZH",
+    GameTextLanguage.Unused1: "UN",
+    GameTextLanguage.Brazilian: "BP",
+    GameTextLanguage.Polish: "PL",
+    GameTextLanguage.Unknown: "XX",
+    GameTextLanguage.Russian: "RU",
+    GameTextLanguage.Arabic: "AR",
+}
+
+CSF_MAGIC = b" FSC"
+CSF_LABEL_MAGIC = b" LBL"
+CSF_STRING_MAGIC = b" RTS"
+CSF_WAVE_STRING_MAGIC = b"WRTS"
+CSF_VERSION = 3
+
+# Is part of the build cache keys of game text conversions. Must be changed when their output changes.
+GAME_TEXT_CONVERTER_VERSION = "2"
+
+STR_LANGUAGE_REGEX = re.compile(r'^([A-Za-z]{2,})\s*:\s*(".*)$')
+
+
+def MakeGameTextLanguageFromStr(name: str) -> GameTextLanguage:
+    """
+    Returns language of a language name or its two letter code, case insensitive.
+    """
+    nameLower: str = name.strip().lower()
+    language: GameTextLanguage
+    for language in GameTextLanguage:
+        if nameLower == language.name.lower() or nameLower == GAME_TEXT_LANGUAGE_CODES[language].lower():
+            return language
+    raise Exception(f"Game text language '{name}' is not supported")
+
+
+def MakeGameTextLanguagesFromStr(names: str) -> list[GameTextLanguage]:
+    """
+    Returns languages of a list of language names or codes, separated by comma, semicolon or space.
+    """
+    return [MakeGameTextLanguageFromStr(name) for name in re.split(r"[,; ]+", names) if name]
+
+
+@dataclass
+class GameTextString:
+    text: str
+    speech: str = ""
+
+
+@dataclass(init=False)
+class GameTextLabel:
+    name: str
+    # Strings by language. The string of None applies to all languages without own string.
+    strings: dict[GameTextLanguage | None, GameTextString]
+
+    def __init__(self, name: str):
+        self.name = name
+        self.strings = dict[GameTextLanguage | None, GameTextString]()
+
+    def GetString(self, language: GameTextLanguage | None) -> GameTextString | None:
+        string: GameTextString = self.strings.get(language)
+        if string == None:
+            string = self.strings.get(None)
+        return string
+
+
+@dataclass(init=False)
+class GameText:
+    """
+    Game text labels as read from STR or CSF files. Replaces the gametextcompiler tool for the conversions of the builder,
+    so that text is compiled in process and from memory.
+
+    STR files contain blocks of a label, its quoted text and END. Lines starting with // are comments.
+    Text may be preceded by a language code like DE: to hold the text of multiple languages in one file.
+    Text may be followed by =speech to name a speech file. Text supports the escapes \\n, \\t, \\" and \\\\.
+    """
+    labels: list[GameTextLabel]
+    language: GameTextLanguage
+
+    def __init__(self):
+        self.labels = list[GameTextLabel]()
+        self.language = GameTextLanguage.English
+
+    def GetLanguages(self) -> list[GameTextLanguage]:
+        languages = dict[GameTextLanguage, None]()
+        label: GameTextLabel
+        for label in self.labels:
+            for language in label.strings.keys():
+                if language != None:
+                    languages[language] = None
+        return list(languages.keys())
+
+    def LoadStr(self, text: str, name: str = "") -> None:
+        label: GameTextLabel = None
+        lineNumber: int = 0
+        lines: list[str] = text.lstrip("\ufeff").splitlines()
+
+        while lineNumber < len(lines):
+            line: str = lines[lineNumber].strip()
+            lineNumber += 1
+
+            if not line or line.startswith("//"):
+                continue
+
+            if label == None:
+                label = GameTextLabel(line)
+                continue
+
+            if line.upper() == "END":
+                self.labels.append(label)
+                label = None
+                continue
+
+            language: GameTextLanguage | None = None
+            match: re.Match = STR_LANGUAGE_REGEX.match(line)
+            if match != None:
+                language = MakeGameTextLanguageFromStr(match.group(1))
+                line = match.group(2)
+
+            util.Verify(line.startswith('"'), f"STR '{name}' line {lineNumber} of label '{label.name}' is not quoted text: {line}")
+
+            # Quoted text may span multiple lines.
+            quoteEnd: int = GameText.__FindQuoteEnd(line, 1)
+            while quoteEnd < 0 and lineNumber < len(lines):
+                line += "\n" + lines[lineNumber].strip()
+                lineNumber += 1
+                quoteEnd = GameText.__FindQuoteEnd(line, 1)
+
+            util.Verify(quoteEnd >= 0, f"STR '{name}' label '{label.name}' has text without closing quote")
+
+            string = GameTextString(GameText.__Unescape(line[1:quoteEnd]))
+            rest: str = line[quoteEnd + 1:].strip()
+            if rest.startswith("="):
+                string.speech = rest[1:].strip()
+
+            label.strings[language] = string
+
+        util.Verify(label == None, f"STR '{name}' label '{label.name if label else ''}' has no END")
+
+    def SaveStr(self, languages: list[GameTextLanguage] = None) -> str:
+        """
+        Returns STR text of all labels. With languages, writes the text of these languages with language codes.
+        Without, writes the text of the CSF language without language codes.
+        """
+        lines = list[str]()
+        label: GameTextLabel
+
+        for label in self.labels:
+            lines.append(label.name)
+            if languages:
+                for language in languages:
+                    string: GameTextString = label.GetString(language)
+                    if string != None:
+                        lines.append(f"{GAME_TEXT_LANGUAGE_CODES[language]}: {GameText.__FormatStrString(string)}")
+            else:
+                string: GameTextString = label.GetString(self.language)
+                if string != None:
+                    lines.append(GameText.__FormatStrString(string))
+            lines.append("END")
+            lines.append("")
+
+        return "\n".join(lines)
+
+    def LoadCsf(self, data: bytes, name: str = "") -> None:
+        util.Verify(data[0:4] == CSF_MAGIC, f"File '{name}' is not a CSF file")
+        version, labelCount, stringCount, unused, languageId = struct.unpack_from("<5I", data, 4)
+        try:
+            self.language = GameTextLanguage(languageId)
+        except ValueError:
+            self.language = GameTextLanguage.Unknown
+        pos: int = 24
+
+        for _ in range(labelCount):
+            util.Verify(data[pos:pos + 4] == CSF_LABEL_MAGIC, f"CSF '{name}' has invalid label at {pos}")
+            labelStringCount, nameLength = struct.unpack_from("<2I", data, pos + 4)
+            pos += 12
+            label = GameTextLabel(data[pos:pos + nameLength].decode("ascii", errors="replace"))
+            pos += nameLength
+
+            for i in range(labelStringCount):
+                magic: bytes = data[pos:pos + 4]
+                util.Verify(magic == CSF_STRING_MAGIC or magic == CSF_WAVE_STRING_MAGIC, f"CSF '{name}' label '{label.name}' has invalid string at {pos}")
+                textLength: int = struct.unpack_from("<I", data, pos + 4)[0]
+                pos += 8
+                encodedText: bytes = bytes(~b & 0xFF for b in data[pos:pos + textLength * 2])
+                pos += textLength * 2
+                string = GameTextString(encodedText.decode("utf-16-le", errors="replace"))
+                if magic == CSF_WAVE_STRING_MAGIC:
+                    speechLength: int = struct.unpack_from("<I", data, pos)[0]
+                    pos += 4
+                    string.speech = data[pos:pos + speechLength].decode("ascii", errors="replace")
+                    pos += speechLength
+                # The game uses the first string of a label.
+                if i == 0:
+                    label.strings[self.language] = string
+
+            self.labels.append(label)
+
+    def SaveCsf(self) -> bytes:
+        """
+        Returns CSF data of the text of the CSF language of all labels.
+        """
+        data = bytearray()
+        label: GameTextLabel
+        strings = list[tuple[GameTextLabel, GameTextString | None]]()
+
+        for label in self.labels:
+            strings.append((label, label.GetString(self.language)))
+
+        stringCount: int = sum(1 for _, string in strings if string != None)
+        data += CSF_MAGIC
+        data += struct.pack("<5I", CSF_VERSION, len(strings), stringCount, 0, self.language.value)
+
+        for label, string in strings:
+            encodedName: bytes = label.name.encode("ascii")
+            data += CSF_LABEL_MAGIC
+            data += struct.pack("<2I", 1 if string != None else 0, len(encodedName))
+            data += encodedName
+            if string != None:
+                encodedText: bytes = string.text.encode("utf-16-le")
+                data += CSF_WAVE_STRING_MAGIC if string.speech else CSF_STRING_MAGIC
+                data += struct.pack("<I", len(encodedText) // 2)
+                data += bytes(~b & 0xFF for b in encodedText)
+                if string.speech:
+                    encodedSpeech: bytes = string.speech.encode("ascii")
+                    data += struct.pack("<I", len(encodedSpeech))
+                    data += encodedSpeech
+
+        return bytes(data)
+
+    def SelectLanguage(self, language: GameTextLanguage) -> None:
+        """
+        Keeps the text of language in all labels and makes it the CSF language. Labels without it keep their common text.
+        Labels with text of other languages only get empty text, like gametextcompiler writes them.
+        """
+        label: GameTextLabel
+        for label in self.labels:
+            string: GameTextString = label.GetString(language)
+            if string == None and label.strings:
+                string = GameTextString("")
+            label.strings = {language: string} if string != None else {}
+        self.language = language
+
+    def SetLanguage(self, language: GameTextLanguage) -> None:
+        """
+        Moves the text of the CSF language to language and makes it the CSF language.
+        """
+        label: GameTextLabel
+        for label in self.labels:
+            string: GameTextString = label.GetString(self.language)
+            label.strings = {language: string} if string != None else {}
+        self.language = language
+
+    @staticmethod
+    def __FindQuoteEnd(line: str, start: int) -> int:
+        i: int = start
+        while i < len(line):
+            if line[i] == "\\":
+                i += 2
+                continue
+            if line[i] == '"':
+                return i
+            i += 1
+        return -1
+
+    @staticmethod
+    def __Unescape(text: str) -> str:
+        ESCAPES = {"n": "\n", "t": "\t", '"': '"', "\\": "\\"}
+        return re.sub(r'\\(.)', lambda match: ESCAPES.get(match.group(1), match.group(0)), text, flags=re.DOTALL)
+
+    @staticmethod
+    def __FormatStrString(string: GameTextString) -> str:
+        text: str = string.text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")
+        if string.speech:
+            return f'"{text}"={string.speech}'
+        return f'"{text}"'
+
+
+def CompileStrToCsf(strText: str, languages: list[GameTextLanguage] = None, swapAndSetLanguage: GameTextLanguage = None, name: str = "") -> bytes:
+    """
+    Returns CSF data of STR text. languages selects the text to compile from a multi language STR,
+    of which the first is used. swapAndSetLanguage stores the text as this language.
+    """
+    gameText = GameText()
+    gameText.LoadStr(strText, name)
+
+    if languages:
+        gameText.SelectLanguage(languages[0])
+    elif gameText.GetLanguages():
+        gameText.SelectLanguage(GameTextLanguage.English)
+
+    if swapAndSetLanguage != None:
+        gameText.SetLanguage(swapAndSetLanguage)
+
+    return gameText.SaveCsf()
+
+
+def DecompileCsfToStr(csfData: bytes, languages: list[GameTextLanguage] = None, name: str = "") -> str:
+    """
+    Returns STR text of CSF data. With languages, the text is written with language codes.
+    """
+    gameText = GameText()
+    gameText.LoadCsf(csfData, name)
+
+    if languages:
+        gameText.SetLanguage(languages[0])
+
+    return gameText.SaveStr(languages)
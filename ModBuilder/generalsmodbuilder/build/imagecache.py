@@ -0,0 +1,139 @@
+import numpy as np
+import os
+import threading
+import psd_tools
+from collections import OrderedDict
+import PIL
+import PIL.Image
+from PIL.Image import Image as PILImage
+from generalsmodbuilder.build.buildcache import BuildCache
+from generalsmodbuilder import util
+
+
+# Max size of the decoded images that each process keeps in memory.
+DECODED_IMAGE_CACHE_MAX_MEMORY_MB = 256
+
+# Is part of the keys of all decoded images. Must be changed when the decoding changes.
+# The versions of the decoding libraries are part of the keys as well.
+DECODED_IMAGE_CACHE_VERSION = "1"
+
+
+class DecodedImageCache:
+    """
+    Caches decoded images, like composited PSD files, so that a source that is converted to multiple targets is
+    decoded only once. Images are keyed by the digest of their source file and kept in memory of the process,
+    with the least recently used images dropped beyond the memory limit. With a build cache that stores decoded images,
+    images are stored as raw NumPy arrays in the build cache directory as well, so that other processes and later builds
+    can load them instead of decoding again. These entries are evicted together with the other build cache entries.
+    """
+    maxMemory: int
+    memorySize: int
+    images: OrderedDict[str, PILImage]
+    lock: threading.Lock
+
+    def __init__(self, maxMemoryMB: int = DECODED_IMAGE_CACHE_MAX_MEMORY_MB):
+        self.maxMemory = maxMemoryMB * 1024 * 1024
+        self.memorySize = 0
+        self.images = OrderedDict[str, PILImage]()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def MakeKey(digest: str, kind: str) -> str:
+        """
+        Returns key of the decoded image of kind of the source file with digest.
+        """
+        return BuildCache.MakeKey(["DecodedImage", DECODED_IMAGE_CACHE_VERSION, psd_tools.__version__, PIL.__version__, np.__version__, kind, digest])
+
+    def Get(self, key: str, buildCache: BuildCache = None) -> PILImage | None:
+        """
+        Returns copy of the cached image of key, or None if it is not cached.
+        """
+        with self.lock:
+            img: PILImage | None = self.images.get(key)
+            if img != None:
+                self.images.move_to_end(key)
+                return img.copy()
+
+        if buildCache != None:
+            img = DecodedImageCache.__LoadFromDisk(buildCache.GetEntryPath(key))
+            if img != None:
+                self.__PutInMemory(key, img)
+                return img.copy()
+
+        return None
+
+    def Put(self, key: str, img: PILImage, buildCache: BuildCache = None) -> None:
+        """
+        Adds a copy of img to the cache.
+        """
+        img = img.copy()
+        self.__PutInMemory(key, img)
+
+        if buildCache != None:
+            DecodedImageCache.__SaveToDisk(buildCache.GetEntryPath(key), img)
+
+    def __PutInMemory(self, key: str, img: PILImage) -> None:
+        size: int = DecodedImageCache.__GetImageSize(img)
+        if size > self.maxMemory:
+            return
+
+        with self.lock:
+            oldImg: PILImage | None = self.images.pop(key, None)
+            if oldImg != None:
+                self.memorySize -= DecodedImageCache.__GetImageSize(oldImg)
+
+            self.images[key] = img
+            self.memorySize += size
+
+            while self.memorySize > self.maxMemory:
+                droppedImg: PILImage
+                key, droppedImg = self.images.popitem(last=False)
+                self.memorySize -= DecodedImageCache.__GetImageSize(droppedImg)
+
+    @staticmethod
+    def __GetImageSize(img: PILImage) -> int:
+        return img.width * img.height * len(img.getbands())
+
+    @staticmethod
+    def __LoadFromDisk(path: str) -> PILImage | None:
+        if not os.path.isfile(path):
+            return None
+
+        try:
+            pixels: np.ndarray = np.load(path, allow_pickle=False)
+            # The modified time orders the entries for eviction.
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        if pixels.ndim == 2:
+            return PIL.Image.fromarray(pixels, "L")
+        if pixels.ndim == 3 and pixels.shape[2] == 3:
+            return PIL.Image.fromarray(pixels, "RGB")
+        if pixels.ndim == 3 and pixels.shape[2] == 4:
+            return PIL.Image.fromarray(pixels, "RGBA")
+        return None
+
+    @staticmethod
+    def __SaveToDisk(path: str, img: PILImage) -> None:
+        if img.mode not in ("L", "RGB", "RGBA"):
+            return
+
+        tmpPath: str = f"{path}.{os.getpid()}.tmp"
+        try:
+            util.MakeDirsForFile(path)
+            with open(tmpPath, "wb") as wfile:
+                np.save(wfile, np.asarray(img), allow_pickle=False)
+            os.replace(tmpPath, path)
+        except OSError:
+            util.DeleteFile(tmpPath)
+
+
+g_decodedImageCache = DecodedImageCache()
+
+
+def GetDecodedImageCache() -> DecodedImageCache:
+    """
+    Returns the decoded image cache of this process. Each process of the process pool keeps its own.
+    """
+    return g_decodedImageCache
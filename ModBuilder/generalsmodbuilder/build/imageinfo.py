@@ -0,0 +1,184 @@
+import struct
+from dataclasses import dataclass
+import PIL
+import PIL.Image
+from generalsmodbuilder.build.buildstate import BuildStateStore, ImageInfoRowT, ImageInfoRowsT
+from generalsmodbuilder import util
+
+
+# File extensions of the images that have image infos.
+IMAGE_INFO_FILE_EXTS: set[str] = {"bmp", "dds", "psd", "tga", "tif", "tiff"}
+
+# Is part of the keys of all persisted image infos. Must be changed when the reading of image infos changes.
+IMAGE_INFO_VERSION = "2"
+
+PSD_MAGIC = b"8BPS"
+PSD_HEADER_SIZE = 26
+PSD_RESOURCE_VERSION_INFO = 1057
+
+# Names of the PSD color modes, by PSD color mode id.
+PSD_COLOR_MODE_NAMES: dict[int, str] = {
+    0: "1",
+    1: "L",
+    2: "P",
+    3: "RGB",
+    4: "CMYK",
+    7: "Multichannel",
+    8: "Duotone",
+    9: "LAB",
+}
+
+
+@dataclass
+class ImageInfo:
+    width: int
+    height: int
+    mode: str
+    # Number of channels stored in the file. PSD files can store multiple alpha channels.
+    channels: int
+    hasAlpha: bool
+
+
+ImageInfosT = dict[str, ImageInfo]
+
+
+def HasImageInfo(filePath: str) -> bool:
+    return util.GetFileExt(filePath).lower() in IMAGE_INFO_FILE_EXTS
+
+
+def ReadImageInfo(filePath: str) -> ImageInfo | None:
+    """
+    Returns image info of an image file, or None if it is not a readable image. Reads the file header only and never decodes pixels.
+    """
+    try:
+        if util.GetFileExt(filePath).lower() == "psd":
+            return __ReadPsdImageInfo(filePath)
+
+        # Opening an image with Pillow is lazy and does read the header only.
+        with PIL.Image.open(fp=filePath) as img:
+            return ImageInfo(
+                width=img.width,
+                height=img.height,
+                mode=img.mode,
+                channels=len(img.getbands()),
+                hasAlpha=img.mode == "RGBA" or img.mode == "RGBX")
+
+    except (OSError, SyntaxError, ValueError, struct.error):
+        return None
+
+
+def __ReadPsdImageInfo(filePath: str) -> ImageInfo | None:
+    with open(filePath, "rb") as rfile:
+        header: bytes = rfile.read(PSD_HEADER_SIZE)
+
+        if len(header) < PSD_HEADER_SIZE or header[0:4] != PSD_MAGIC:
+            return None
+
+        colorModeDataSize: int = struct.unpack(">I", rfile.read(4))[0]
+        rfile.seek(colorModeDataSize, 1)
+        resourcesSize: int = struct.unpack(">I", rfile.read(4))[0]
+        resources: bytes = rfile.read(resourcesSize)
+
+    channels, height, width, depth, colorMode = struct.unpack_from(">HIIHH", header, 12)
+    mode: str = PSD_COLOR_MODE_NAMES.get(colorMode, str(colorMode))
+    # Channels beyond the color channels are alpha channels, which are composited to a single alpha channel.
+    # Without merged image data, the layers are composited instead, which always results in an alpha channel.
+    hasAlpha: bool = mode == "RGB" and (channels > 3 or not __HasPsdMergedImage(resources))
+    if hasAlpha:
+        mode = "RGBA"
+
+    return ImageInfo(width=width, height=height, mode=mode, channels=channels, hasAlpha=hasAlpha)
+
+
+def __HasPsdMergedImage(resources: bytes) -> bool:
+    """
+    Returns whether the PSD has merged image data, which is the composite of its layers, like psd-tools decides it.
+    Is written with "Maximize Compatibility" and is assumed to exist when the version info resource is missing.
+    """
+    pos: int = 0
+
+    while pos + 12 <= len(resources):
+        # The signature is not checked, because other signatures than 8BIM are used by older applications.
+        resourceId: int = struct.unpack_from(">H", resources, pos + 4)[0]
+        nameSize: int = resources[pos + 6]
+        # The name is a Pascal string, padded to an even size.
+        pos += 6 + ((1 + nameSize + 1) & ~1)
+        if pos + 4 > len(resources):
+            break
+        dataSize: int = struct.unpack_from(">I", resources, pos)[0]
+        pos += 4
+
+        if resourceId == PSD_RESOURCE_VERSION_INFO and dataSize >= 5:
+            return resources[pos + 4] != 0
+
+        pos += (dataSize + 1) & ~1
+
+    return True
+
+
+class ImageInfoCache:
+    """
+    Holds the image infos of image files for one build run, keyed by file digest.
+    Image infos are persisted in the build state store and reused in later runs for files with the same digest,
+    so that the headers of unchanged images are not read again.
+    """
+    store: BuildStateStore
+    infos: ImageInfosT
+    newInfos: ImageInfosT
+    storeQueriedDigests: set[str]
+
+    def __init__(self, store: BuildStateStore):
+        self.store = store
+        self.infos = ImageInfosT()
+        self.newInfos = ImageInfosT()
+        self.storeQueriedDigests = set[str]()
+
+    def GetInfos(self, digests: list[str]) -> ImageInfosT:
+        """
+        Returns dictionary of digest to image info. Digests without known image info are not part of the returned dictionary.
+        """
+        self.__LoadDigests(digests)
+        infos = ImageInfosT()
+
+        for digest in digests:
+            info: ImageInfo = self.infos.get(digest)
+            if info != None:
+                infos[digest] = info
+
+        return infos
+
+    def AddInfos(self, infos: ImageInfosT) -> None:
+        """
+        Adds image infos by digest. Infos that are not known yet are written to the store on Save.
+        """
+        digest: str
+        info: ImageInfo
+        for digest, info in infos.items():
+            if digest and self.infos.get(digest) != info:
+                self.infos[digest] = info
+                self.newInfos[digest] = info
+
+    def __LoadDigests(self, digests: list[str]) -> None:
+        digests = [digest for digest in dict.fromkeys(digests) if digest and not digest in self.storeQueriedDigests and not digest in self.infos]
+        if digests:
+            rows: ImageInfoRowsT = self.store.LoadImageInfoRows([ImageInfoCache.__MakeKey(digest) for digest in digests])
+            for digest in digests:
+                row: ImageInfoRowT | None = rows.get(ImageInfoCache.__MakeKey(digest))
+                if row != None:
+                    self.infos[digest] = ImageInfo(*row)
+            self.storeQueriedDigests.update(digests)
+
+    @staticmethod
+    def __MakeKey(digest: str) -> str:
+        return f"{IMAGE_INFO_VERSION}:{digest}"
+
+    def Save(self) -> None:
+        if self.newInfos:
+            print(f"Save image infos of {len(self.newInfos)} files ...")
+            rows = ImageInfoRowsT()
+            digest: str
+            info: ImageInfo
+            for digest, info in self.newInfos.items():
+                rows[ImageInfoCache.__MakeKey(digest)] = (info.width, info.height, info.mode, info.channels, info.hasAlpha)
+            self.store.WriteImageInfoRows(rows)
+            self.newInfos.clear()
@@ -0,0 +1,82 @@
+import numpy as np
+import PIL
+import PIL.Image
+from PIL.Image import Image as PILImage
+from PIL.Image import Resampling
+from generalsmodbuilder import util
+
+
+# Is part of the build cache keys of image conversions. Must be changed when their output changes.
+IMAGE_OPS_VERSION = "1"
+
+
+def MultiplyAlphaChannels(alphas: list[np.ndarray]) -> np.ndarray:
+    """
+    Returns the product of 8 bit alpha channels as 8 bit alpha channel, for example to composite the alpha channels of a PSD.
+    Is rounded after each channel like pasting the channels onto black one after another with Pillow, so results are identical.
+    """
+    util.Verify(len(alphas) > 0, "No alpha channels to multiply")
+
+    # 16 bits hold the product of two 8 bit values with the rounding terms.
+    product: np.ndarray = alphas[0].astype(np.uint16)
+    tmp = np.empty_like(product)
+
+    for alpha in alphas[1:]:
+        # Division by 255 with rounding, like the blending of Pillow: (((x + 128) >> 8) + x + 128) >> 8
+        np.multiply(product, alpha, out=product)
+        np.add(product, 128, out=product)
+        np.right_shift(product, 8, out=tmp)
+        np.add(product, tmp, out=product)
+        np.right_shift(product, 8, out=product)
+
+    return product.astype(np.uint8)
+
+
+def CompositeAlphaChannels(img: PILImage, alphas: list[PILImage]) -> PILImage:
+    """
+    Returns RGBA image with the color of img and the product of the alpha channels as alpha.
+    A single alpha channel is used as is, multiple are multiplied with MultiplyAlphaChannels.
+    """
+    alpha: PILImage
+    if len(alphas) == 1:
+        alpha = alphas[0]
+    else:
+        alpha = PIL.Image.fromarray(MultiplyAlphaChannels([np.asarray(alpha) for alpha in alphas]), "L")
+
+    rgba: PILImage = img.convert("RGBA")
+    rgba.putalpha(alpha)
+    return rgba
+
+
+def ResizeChannels(pixels: np.ndarray, size: tuple[int, int], resample: Resampling) -> np.ndarray:
+    """
+    Returns array of 8 bit pixels resized to size, with each channel resampled independently.
+    Color is not premultiplied with alpha, so that color is kept where alpha is zero. Four channels are resampled
+    in a single pass as RGBX image, which Pillow does not premultiply. Other channel counts are resampled one by one.
+    """
+    if pixels.ndim == 2:
+        return np.asarray(PIL.Image.fromarray(pixels, "L").resize(size=size, resample=resample))
+
+    channelCount: int = pixels.shape[2]
+
+    if channelCount == 4:
+        img: PILImage = PIL.Image.fromarray(pixels, "RGBX").resize(size=size, resample=resample)
+        return np.asarray(img)
+
+    resized = np.empty((size[1], size[0], channelCount), dtype=np.uint8)
+    for channel in range(channelCount):
+        channelImg: PILImage = PIL.Image.fromarray(np.ascontiguousarray(pixels[:, :, channel]), "L")
+        resized[:, :, channel] = np.asarray(channelImg.resize(size=size, resample=resample))
+
+    return resized
+
+
+def ResizeImageChannels(img: PILImage, size: tuple[int, int], resample: Resampling) -> PILImage:
+    """
+    Returns image resized to size. RGBA images are resized with ResizeChannels to keep color where alpha is zero.
+    Other images, including LA, are resized by Pillow as is.
+    """
+    if img.mode == "RGBA":
+        return PIL.Image.fromarray(ResizeChannels(np.asarray(img), size, resample), img.mode)
+
+    return img.resize(size=size, resample=resample)
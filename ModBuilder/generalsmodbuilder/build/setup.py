@@ -1,6 +1,8 @@
 from enum import Flag, auto
 from dataclasses import dataclass
+from generalsmodbuilder.build.filehasher import DEFAULT_DIFF_HASH_ALGORITHM, GetDiffHashFunction
 from generalsmodbuilder.data.bundles import Bundles
+from generalsmodbuilder.data.cache import Cache
 from generalsmodbuilder.data.folders import Folders
 from generalsmodbuilder.data.runner import Runner
 from generalsmodbuilder.data.tools import Tool, ToolsT
@@ -29,6 +31,10 @@ class BuildSetup:
     printConfig: bool
     verboseLogging: bool
     multiProcessing: bool
+    numHashWorkers: int = 0
+    diffHashAlgorithm: str = DEFAULT_DIFF_HASH_ALGORITHM
+    cache: Cache = None
+    incrementalBig: bool = False
 
     def VerifyTypes(self) -> None:
         util.VerifyType(self.step, BuildStep, "BuildSetup.step")
@@ -39,16 +45,17 @@ class BuildSetup:
         util.VerifyType(self.printConfig, bool, "BuildSetup.printConfig")
         util.VerifyType(self.verboseLogging, bool, "BuildSetup.verboseLogging")
         util.VerifyType(self.multiProcessing, bool, "BuildSetup.multiProcessing")
+        util.VerifyType(self.numHashWorkers, int, "BuildSetup.numHashWorkers")
+        util.VerifyType(self.diffHashAlgorithm, str, "BuildSetup.diffHashAlgorithm")
+        util.VerifyType(self.cache, Cache | None, "BuildSetup.cache")
+        util.VerifyType(self.incrementalBig, bool, "BuildSetup.incrementalBig")
         for key, value in self.tools.items():
             util.VerifyType(key, str, "BuildSetup.tools.key")
             util.VerifyType(value, Tool, "BuildSetup.tools.value")
 
     def VerifyValues(self) -> None:
+        GetDiffHashFunction(self.diffHashAlgorithm)
         if self.tools.get("crunch") == None:
             print(f"Warning: BuildSetup.tools is missing a definition for 'crunch', which may be required to build DDS files.")
-        if self.tools.get("gametextcompiler") == None:
-            print(f"Warning: BuildSetup.tools is missing a definition for 'gametextcompiler', which may be required to build CSF and STR files.")
-        if self.tools.get("generalsbigcreator") == None:
-            print(f"Warning: BuildSetup.tools is missing a definition for 'generalsbigcreator', which may be required to build BIG files.")
         if self.tools.get("blender") == None:
             print(f"Warning: BuildSetup.tools is missing a definition for 'blender', which may be required to build W3D files.")
@@ -2,6 +2,8 @@ import os
 import enum
 from dataclasses import dataclass
 from typing import Any
+from generalsmodbuilder.build.filehasher import FileHashesT
+from generalsmodbuilder.build.imageinfo import ImageInfo
 from generalsmodbuilder.data.bundles import BundleRegistryDefinition, ParamsT
 
 
@@ -31,6 +33,13 @@ class BuildFile:
     parentFile: Any
     params: ParamsT
     registryDef: BundleRegistryDefinition
+    targetDigest: str
+    # Digest of the source as known from the build diff. Is empty when hashing the source was deferred.
+    sourceDigest: str
+    # Digests of the files in a source directory that is archived, as known from the build diff.
+    sourceFileDigests: FileHashesT
+    # Is read from the source file header when the file is copied, unless it is known from a previous build.
+    sourceImageInfo: ImageInfo
 
     def __init__(self):
         self.relTarget = None
@@ -40,6 +49,10 @@ class BuildFile:
         self.parentFile = None
         self.params = None
         self.registryDef = None
+        self.targetDigest = ""
+        self.sourceDigest = ""
+        self.sourceFileDigests = None
+        self.sourceImageInfo = None
 
     def RelTarget(self) -> str:
         return self.relTarget
@@ -1,12 +1,17 @@
+import hashlib
 import os
 from glob import glob
+from typing import Callable
+from generalsmodbuilder.build.bigreader import BigContentDiff, BigContentManifest, DiffBigContentManifests, MakeBigContentManifest
 from generalsmodbuilder.build.engine import BuildEngine
+from generalsmodbuilder.build.filehasher import DEFAULT_DIFF_HASH_ALGORITHM, FileHasher, FileHashesT, GetDiffHashFunction
 from generalsmodbuilder.build.filehashregistry import FileHashRegistry
 from generalsmodbuilder.build.setup import BuildStep, BuildSetup
 from generalsmodbuilder.changelog.generator import FilterChangeLog, GenerateChangeLogDocuments, SortChangeList
 from generalsmodbuilder.changelog.parser import ChangeLog, MakeChangelogFromChangeConfig
 from generalsmodbuilder.data.buildfiles import BuildFiles, MakeBuildFilesFromJsons
 from generalsmodbuilder.data.bundles import Bundles, BundlePack, MakeBundlesFromJsons
+from generalsmodbuilder.data.cache import Cache, MakeCacheFromJsons
 from generalsmodbuilder.data.changeconfig import ChangeConfig, MakeChangeConfigFromJsons
 from generalsmodbuilder.data.folders import Folders, MakeFoldersFromJsons
 from generalsmodbuilder.data.runner import Runner, MakeRunnerFromJsons
@@ -75,6 +80,9 @@ def RunWithConfig(
         printConfig: bool=False,
         verboseLogging: bool=False,
         multiProcessing: bool=False,
+        numHashWorkers: int=0,
+        diffHashAlgorithm: str=DEFAULT_DIFF_HASH_ALGORITHM,
+        incrementalBig: bool=False,
         toolsRootDir: str=None,
         engine: BuildEngine=None) -> None:
 
@@ -98,6 +106,7 @@ def RunWithConfig(
         runner: Runner = MakeRunnerFromJsons(jsonFiles) if (install or uninstall or run) else Runner()
         bundles: Bundles = MakeBundlesFromJsons(jsonFiles)
         tools: ToolsT = MakeToolsFromJsons(jsonFiles, rootDir=toolsRootDir)
+        cache: Cache = MakeCacheFromJsons(jsonFiles)
 
         InstallTools(tools)
 
@@ -121,7 +130,11 @@ def RunWithConfig(
             tools=tools,
             printConfig=printConfig,
             verboseLogging=verboseLogging,
-            multiProcessing=multiProcessing)
+            multiProcessing=multiProcessing,
+            numHashWorkers=numHashWorkers,
+            diffHashAlgorithm=diffHashAlgorithm,
+            cache=cache,
+            incrementalBig=incrementalBig)
 
         if engine == None:
             with BuildEngine() as engine:
@@ -133,9 +146,10 @@ def RunWithConfig(
         print(f"Build Job completed in {timer.GetElapsedSecondsString()} s")
 
 
-def BuildFileHashRegistry(inputPaths: list[str], outputPath: str, outputName: str) -> None:
+def BuildFileHashRegistry(inputPaths: list[str], outputPath: str, outputName: str, numHashWorkers: int=0) -> None:
     registry = FileHashRegistry()
     registry.lowerPath = False
+    relFiles = dict[str, str]()
 
     for inputPath in inputPaths:
         cleanInputPath: str = inputPath.split("*", 1)[0]
@@ -145,10 +159,61 @@ def BuildFileHashRegistry(inputPaths: list[str], outputPath: str, outputName: st
             relFile = inputFile.removeprefix(cleanInputPath)
             relFile = relFile.removeprefix("/")
             relFile = relFile.removeprefix("\\")
-            registry.AddFile(
-                relFile=relFile,
-                size=util.GetFileSize(inputFile),
-                md5=util.GetFileMd5(inputFile),
-                sha256=util.GetFileSha256(inputFile))
+            relFiles[inputFile] = relFile
+
+    md5Hasher = FileHasher(hashFunc=hashlib.md5, numWorkers=numHashWorkers, log=True)
+    sha256Hasher = FileHasher(hashFunc=hashlib.sha256, numWorkers=numHashWorkers, log=True)
+    md5s: FileHashesT = md5Hasher.HashFiles(list(relFiles.keys()))
+    sha256s: FileHashesT = sha256Hasher.HashFiles(list(relFiles.keys()))
+
+    for inputFile, relFile in relFiles.items():
+        registry.AddFile(
+            relFile=relFile,
+            size=util.GetFileSize(inputFile),
+            md5=md5s[inputFile],
+            sha256=sha256s[inputFile])
 
     registry.SaveRegistry(outputPath, outputName)
+
+
+def BuildBigContentManifest(inputPath: str, outputPath: str, diffHashAlgorithm: str=DEFAULT_DIFF_HASH_ALGORITHM, numHashWorkers: int=0) -> None:
+    timer = util.Timer()
+    print(f"Make BIG content manifest of {inputPath} ...")
+
+    hashFunc: Callable = GetDiffHashFunction(diffHashAlgorithm)
+    manifest: BigContentManifest = MakeBigContentManifest(inputPath, hashFunc, numHashWorkers)
+    manifest.Save(outputPath)
+
+    print(f"Saved BIG content manifest with {len(manifest.entries)} entries to {outputPath}")
+
+    if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
+        print(f"Make BIG content manifest completed in {timer.GetElapsedSecondsString()} s")
+
+
+def DiffBigContents(oldPath: str, newPath: str, diffHashAlgorithm: str=DEFAULT_DIFF_HASH_ALGORITHM, numHashWorkers: int=0) -> bool:
+    """
+    Compares the files of two BIG archives, directories or BIG content manifests without extracting archives.
+    Returns True if both contain the same files.
+    """
+    timer = util.Timer()
+    print(f"Diff BIG contents of {oldPath} and {newPath} ...")
+
+    hashFunc: Callable = GetDiffHashFunction(diffHashAlgorithm)
+    oldManifest: BigContentManifest = MakeBigContentManifest(oldPath, hashFunc, numHashWorkers)
+    newManifest: BigContentManifest = MakeBigContentManifest(newPath, hashFunc, numHashWorkers)
+    diff: BigContentDiff = DiffBigContentManifests(oldManifest, newManifest)
+
+    name: str
+    for name in diff.added:
+        print(f"Entry {name} is Added")
+    for name in diff.removed:
+        print(f"Entry {name} is Removed")
+    for name in diff.changed:
+        print(f"Entry {name} is Changed")
+
+    print(f"Diff BIG contents with {len(diff.added)} added, {len(diff.removed)} removed and {len(diff.changed)} changed entries")
+
+    if timer.GetElapsedSeconds() > util.PERFORMANCE_TIMER_THRESHOLD:
+        print(f"Diff BIG contents completed in {timer.GetElapsedSecondsString()} s")
+
+    return diff.IsEmpty()
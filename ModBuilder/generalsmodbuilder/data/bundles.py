@@ -278,6 +278,7 @@ class BundlePack:
     allowBuild: bool
     allowInstall: bool
     setGameLanguageOnInstall: str
+    compression: dict[str, Union[str, int]]
     events: BundleEventsT
 
     def __init__(self):
@@ -288,6 +289,8 @@ class BundlePack:
         self.allowBuild = False
         self.allowInstall = False
         self.setGameLanguageOnInstall = ""
+        # Content of these is mostly compressed already, so it is sampled before it is compressed again.
+        self.compression = {"big": "auto", "dds": "auto"}
         self.events = BundleEventsT()
 
     def VerifyTypes(self) -> None:
@@ -298,9 +301,13 @@ class BundlePack:
         util.VerifyType(self.allowBuild, bool, "BundlePack.allowBuild")
         util.VerifyType(self.allowInstall, bool, "BundlePack.allowInstall")
         util.VerifyType(self.setGameLanguageOnInstall, str, "BundlePack.setGameLanguageOnInstall")
+        util.VerifyType(self.compression, dict, "BundlePack.compression")
         util.VerifyType(self.events, dict, "BundlePack.events")
         for itemName in self.itemNames:
             util.VerifyType(itemName, str, "BundlePack.itemNames.value")
+        for ext, method in self.compression.items():
+            util.VerifyType(ext, str, "BundlePack.compression.key")
+            util.VerifyType(method, Union[str, int], "BundlePack.compression.value")
         for type,event in self.events.items():
             util.VerifyType(type, BundleEventType, "BundlePack.events.key")
             util.VerifyType(event, BundleEvent, "BundlePack.events.value")
@@ -310,10 +317,18 @@ class BundlePack:
         util.Verify(util.IsValidPathName(self.name), f"BundlePack.name '{self.name}' has invalid name")
         util.Verify(not self.namePrefix or util.IsValidPathName(self.namePrefix), f"BundlePack.namePrefix '{self.namePrefix}' has invalid name")
         util.Verify(not self.nameSuffix or util.IsValidPathName(self.nameSuffix), f"BundlePack.nameSuffix '{self.nameSuffix}' has invalid name")
+        for ext, method in self.compression.items():
+            if isinstance(method, int):
+                util.Verify(0 <= method <= 9, f"BundlePack.compression '{ext}' has invalid level {method}, must be 0 to 9")
+            else:
+                util.Verify(method in ["store", "deflate", "auto"], f"BundlePack.compression '{ext}' has invalid method '{method}', must be store, deflate, auto or a level")
         for event in self.events.values():
             event.VerifyValues()
 
     def Normalize(self) -> None:
+        # Extensions are matched case insensitive and without dot.
+        self.compression = {ext.lower().lstrip("."): method.lower() if isinstance(method, str) else method
+            for ext, method in self.compression.items()}
         for event in self.events.values():
             event.Normalize()
 
@@ -550,6 +565,7 @@ def __MakeBundlePackFromDict(jPack: dict, jsonDir: str) -> BundlePack:
     pack.allowInstall = jPack.get("install", pack.allowInstall)
     pack.allowBuild = jPack.get("build", pack.allowBuild)
     pack.setGameLanguageOnInstall = jPack.get("setGameLanguageOnInstall", pack.setGameLanguageOnInstall)
+    pack.compression.update(jPack.get("compression", {}))
     pack.events = __MakeBundleEventsFromDict(jPack, jsonDir)
 
     return pack
@@ -0,0 +1,90 @@
+import os.path
+import platformdirs
+from dataclasses import dataclass
+from enum import Enum, auto
+from generalsmodbuilder.util import JsonFile
+from generalsmodbuilder import util
+
+
+class CacheRemoteMode(Enum):
+    Zero = auto()
+    ReadOnly = auto()
+    ReadWrite = auto()
+
+
+@dataclass(init=False)
+class Cache:
+    enabled: bool
+    absDir: str
+    maxSizeMB: int
+    useHardlinks: bool
+    decodedImages: bool
+    remoteUrl: str
+    remoteMode: CacheRemoteMode
+    remoteTimeout: float
+
+    def __init__(self):
+        self.enabled = True
+        self.absDir = os.path.join(platformdirs.user_cache_dir("GeneralsModBuilder", "TheSuperHackers"), "BuildCache")
+        self.maxSizeMB = 4096
+        self.useHardlinks = False
+        self.decodedImages = False
+        self.remoteUrl = ""
+        self.remoteMode = CacheRemoteMode.ReadOnly
+        self.remoteTimeout = 10.0
+
+    def Normalize(self) -> None:
+        self.absDir = os.path.normpath(self.absDir)
+        self.remoteUrl = self.remoteUrl.rstrip("/")
+
+    def VerifyTypes(self) -> None:
+        util.VerifyType(self.enabled, bool, "Cache.enabled")
+        util.VerifyType(self.absDir, str, "Cache.absDir")
+        util.VerifyType(self.maxSizeMB, int, "Cache.maxSizeMB")
+        util.VerifyType(self.useHardlinks, bool, "Cache.useHardlinks")
+        util.VerifyType(self.decodedImages, bool, "Cache.decodedImages")
+        util.VerifyType(self.remoteUrl, str, "Cache.remoteUrl")
+        util.VerifyType(self.remoteMode, CacheRemoteMode, "Cache.remoteMode")
+        util.VerifyType(self.remoteTimeout, float, "Cache.remoteTimeout")
+
+    def VerifyValues(self) -> None:
+        util.Verify(util.IsValidPathName(self.absDir), f"Cache.absDir '{self.absDir}' is not a valid path name")
+        util.Verify(self.maxSizeMB >= 0, f"Cache.maxSizeMB '{self.maxSizeMB}' must not be negative")
+        if self.remoteUrl:
+            util.Verify(self.remoteUrl.startswith(("http://", "https://")), f"Cache.remoteUrl '{self.remoteUrl}' is not a http or https url")
+        util.Verify(self.remoteMode != CacheRemoteMode.Zero, "Cache.remoteMode must be 'readOnly' or 'readWrite'")
+        util.Verify(self.remoteTimeout > 0.0, f"Cache.remoteTimeout '{self.remoteTimeout}' must be positive")
+
+
+def __MakeCacheRemoteModeFromStr(jStr: str) -> CacheRemoteMode:
+    jStrLower: str = jStr.lower()
+    if jStrLower == CacheRemoteMode.ReadOnly.name.lower():
+        return CacheRemoteMode.ReadOnly
+    if jStrLower == CacheRemoteMode.ReadWrite.name.lower():
+        return CacheRemoteMode.ReadWrite
+    return CacheRemoteMode.Zero
+
+
+def MakeCacheFromJsons(jsonFiles: list[JsonFile]) -> Cache:
+    cache = Cache()
+
+    for jsonFile in jsonFiles:
+        jsonDir: str = util.GetAbsSmartFileDir(jsonFile.path)
+        jCache: dict = jsonFile.data.get("cache")
+
+        if jCache:
+            cache.enabled = jCache.get("enabled", cache.enabled)
+            cache.absDir = util.JoinPathIfValid(cache.absDir, jsonDir, jCache.get("dir"))
+            cache.maxSizeMB = jCache.get("maxSizeMB", cache.maxSizeMB)
+            cache.useHardlinks = jCache.get("hardlinks", cache.useHardlinks)
+            cache.decodedImages = jCache.get("decodedImages", cache.decodedImages)
+            cache.remoteUrl = jCache.get("remoteUrl", cache.remoteUrl)
+            jRemoteMode: str = jCache.get("remoteMode")
+            if jRemoteMode:
+                cache.remoteMode = __MakeCacheRemoteModeFromStr(jRemoteMode)
+            cache.remoteTimeout = float(jCache.get("remoteTimeout", cache.remoteTimeout))
+
+    cache.VerifyTypes()
+    cache.Normalize()
+    cache.VerifyValues()
+    return cache
@@ -9,6 +9,7 @@ from typing import Callable
 from generalsmodbuilder import util
 from generalsmodbuilder.__version__ import VERSIONSTR
 from generalsmodbuilder.build.engine import BuildEngine
+from generalsmodbuilder.build.filehasher import DEFAULT_DIFF_HASH_ALGORITHM
 from generalsmodbuilder.buildfunctions import CreateJsonFileList, RunWithConfig
 from generalsmodbuilder.data.bundles import BundlePack, Bundles, AddBundlePacksFromJsons
 from generalsmodbuilder.util import JsonFile
@@ -25,6 +26,9 @@ class Gui:
     buildAndInstallList: list[str]
     debug: bool
     toolsRootDir: str
+    numHashWorkers: int
+    diffHashAlgorithm: str
+    incrementalBig: bool
 
     makeChangeLog: BooleanVar
     clean: BooleanVar
@@ -62,6 +66,9 @@ class Gui:
         self.buildAndInstallList = None
         self.debug = False
         self.toolsRootDir = None
+        self.numHashWorkers = 0
+        self.diffHashAlgorithm = DEFAULT_DIFF_HASH_ALGORITHM
+        self.incrementalBig = False
         self._ClearMainWindowElements()
 
 
@@ -80,6 +87,9 @@ class Gui:
             printConfig: bool = False,
             verboseLogging: bool = False,
             multiProcessing: bool = False,
+            numHashWorkers: int = 0,
+            diffHashAlgorithm: str = DEFAULT_DIFF_HASH_ALGORITHM,
+            incrementalBig: bool = False,
             toolsRootDir: str = None):
 
         self.configPaths = configPaths
@@ -87,6 +97,9 @@ class Gui:
         self.buildAndInstallList.extend(buildList)
         self.debug = debug
         self.toolsRootDir = toolsRootDir
+        self.numHashWorkers = numHashWorkers
+        self.diffHashAlgorithm = diffHashAlgorithm
+        self.incrementalBig = incrementalBig
 
         mainWindow: Tk = Gui._CreateMainWindow()
 
@@ -337,6 +350,9 @@ class Gui:
             printConfig=self.printConfig.get(),
             verboseLogging=self.verboseLogging.get(),
             multiProcessing=self.multiProcessing.get(),
+            numHashWorkers=self.numHashWorkers,
+            diffHashAlgorithm=self.diffHashAlgorithm,
+            incrementalBig=self.incrementalBig,
             toolsRootDir=self.toolsRootDir,
             engine=self.buildEngine)
 
@@ -363,6 +379,9 @@ class Gui:
             printConfig=self.printConfig.get(),
             verboseLogging=self.verboseLogging.get(),
             multiProcessing=self.multiProcessing.get(),
+            numHashWorkers=self.numHashWorkers,
+            diffHashAlgorithm=self.diffHashAlgorithm,
+            incrementalBig=self.incrementalBig,
             toolsRootDir=self.toolsRootDir,
             engine=self.buildEngine)
 
@@ -378,6 +397,9 @@ class Gui:
             printConfig=self.printConfig.get(),
             verboseLogging=self.verboseLogging.get(),
             multiProcessing=self.multiProcessing.get(),
+            numHashWorkers=self.numHashWorkers,
+            diffHashAlgorithm=self.diffHashAlgorithm,
+            incrementalBig=self.incrementalBig,
             toolsRootDir=self.toolsRootDir,
             engine=self.buildEngine)
 
@@ -393,6 +415,9 @@ class Gui:
             printConfig=self.printConfig.get(),
             verboseLogging=self.verboseLogging.get(),
             multiProcessing=self.multiProcessing.get(),
+            numHashWorkers=self.numHashWorkers,
+            diffHashAlgorithm=self.diffHashAlgorithm,
+            incrementalBig=self.incrementalBig,
             toolsRootDir=self.toolsRootDir,
             engine=self.buildEngine)
 
@@ -408,6 +433,9 @@ class Gui:
             printConfig=self.printConfig.get(),
             verboseLogging=self.verboseLogging.get(),
             multiProcessing=self.multiProcessing.get(),
+            numHashWorkers=self.numHashWorkers,
+            diffHashAlgorithm=self.diffHashAlgorithm,
+            incrementalBig=self.incrementalBig,
             toolsRootDir=self.toolsRootDir,
             engine=self.buildEngine)
 
@@ -423,6 +451,9 @@ class Gui:
             printConfig=self.printConfig.get(),
             verboseLogging=self.verboseLogging.get(),
             multiProcessing=self.multiProcessing.get(),
+            numHashWorkers=self.numHashWorkers,
+            diffHashAlgorithm=self.diffHashAlgorithm,
+            incrementalBig=self.incrementalBig,
             toolsRootDir=self.toolsRootDir,
             engine=self.buildEngine)
 
@@ -438,6 +469,9 @@ class Gui:
             printConfig=self.printConfig.get(),
             verboseLogging=self.verboseLogging.get(),
             multiProcessing=self.multiProcessing.get(),
+            numHashWorkers=self.numHashWorkers,
+            diffHashAlgorithm=self.diffHashAlgorithm,
+            incrementalBig=self.incrementalBig,
             toolsRootDir=self.toolsRootDir,
             engine=self.buildEngine)
 
@@ -4,7 +4,8 @@ import traceback
 from argparse import ArgumentParser
 from generalsmodbuilder.__version__ import VERSIONSTR
 from generalsmodbuilder.build.engine import BuildEngine
-from generalsmodbuilder.buildfunctions import RunWithConfig, BuildFileHashRegistry
+from generalsmodbuilder.build.filehasher import DEFAULT_DIFF_HASH_ALGORITHM, DIFF_HASH_ALGORITHMS
+from generalsmodbuilder.buildfunctions import RunWithConfig, BuildFileHashRegistry, BuildBigContentManifest, DiffBigContents
 from generalsmodbuilder.gui.gui import Gui
 from generalsmodbuilder import util
 
@@ -29,10 +30,16 @@ def Main(args=None):
     parser.add_argument('--print-config', action='store_true')
     parser.add_argument('--verbose-logging', action='store_true')
     parser.add_argument('--multi-processing', action='store_true')
+    parser.add_argument('--hash-workers', type=int, default=0, help='Number of threads used to hash files. By default a count is chosen from the number of CPU cores.')
+    parser.add_argument('--diff-hash-algorithm', type=str, default=DEFAULT_DIFF_HASH_ALGORITHM, choices=DIFF_HASH_ALGORITHMS, help='Hash algorithm used to detect file changes between builds. Changing it rehashes all files on the next build. xxh3 requires the xxhash package.')
+    parser.add_argument('--incremental-big', action='store_true', help='Updates existing BIG archives in place instead of rewriting them. Speeds up builds of small changes in large items. Archives can contain unused gaps, so this is not meant for release builds.')
     parser.add_argument('--tools-root-dir', type=str, default=None, help='The root directory of tools. By default the directory of the tools json file is used as the root directory for its specified tools.')
     parser.add_argument('--file-hash-registry-input', type=str, action="append", help='Path to generate file hash registry from. Multiples can be specified.')
     parser.add_argument('--file-hash-registry-output', type=str, help='Path to save file hash registry to.')
     parser.add_argument('--file-hash-registry-name', type=str, default="FileHashRegistry", help='Name of the file hash registry.')
+    parser.add_argument('--big-manifest-input', type=str, help='Path of BIG archive or directory to generate BIG content manifest from.')
+    parser.add_argument('--big-manifest-output', type=str, help='Path to save BIG content manifest (json) to.')
+    parser.add_argument('--big-diff', type=str, nargs=2, metavar=('OLD', 'NEW'), help='Compares the files of two BIG archives, directories or BIG content manifests without extracting them.')
     parser.add_argument('--load-default-runner', action='store_true', help='Loads the built-in runner json configuration. Is loaded before custom configurations from --config and --config-list.')
     parser.add_argument('--load-default-tools', action='store_true', help='Loads the built-in tools json configuration. Is loaded before custom configurations from --config and --config-list.')
     parser.add_argument('--make-change-log', action='store_true', help='Generates change log(s) according to the given change log json setup')
@@ -43,7 +50,24 @@ def Main(args=None):
         BuildFileHashRegistry(
             args.file_hash_registry_input,
             args.file_hash_registry_output,
-            args.file_hash_registry_name)
+            args.file_hash_registry_name,
+            args.hash_workers)
+        return
+
+    if args.big_manifest_input and args.big_manifest_output:
+        BuildBigContentManifest(
+            args.big_manifest_input,
+            args.big_manifest_output,
+            args.diff_hash_algorithm,
+            args.hash_workers)
+        return
+
+    if args.big_diff:
+        DiffBigContents(
+            args.big_diff[0],
+            args.big_diff[1],
+            args.diff_hash_algorithm,
+            args.hash_workers)
         return
 
     # Populate install pack name list.
@@ -103,6 +127,9 @@ def Main(args=None):
     printConfig = bool(args.print_config)
     verboseLogging = bool(args.verbose_logging)
     multiProcessing = bool(args.multi_processing)
+    numHashWorkers = int(args.hash_workers)
+    diffHashAlgorithm = str(args.diff_hash_algorithm)
+    incrementalBig = bool(args.incremental_big)
     toolsRootDir = args.tools_root_dir
 
     if toolsRootDir:
@@ -125,6 +152,9 @@ def Main(args=None):
             printConfig=printConfig,
             verboseLogging=verboseLogging,
             multiProcessing=multiProcessing,
+            numHashWorkers=numHashWorkers,
+            diffHashAlgorithm=diffHashAlgorithm,
+            incrementalBig=incrementalBig,
             toolsRootDir=toolsRootDir)
     else:
         def RunWithConfigWrapper():
@@ -142,6 +172,9 @@ def Main(args=None):
                 printConfig=printConfig,
                 verboseLogging=verboseLogging,
                 multiProcessing=multiProcessing,
+                numHashWorkers=numHashWorkers,
+                diffHashAlgorithm=diffHashAlgorithm,
+                incrementalBig=incrementalBig,
                 toolsRootDir=toolsRootDir)
         if debug:
             RunWithConfigWrapper()
@@ -3,14 +3,21 @@ import subprocess
 import sys
 import time
 import types
-import winreg
 import json
 import hashlib
 import pickle
 import shutil
+import stat
+import threading
 from copy import copy
 from typing import Any, Callable, Union
 
+try:
+    import winreg
+except ImportError:
+    # Windows only. The registry functions fail gracefully on other platforms.
+    winreg = None
+
 
 class Timer:
     start: float
@@ -155,7 +162,11 @@ class YamlFile:
         VerifyType(self.data, dict, "YamlFile.data")
 
 
-def GetRegKeyValue(path, root=winreg.HKEY_LOCAL_MACHINE) -> Union[int, str, None]:
+def GetRegKeyValue(path, root=None) -> Union[int, str, None]:
+    if winreg == None:
+        return None
+    if root == None:
+        root = winreg.HKEY_LOCAL_MACHINE
     path, name = str.split(path, sep=':')
     try:
         with winreg.OpenKey(root, path, 0, winreg.KEY_READ|winreg.KEY_WOW64_32KEY) as key:
@@ -168,7 +179,11 @@ def GetRegKeyValue(path, root=winreg.HKEY_LOCAL_MACHINE) -> Union[int, str, None
         return None
 
 
-def SetRegKeyValue(path: str, value: Union[int, str], root=winreg.HKEY_LOCAL_MACHINE, regtype=None) -> bool:
+def SetRegKeyValue(path: str, value: Union[int, str], root=None, regtype=None) -> bool:
+    if winreg == None:
+        return False
+    if root == None:
+        root = winreg.HKEY_LOCAL_MACHINE
     try:
         path, name = str.split(path, sep=':')
         with winreg.OpenKey(root, path, 0, winreg.KEY_WRITE|winreg.KEY_READ|winreg.KEY_WOW64_32KEY) as key:
@@ -378,10 +393,19 @@ def GetFileSha256(path: str, log: bool=True) -> str:
 
 
 g_fileHashCount: int = 0
+g_fileHashCountLock = threading.Lock()
 
 def ResetFileHashCount() -> None:
     global g_fileHashCount
-    g_fileHashCount = 0
+    with g_fileHashCountLock:
+        g_fileHashCount = 0
+
+
+def __IncrementFileHashCount() -> int:
+    global g_fileHashCount
+    with g_fileHashCountLock:
+        g_fileHashCount += 1
+        return g_fileHashCount
 
 
 def GetFileHash(path: str, hashFunc: Callable, log: bool=True) -> str:
@@ -395,15 +419,76 @@ def GetFileHash(path: str, hashFunc: Callable, log: bool=True) -> str:
                 hashObj.update(chunk)
             hashStr = hashObj.hexdigest()
 
-            global g_fileHashCount
-            g_fileHashCount += 1
+            count: int = __IncrementFileHashCount()
             if log:
-                print(f"Hashed ({g_fileHashCount}) {path} as {hashStr} in {timer.GetElapsedSecondsString()} s")
+                print(f"Hashed ({count}) {path} as {hashStr} in {timer.GetElapsedSecondsString()} s")
     except:
         pass
     return hashStr
 
 
+class HashingFileWriter:
+    """
+    Writes to a binary file and hashes all written bytes on the way.
+    Is not seekable, so that the digest always matches the written file.
+    """
+    name: str
+    file: Any
+    hashObj: Any
+    position: int
+
+    def __init__(self, path: str, hashFunc: Callable):
+        self.name = path
+        self.file = open(path, "wb")
+        self.hashObj = hashFunc()
+        self.position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, data: bytes) -> int:
+        self.hashObj.update(data)
+        self.position += len(data)
+        return self.file.write(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def seekable(self) -> bool:
+        return False
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def hexdigest(self) -> str:
+        return self.hashObj.hexdigest()
+
+
+def CopyFileWithHash(source: str, target: str, hashFunc: Callable) -> str:
+    """
+    Copies file and permission bits like shutil.copy and returns the hash of the copied bytes.
+    """
+    BUF_SIZE = 1024 * 64
+    with open(source, "rb", buffering=BUF_SIZE) as rfile:
+        with HashingFileWriter(target, hashFunc) as wfile:
+            for chunk in iter(lambda: rfile.read(BUF_SIZE), b""):
+                wfile.write(chunk)
+    shutil.copymode(source, target)
+    return wfile.hexdigest()
+
+
+def WriteFileWithHash(path: str, data: bytes, hashFunc: Callable) -> str:
+    with HashingFileWriter(path, hashFunc) as wfile:
+        wfile.write(data)
+    return wfile.hexdigest()
+
+
 def GetFileModifiedTime(path: str) -> float:
     try:
         return os.path.getmtime(path)
@@ -411,6 +496,22 @@ def GetFileModifiedTime(path: str) -> float:
         return 0.0
 
 
+# st_mtime_ns, st_size, st_ino, st_dev
+FileFingerprintT = tuple[int, int, int, int]
+
+def GetFileFingerprint(path: str) -> FileFingerprintT | None:
+    """
+    Returns stat fingerprint of a regular file. Returns None for missing files and directories.
+    """
+    try:
+        result: os.stat_result = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(result.st_mode):
+        return None
+    return (result.st_mtime_ns, result.st_size, result.st_ino, result.st_dev)
+
+
 if sys.platform == 'win32':
     g_disallowedPathChars = set("<>\"|?*/")
 else:
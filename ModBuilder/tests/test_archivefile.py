@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+from generalsmodbuilder.build.archivefile import ARCHIVE_BLOCK_SIZE, ReadZipInputDigest, WriteGzTarFile, WriteTarFile, WriteZipFile, ZipCompressionPolicy
+from generalsmodbuilder import util
+
+
+class ArchiveFileTest(unittest.TestCase):
+    """
+    ZIP and TAR archives are written by hand with parallel compression, so they must remain readable by the standard modules.
+    """
+    tmpDir: tempfile.TemporaryDirectory
+    files: dict[str, bytes]
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.files = {
+            "empty.txt": b"",
+            "Data/INI/Weapon.ini": b"Weapon Gun\nEnd\n" * 100,
+            "Data/Lang/Übersetzung 中文.txt": "Grüße".encode("utf-8"),
+            # Larger than one compression block, with compressible and incompressible parts.
+            "Art/Textures/large.tga": b"\0" * ARCHIVE_BLOCK_SIZE + os.urandom(ARCHIVE_BLOCK_SIZE // 2) + b"\1" * 1000,
+        }
+
+    def tearDown(self):
+        self.tmpDir.cleanup()
+
+    def __MakePath(self, name: str) -> str:
+        return os.path.join(self.tmpDir.name, name)
+
+    def __WriteSourceFile(self, name: str, data: bytes) -> None:
+        path: str = os.path.join(self.__MakePath("source"), name)
+        util.MakeDirsForFile(path)
+        with open(path, "wb") as wfile:
+            wfile.write(data)
+
+    def __MakeSourceDir(self) -> str:
+        for name, data in self.files.items():
+            self.__WriteSourceFile(name, data)
+        return self.__MakePath("source")
+
+    def __ReadFile(self, path: str) -> bytes:
+        with open(path, "rb") as rfile:
+            return rfile.read()
+
+    def __AssertZipMatchesFiles(self, absZip: str) -> None:
+        with zipfile.ZipFile(absZip) as archive:
+            self.assertIsNone(archive.testzip())
+            fileNames: list[str] = [info.filename for info in archive.infolist() if not info.is_dir()]
+            self.assertCountEqual(fileNames, self.files.keys())
+            for name, data in self.files.items():
+                self.assertEqual(archive.read(name), data)
+
+    def __AssertTarMatchesFiles(self, tar: tarfile.TarFile) -> None:
+        members: dict[str, tarfile.TarInfo] = {os.path.normpath(member.name).replace(os.sep, "/"): member for member in tar.getmembers() if member.isfile()}
+        self.assertCountEqual(members.keys(), self.files.keys())
+        for name, data in self.files.items():
+            self.assertEqual(tar.extractfile(members[name]).read(), data)
+
+    def test_zip(self):
+        absZip: str = self.__MakePath("test.zip")
+        compression = ZipCompressionPolicy({"tga": "auto", "txt": "store", "*": 9})
+
+        digest: str = WriteZipFile(absZip, self.__MakeSourceDir(), hashlib.sha256, numWorkers=2, compression=compression, inputDigest="abc")
+
+        self.assertEqual(digest, hashlib.sha256(self.__ReadFile(absZip)).hexdigest())
+        self.assertEqual(ReadZipInputDigest(absZip), "abc")
+        self.__AssertZipMatchesFiles(absZip)
+
+        with zipfile.ZipFile(absZip) as archive:
+            info: zipfile.ZipInfo = archive.getinfo("Data/Lang/Übersetzung 中文.txt")
+            self.assertTrue(info.flag_bits & 0x800)
+            self.assertEqual(info.compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(archive.getinfo("Data/INI/Weapon.ini").compress_type, zipfile.ZIP_DEFLATED)
+
+    def test_zip_is_reproducible(self):
+        absSourceDir: str = self.__MakeSourceDir()
+        absZip1: str = self.__MakePath("test1.zip")
+        absZip2: str = self.__MakePath("test2.zip")
+
+        WriteZipFile(absZip1, absSourceDir, hashlib.sha256, numWorkers=1)
+        WriteZipFile(absZip2, absSourceDir, hashlib.sha256, numWorkers=4)
+
+        self.assertEqual(self.__ReadFile(absZip1), self.__ReadFile(absZip2))
+
+    def test_zip_update(self):
+        absSourceDir: str = self.__MakeSourceDir()
+        absZip: str = self.__MakePath("test.zip")
+        absManifest: str = self.__MakePath("test.json")
+
+        WriteZipFile(absZip, absSourceDir, hashlib.sha256, absManifest=absManifest)
+        self.assertTrue(os.path.isfile(absManifest))
+
+        # Changes size and content of one entry in front of the unchanged entries, so that they are moved.
+        self.files["Art/Textures/large.tga"] = os.urandom(ARCHIVE_BLOCK_SIZE + 1)
+        self.__WriteSourceFile("Art/Textures/large.tga", self.files["Art/Textures/large.tga"])
+
+        # Only the changed entry is compressed again, the others are copied from the previous archive.
+        with mock.patch.object(ZipCompressionPolicy, "GetLevel", wraps=ZipCompressionPolicy.GetLevel) as getLevel:
+            digest: str = WriteZipFile(absZip, absSourceDir, hashlib.sha256, absManifest=absManifest)
+        self.assertEqual([call.args[1] for call in getLevel.call_args_list], [os.path.join(absSourceDir, "Art", "Textures", "large.tga")])
+
+        self.assertEqual(digest, hashlib.sha256(self.__ReadFile(absZip)).hexdigest())
+        self.__AssertZipMatchesFiles(absZip)
+
+        absFreshZip: str = self.__MakePath("fresh.zip")
+        WriteZipFile(absFreshZip, absSourceDir, hashlib.sha256)
+        self.assertEqual(self.__ReadFile(absZip), self.__ReadFile(absFreshZip))
+
+    def test_tar(self):
+        absTar: str = self.__MakePath("test.tar")
+
+        digest: str = WriteTarFile(absTar, self.__MakeSourceDir(), hashlib.sha256)
+
+        self.assertEqual(digest, hashlib.sha256(self.__ReadFile(absTar)).hexdigest())
+        with tarfile.open(absTar, "r:") as tar:
+            self.__AssertTarMatchesFiles(tar)
+
+    def test_gz_tar(self):
+        absSourceDir: str = self.__MakeSourceDir()
+        absTar: str = self.__MakePath("test.tar")
+        absGzTar: str = self.__MakePath("test.tar.gz")
+
+        WriteTarFile(absTar, absSourceDir, hashlib.sha256)
+        digest: str = WriteGzTarFile(absGzTar, absSourceDir, hashlib.sha256, numWorkers=4)
+
+        self.assertEqual(digest, hashlib.sha256(self.__ReadFile(absGzTar)).hexdigest())
+        # The gzip stream contains exactly the uncompressed TAR archive.
+        self.assertEqual(gzip.decompress(self.__ReadFile(absGzTar)), self.__ReadFile(absTar))
+        with tarfile.open(absGzTar, "r:gz") as tar:
+            self.__AssertTarMatchesFiles(tar)
+        with tarfile.open(fileobj=io.BytesIO(self.__ReadFile(absGzTar)), mode="r|gz") as tar:
+            self.assertEqual(len([member for member in tar if member.isfile()]), len(self.files))
+
+
+if __name__ == "__main__":
+    unittest.main()
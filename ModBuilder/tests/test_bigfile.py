@@ -0,0 +1,124 @@
+import hashlib
+import os
+import struct
+import tempfile
+import unittest
+from generalsmodbuilder.build.bigfile import BIG_MAGIC, BigEntriesT, GetBigIndexSize, MakeBigEntriesFromDir, UpdateBigFile, WriteBigFile
+from generalsmodbuilder.build.bigreader import BigReader, BigReaderEntry
+from generalsmodbuilder import util
+
+
+DATA_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bigfile")
+
+
+class BigFileTest(unittest.TestCase):
+    """
+    BIG archives are read by the game, so their layout must match the format that generalsbigcreator writes.
+    """
+    tmpDir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpDir.cleanup()
+
+    def __MakeSourceDir(self) -> str:
+        files: dict[str, bytes] = {
+            "Data/INI/Weapon.ini": b"Weapon Gun\nEnd\n",
+            "Data/INI/armor.ini": b"Armor Tank\nEnd\n",
+            "Art/Textures/b.tga": os.urandom(300000),
+            "Art/Textures/A.tga": os.urandom(1000),
+            "empty.txt": b"",
+        }
+        absDir: str = os.path.join(self.tmpDir.name, "source")
+        for name, data in files.items():
+            path: str = os.path.join(absDir, name)
+            util.MakeDirsForFile(path)
+            with open(path, "wb") as wfile:
+                wfile.write(data)
+        return absDir
+
+    def __ReadFile(self, path: str) -> bytes:
+        with open(path, "rb") as rfile:
+            return rfile.read()
+
+    def __AssertArchiveMatchesDir(self, absBig: str, absDir: str) -> None:
+        data: bytes = self.__ReadFile(absBig)
+        entries: BigEntriesT = MakeBigEntriesFromDir(absDir)
+
+        self.assertEqual(data[0:4], BIG_MAGIC)
+        self.assertEqual(struct.unpack_from("<I", data, 4)[0], len(data))
+        count, indexSize = struct.unpack_from(">II", data, 8)
+        self.assertEqual(count, len(entries))
+        self.assertGreaterEqual(indexSize, GetBigIndexSize(entries))
+
+        with BigReader(absBig) as reader:
+            self.assertEqual(reader.archiveSize, len(data))
+            self.assertEqual([entry.name for entry in reader.entries], [entry.name for entry in entries])
+
+            entry: BigReaderEntry
+            for entry in reader.entries:
+                self.assertGreaterEqual(entry.offset, indexSize)
+                with reader.ReadEntry(entry) as view:
+                    self.assertEqual(bytes(view), self.__ReadFile(os.path.join(absDir, entry.name.replace("\\", os.sep))))
+
+    def test_write(self):
+        absDir: str = self.__MakeSourceDir()
+        absBig: str = os.path.join(self.tmpDir.name, "test.big")
+
+        digest: str = WriteBigFile(absBig, MakeBigEntriesFromDir(absDir), hashlib.sha256)
+
+        self.assertEqual(digest, hashlib.sha256(self.__ReadFile(absBig)).hexdigest())
+        self.__AssertArchiveMatchesDir(absBig, absDir)
+
+        data: bytes = self.__ReadFile(absBig)
+        self.assertEqual(struct.unpack_from(">I", data, 12)[0], GetBigIndexSize(MakeBigEntriesFromDir(absDir)))
+
+        with BigReader(absBig) as reader:
+            names: list[str] = [entry.name for entry in reader.entries]
+        self.assertEqual(names, ["Art\\Textures\\A.tga", "Art\\Textures\\b.tga", "Data\\INI\\armor.ini", "Data\\INI\\Weapon.ini", "empty.txt"])
+
+    def test_write_without_hash(self):
+        absDir: str = self.__MakeSourceDir()
+        absHashedBig: str = os.path.join(self.tmpDir.name, "hashed.big")
+        absCopiedBig: str = os.path.join(self.tmpDir.name, "copied.big")
+
+        WriteBigFile(absHashedBig, MakeBigEntriesFromDir(absDir), hashlib.sha256)
+        self.assertEqual(WriteBigFile(absCopiedBig, MakeBigEntriesFromDir(absDir)), "")
+
+        self.assertEqual(self.__ReadFile(absCopiedBig), self.__ReadFile(absHashedBig))
+
+    def test_update(self):
+        absDir: str = self.__MakeSourceDir()
+        absBig: str = os.path.join(self.tmpDir.name, "test.big")
+        absManifest: str = os.path.join(self.tmpDir.name, "test.json")
+
+        digest: str = UpdateBigFile(absBig, MakeBigEntriesFromDir(absDir), hashlib.sha256, absManifest)
+        self.assertEqual(digest, hashlib.sha256(self.__ReadFile(absBig)).hexdigest())
+
+        # Changed, removed and added entries are updated in place.
+        with open(os.path.join(absDir, "Data", "INI", "armor.ini"), "wb") as wfile:
+            wfile.write(b"Armor\nEnd\n")
+        os.remove(os.path.join(absDir, "empty.txt"))
+        with open(os.path.join(absDir, "added.txt"), "wb") as wfile:
+            wfile.write(b"added")
+
+        digest = UpdateBigFile(absBig, MakeBigEntriesFromDir(absDir), hashlib.sha256, absManifest)
+        self.assertEqual(digest, hashlib.sha256(self.__ReadFile(absBig)).hexdigest())
+        self.__AssertArchiveMatchesDir(absBig, absDir)
+
+    @unittest.skipUnless(os.path.isfile(os.path.join(DATA_DIR, "generalsbigcreator.big")), "Fixture of generalsbigcreator is missing")
+    def test_matches_generalsbigcreator(self):
+        """
+        The fixture is created on Windows with generalsbigcreator of the default tools:
+        generalsbigcreator.exe -source tests/data/bigfile/source -dest tests/data/bigfile/generalsbigcreator.big
+        """
+        absBig: str = os.path.join(self.tmpDir.name, "test.big")
+        WriteBigFile(absBig, MakeBigEntriesFromDir(os.path.join(DATA_DIR, "source")))
+
+        self.assertEqual(self.__ReadFile(absBig), self.__ReadFile(os.path.join(DATA_DIR, "generalsbigcreator.big")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from generalsmodbuilder.build.bigfile import BigEntry, MakeBigEntriesFromDir, WriteBigFile
+from generalsmodbuilder.build.bigreader import BigContentManifest, BigReader, MakeBigContentManifestFromBig, MakeBigContentManifestFromDir
+
+
+class BigReaderTest(unittest.TestCase):
+    """
+    Archives may contain the same name more than once. The game reads the first of them.
+    """
+    tmpDir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpDir.cleanup()
+
+    def __WriteFile(self, name: str, data: bytes) -> str:
+        path: str = os.path.join(self.tmpDir.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as wfile:
+            wfile.write(data)
+        return path
+
+    def __WriteBigWithDuplicates(self) -> str:
+        absBig: str = os.path.join(self.tmpDir.name, "test.big")
+        WriteBigFile(absBig, [
+            BigEntry(self.__WriteFile("first.ini", b"first"), "Data\\INI\\Object.ini"),
+            BigEntry(self.__WriteFile("other.ini", b"other"), "Data\\INI\\Weapon.ini"),
+            BigEntry(self.__WriteFile("second.ini", b"second"), "data/ini/object.ini"),
+        ])
+        return absBig
+
+    def test_hash_entries_with_duplicate_names(self):
+        with BigReader(self.__WriteBigWithDuplicates()) as reader:
+            hashes: list[str] = reader.HashEntries(hashlib.sha256, numWorkers=2)
+            self.assertEqual(reader.FindEntry("DATA\\INI\\OBJECT.INI"), reader.entries[0])
+
+        self.assertEqual(hashes, [hashlib.sha256(data).hexdigest() for data in [b"first", b"other", b"second"]])
+
+    def test_manifest_with_duplicate_names(self):
+        manifest: BigContentManifest = MakeBigContentManifestFromBig(self.__WriteBigWithDuplicates(), hashlib.sha256)
+
+        self.assertEqual([(entry.name, entry.size, entry.digest) for entry in manifest.entries.values()], [
+            ("Data\\INI\\Object.ini", 5, hashlib.sha256(b"first").hexdigest()),
+            ("Data\\INI\\Weapon.ini", 5, hashlib.sha256(b"other").hexdigest()),
+        ])
+
+    def test_manifest_of_big_matches_dir(self):
+        self.__WriteFile("source/Data/INI/Object.ini", b"Object")
+        self.__WriteFile("source/Art/Textures/Tank.tga", os.urandom(1000))
+        absDir: str = os.path.join(self.tmpDir.name, "source")
+        absBig: str = os.path.join(self.tmpDir.name, "test.big")
+        WriteBigFile(absBig, MakeBigEntriesFromDir(absDir))
+
+        bigManifest: BigContentManifest = MakeBigContentManifestFromBig(absBig, hashlib.sha256)
+        dirManifest: BigContentManifest = MakeBigContentManifestFromDir(absDir, hashlib.sha256)
+
+        self.assertEqual(bigManifest.entries, dirManifest.entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from generalsmodbuilder.build import buildcache
+from generalsmodbuilder.build.buildcache import BUILD_CACHE_DIGEST_HEADER, BuildCache
+from generalsmodbuilder.build.buildcacheserver import BuildCacheRequestHandler, MakeBuildCacheServer
+
+
+class BuildCacheTest(unittest.TestCase):
+    """
+    The remote build cache must only add entries that were transferred completely, and must fall back to building locally
+    on every remote failure.
+    """
+    tmpDir: tempfile.TemporaryDirectory
+    servers: list[ThreadingHTTPServer]
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.servers = list[ThreadingHTTPServer]()
+        buildcache.g_disabledRemoteUrls.clear()
+
+    def tearDown(self):
+        server: ThreadingHTTPServer
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        buildcache.g_disabledRemoteUrls.clear()
+        self.tmpDir.cleanup()
+
+    def __MakePath(self, name: str) -> str:
+        return os.path.join(self.tmpDir.name, name)
+
+    def __WriteFile(self, name: str, data: bytes) -> str:
+        path: str = self.__MakePath(name)
+        with open(path, "wb") as wfile:
+            wfile.write(data)
+        return path
+
+    def __ReadFile(self, path: str) -> bytes:
+        with open(path, "rb") as rfile:
+            return rfile.read()
+
+    def __StartServer(self, server: ThreadingHTTPServer) -> str:
+        self.servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+    def __StartBuildCacheServer(self, readOnly: bool = False) -> str:
+        return self.__StartServer(MakeBuildCacheServer(self.__MakePath("remote"), "localhost", 0, readOnly))
+
+    def __MakeCache(self, name: str, remoteUrl: str, remoteWrite: bool) -> BuildCache:
+        return BuildCache(self.__MakePath(name), maxSizeMB=16, remoteUrl=remoteUrl, remoteWrite=remoteWrite, remoteTimeout=5.0)
+
+    def test_hit_and_miss(self):
+        remoteUrl: str = self.__StartBuildCacheServer()
+        writer: BuildCache = self.__MakeCache("writer", remoteUrl, remoteWrite=True)
+        reader: BuildCache = self.__MakeCache("reader", remoteUrl, remoteWrite=False)
+        key: str = BuildCache.MakeKey(["hit"])
+        source: str = self.__WriteFile("source.bin", os.urandom(200000))
+
+        self.assertTrue(writer.Store(key, source))
+
+        target: str = self.__MakePath("target.bin")
+        self.assertEqual(reader.Restore(key, target, hashlib.sha256), hashlib.sha256(self.__ReadFile(source)).hexdigest())
+        self.assertEqual(self.__ReadFile(target), self.__ReadFile(source))
+        self.assertTrue(os.path.isfile(reader.GetEntryPath(key)))
+
+        self.assertIsNone(reader.Restore(BuildCache.MakeKey(["miss"]), self.__MakePath("miss.bin"), hashlib.sha256))
+        self.assertFalse(os.path.exists(self.__MakePath("miss.bin")))
+        self.assertNotIn(remoteUrl, buildcache.g_disabledRemoteUrls)
+
+    def test_read_only(self):
+        remoteUrl: str = self.__StartBuildCacheServer()
+        source: str = self.__WriteFile("source.bin", b"data")
+
+        readOnlyClient: BuildCache = self.__MakeCache("client", remoteUrl, remoteWrite=False)
+        key: str = BuildCache.MakeKey(["readOnlyClient"])
+        self.assertTrue(readOnlyClient.Store(key, source))
+        self.assertFalse(os.path.exists(BuildCache(self.__MakePath("remote"), 0).GetEntryPath(key)))
+
+        readOnlyServerUrl: str = self.__StartBuildCacheServer(readOnly=True)
+        writer: BuildCache = self.__MakeCache("writer", readOnlyServerUrl, remoteWrite=True)
+        key = BuildCache.MakeKey(["readOnlyServer"])
+        self.assertTrue(writer.Store(key, source))
+        self.assertFalse(os.path.exists(BuildCache(self.__MakePath("remote"), 0).GetEntryPath(key)))
+
+    def test_upload_with_wrong_digest_is_rejected(self):
+        remoteUrl: str = self.__StartBuildCacheServer()
+        key: str = BuildCache.MakeKey(["wrongDigest"])
+        connection = socket.create_connection(("localhost", int(remoteUrl.rsplit(":", 1)[1])))
+        request: bytes = (
+            f"PUT /{key} HTTP/1.1\r\nHost: localhost\r\nContent-Length: 4\r\n"
+            f"{BUILD_CACHE_DIGEST_HEADER}: {hashlib.sha256(b'good').hexdigest()}\r\nConnection: close\r\n\r\nbad!").encode("ascii")
+        connection.sendall(request)
+        response: bytes = connection.recv(1024)
+        connection.close()
+
+        self.assertTrue(response.startswith(b"HTTP/1.0 400") or response.startswith(b"HTTP/1.1 400"))
+        self.assertFalse(os.path.exists(BuildCache(self.__MakePath("remote"), 0).GetEntryPath(key)))
+
+    def test_download_with_wrong_digest_is_rejected(self):
+        class CorruptingHandler(BuildCacheRequestHandler):
+            def do_GET(self) -> None:
+                self.send_response(200)
+                self.send_header("Content-Length", "4")
+                self.send_header(BUILD_CACHE_DIGEST_HEADER, hashlib.sha256(b"good").hexdigest())
+                self.end_headers()
+                self.wfile.write(b"bad!")
+
+        remoteUrl: str = self.__StartServer(ThreadingHTTPServer(("localhost", 0), CorruptingHandler))
+        reader: BuildCache = self.__MakeCache("reader", remoteUrl, remoteWrite=False)
+        key: str = BuildCache.MakeKey(["corrupted"])
+
+        self.assertIsNone(reader.Restore(key, self.__MakePath("target.bin"), hashlib.sha256))
+        self.assertFalse(os.path.exists(reader.GetEntryPath(key)))
+        self.assertNotIn(remoteUrl, buildcache.g_disabledRemoteUrls)
+
+    def test_fallback_after_connection_error(self):
+        # Binds a free port without listening, so that connections are refused.
+        sock = socket.socket()
+        sock.bind(("localhost", 0))
+        remoteUrl: str = f"http://localhost:{sock.getsockname()[1]}"
+        cache: BuildCache = self.__MakeCache("client", remoteUrl, remoteWrite=True)
+        key: str = BuildCache.MakeKey(["offline"])
+
+        try:
+            self.assertIsNone(cache.Restore(key, self.__MakePath("target.bin"), hashlib.sha256))
+            self.assertIn(remoteUrl, buildcache.g_disabledRemoteUrls)
+
+            # Builds locally and stores the entry locally only.
+            self.assertTrue(cache.Store(key, self.__WriteFile("source.bin", b"data")))
+            self.assertEqual(cache.Restore(key, self.__MakePath("target.bin"), hashlib.sha256), hashlib.sha256(b"data").hexdigest())
+        finally:
+            sock.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
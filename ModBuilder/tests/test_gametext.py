@@ -0,0 +1,105 @@
+import os
+import struct
+import unittest
+from generalsmodbuilder.build.gametext import CSF_MAGIC, CSF_STRING_MAGIC, CSF_WAVE_STRING_MAGIC, CompileStrToCsf, DecompileCsfToStr, GameText, GameTextLanguage, GameTextString
+
+
+DATA_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gametext")
+
+
+class GameTextTest(unittest.TestCase):
+    """
+    Game text is compiled in process instead of with gametextcompiler, so it must produce the same CSF files.
+    """
+    strText: str
+
+    def setUp(self):
+        with open(os.path.join(DATA_DIR, "multi.str"), "r", encoding="utf-8") as rfile:
+            self.strText = rfile.read()
+
+    def __LoadCsfStrings(self, data: bytes) -> dict[str, GameTextString]:
+        gameText = GameText()
+        gameText.LoadCsf(data)
+        return {label.name: label.GetString(gameText.language) for label in gameText.labels}
+
+    def test_load_str(self):
+        gameText = GameText()
+        gameText.LoadStr(self.strText)
+
+        self.assertEqual(gameText.GetLanguages(), [GameTextLanguage.English, GameTextLanguage.German, GameTextLanguage.Russian])
+        labels: dict = {label.name: label for label in gameText.labels}
+        self.assertEqual(labels["GUI:Hello"].GetString(GameTextLanguage.Russian).text, "Привет")
+        self.assertEqual(labels["GUI:Speech"].GetString(GameTextLanguage.German), GameTextString("Angriff!", "Speech_Attack_DE"))
+        self.assertEqual(labels["GUI:Escapes"].GetString(GameTextLanguage.English).text, 'Tab\tQuote"Backslash\\NewLine\nEnd')
+        self.assertEqual(labels["GUI:MultiLine"].GetString(GameTextLanguage.English).text, "First line\nSecond line")
+        self.assertEqual(labels["GUI:Common"].GetString(GameTextLanguage.Polish).text, "Same in all languages")
+
+    def test_compile(self):
+        data: bytes = CompileStrToCsf(self.strText, [GameTextLanguage.German])
+
+        self.assertEqual(data[0:4], CSF_MAGIC)
+        version, labelCount, stringCount, unused, languageId = struct.unpack_from("<5I", data, 4)
+        self.assertEqual((version, labelCount, stringCount, languageId), (3, 6, 6, GameTextLanguage.German.value))
+        self.assertIn(CSF_WAVE_STRING_MAGIC, data)
+        self.assertIn(CSF_STRING_MAGIC, data)
+
+        strings: dict[str, GameTextString] = self.__LoadCsfStrings(data)
+        self.assertEqual(strings["GUI:Hello"], GameTextString("Hallo"))
+        self.assertEqual(strings["GUI:Speech"], GameTextString("Angriff!", "Speech_Attack_DE"))
+        self.assertEqual(strings["GUI:MultiLine"], GameTextString("Erste Zeile\nZweite Zeile"))
+        self.assertEqual(strings["GUI:Common"], GameTextString("Same in all languages"))
+        # Labels without German text are written with empty text, like gametextcompiler does.
+        self.assertEqual(strings["GUI:EnglishOnly"], GameTextString(""))
+
+    def test_compile_defaults_to_english(self):
+        strings: dict[str, GameTextString] = self.__LoadCsfStrings(CompileStrToCsf(self.strText))
+
+        self.assertEqual(strings["GUI:Hello"], GameTextString("Hello"))
+        self.assertEqual(strings["GUI:Speech"], GameTextString("Attack!", "Speech_Attack"))
+
+    def test_swap_and_set_language(self):
+        data: bytes = CompileStrToCsf(self.strText, [GameTextLanguage.Russian], GameTextLanguage.English)
+
+        self.assertEqual(struct.unpack_from("<I", data, 20)[0], GameTextLanguage.English.value)
+        strings: dict[str, GameTextString] = self.__LoadCsfStrings(data)
+        self.assertEqual(strings["GUI:Hello"], GameTextString("Привет"))
+        self.assertEqual(strings["GUI:Speech"], GameTextString(""))
+
+    def test_round_trip(self):
+        language: GameTextLanguage
+        for language in [GameTextLanguage.English, GameTextLanguage.German]:
+            data: bytes = CompileStrToCsf(self.strText, [language])
+
+            # STR without language codes does not store the language, so it is set again.
+            strText: str = DecompileCsfToStr(data)
+            self.assertEqual(CompileStrToCsf(strText, swapAndSetLanguage=language), data)
+
+            # Writes language codes and compiles with the same language again.
+            strText = DecompileCsfToStr(data, [language])
+            self.assertIn("US: " if language == GameTextLanguage.English else "DE: ", strText)
+            self.assertEqual(CompileStrToCsf(strText, [language]), data)
+
+    def test_unknown_csf_language(self):
+        data = bytearray(CompileStrToCsf(self.strText))
+        struct.pack_into("<I", data, 20, 99)
+
+        gameText = GameText()
+        gameText.LoadCsf(bytes(data))
+
+        self.assertEqual(gameText.language, GameTextLanguage.Unknown)
+        self.assertEqual(len(gameText.labels), 6)
+
+    @unittest.skipUnless(os.path.isfile(os.path.join(DATA_DIR, "gametextcompiler_de.csf")), "Fixture of gametextcompiler is missing")
+    def test_matches_gametextcompiler(self):
+        """
+        The fixture is created on Windows with gametextcompiler of the default tools:
+        gametextcompiler.exe -LOAD_STR tests/data/gametext/multi.str -LOAD_STR_LANGUAGES DE -SAVE_CSF tests/data/gametext/gametextcompiler_de.csf
+        """
+        with open(os.path.join(DATA_DIR, "gametextcompiler_de.csf"), "rb") as rfile:
+            expected: bytes = rfile.read()
+
+        self.assertEqual(CompileStrToCsf(self.strText, [GameTextLanguage.German]), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+import PIL
+import PIL.Image
+from psd_tools import PSDImage
+from psd_tools.api.layers import PixelLayer
+from psd_tools.constants import Resource
+from generalsmodbuilder.build.imageinfo import ImageInfo, ReadImageInfo
+
+
+class ImageInfoTest(unittest.TestCase):
+    """
+    The alpha channel of a PSD image info must match the mode of the PSD composite, because it selects the texture format.
+    """
+    tmpDir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpDir.cleanup()
+
+    def __WriteLayeredPSD(self, name: str, hasMergedImage: bool) -> str:
+        path: str = os.path.join(self.tmpDir.name, name)
+        psd: PSDImage = PSDImage.new("RGB", (16, 16))
+        psd.append(PixelLayer.frompil(PIL.Image.new("RGB", (16, 16), (200, 10, 10)), psd))
+        psd.save(path)
+
+        if not hasMergedImage:
+            # Like saved by Photoshop without "Maximize Compatibility".
+            psd = PSDImage.open(path)
+            psd.image_resources.get_data(Resource.VERSION_INFO).has_composite = False
+            psd.save(path)
+
+        return path
+
+    def __AssertAlphaMatchesComposite(self, path: str, hasAlpha: bool) -> None:
+        info: ImageInfo = ReadImageInfo(path)
+        self.assertIsNotNone(info)
+        self.assertEqual(info.hasAlpha, hasAlpha)
+        self.assertEqual(PSDImage.open(path).composite().mode == "RGBA", hasAlpha)
+
+    def test_layered_psd_with_merged_image(self):
+        path: str = self.__WriteLayeredPSD("merged.psd", hasMergedImage=True)
+        self.__AssertAlphaMatchesComposite(path, hasAlpha=False)
+
+    def test_layered_psd_without_merged_image(self):
+        path: str = self.__WriteLayeredPSD("layers.psd", hasMergedImage=False)
+        self.__AssertAlphaMatchesComposite(path, hasAlpha=True)
+
+    def test_tga(self):
+        path: str = os.path.join(self.tmpDir.name, "image.tga")
+        PIL.Image.new("RGBA", (8, 4)).save(path)
+        self.assertEqual(ReadImageInfo(path), ImageInfo(width=8, height=4, mode="RGBA", channels=4, hasAlpha=True))
+
+
+if __name__ == "__main__":
+    unittest.main()